@@ -0,0 +1,71 @@
+"""
+Benchmark of the SimpleWikiRenderer paragraph directives.
+
+Builds a large synthetic document with plain, underlined and directive
+paragraphs and reports the cost per paragraph, both for calling
+SimpleWikiRenderer.paragraph directly and for rendering the whole document.
+
+Usage: python benchmarks/bench_directives.py [--paragraphs 5000] [--repeat 5]
+"""
+
+# Python
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+import django
+
+django.setup()
+
+from simplewiki.markdown.engine import create_markdown
+from simplewiki.markdown.renderer import SimpleWikiRenderer
+
+PARAGRAPHS = [
+    "Form up in Jita 4-4 and **x-up** in fleet chat before the undock.",
+    "Bring __cap boosters__ and a spare __mobile depot__.",
+    "youtube:dQw4w9WgXcQ:100%:480px",
+    "vimeo:76979871",
+    "alert:warning:Hostiles reported in the pipe: stay aligned",
+    "gdrive:1AbCdEfGhIjK:grid",
+    "Links to https://zkillboard.com and other tools are allowed.",
+    "alert:unknown:This is not a known alert type",
+]
+
+
+def build_document(count: int) -> list:
+    return [PARAGRAPHS[i % len(PARAGRAPHS)] for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--paragraphs", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    paragraphs = build_document(args.paragraphs)
+    document = "\n\n".join(paragraphs)
+    renderer = SimpleWikiRenderer()
+    markdown = create_markdown()
+
+    def paragraph_pass():
+        for text in paragraphs:
+            renderer.paragraph(text)
+
+    def document_pass():
+        markdown(document)
+
+    paragraph_time = min(timeit.repeat(paragraph_pass, number=1, repeat=args.repeat))
+    document_time = min(timeit.repeat(document_pass, number=1, repeat=args.repeat))
+
+    print(f"paragraphs:              {args.paragraphs}")
+    print(f"paragraph() per call:    {paragraph_time / args.paragraphs * 1e6:.2f} us")
+    print(f"document per paragraph:  {document_time / args.paragraphs * 1e6:.2f} us")
+    print(f"document total:          {document_time * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
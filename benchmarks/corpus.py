@@ -0,0 +1,146 @@
+"""
+Synthetic wiki corpora for the benchmark suite.
+
+A corpus has a configurable number of top level menus, submenus per menu,
+sections per page, section content size and groups/states used to restrict
+menus. The same seed always generates the same wiki.
+"""
+
+# Python
+import random
+from dataclasses import asdict, dataclass
+
+WORDS = ("fleet", "doctrine", "shield", "armor", "capacitor", "logistics", "tackle", "scout",
+         "structure", "moon", "mining", "jita", "staging", "reinforce", "timer", "alliance",
+         "corporation", "hauler", "freighter", "titan", "citadel", "fitting", "ammo", "drones")
+
+
+@dataclass
+class CorpusConfig:
+    """
+    Size of a synthetic wiki.
+
+    Attributes:
+        menus (int): Number of top level menus.
+        submenus (int): Number of submenus per top level menu, 0 makes every top level menu a page.
+        sections (int): Number of sections per page.
+        content_size (int): Approximate number of characters of markdown per section.
+        groups (int): Number of groups used to restrict menus.
+        states (int): Number of states used to restrict menus.
+        restricted (float): Share of menus that require a group or state.
+        seed (int): Seed of the random generator.
+    """
+
+    menus: int = 10
+    submenus: int = 5
+    sections: int = 10
+    content_size: int = 2000
+    groups: int = 10
+    states: int = 2
+    restricted: float = 0.3
+    seed: int = 1
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def generate_markdown(rng: random.Random, size: int) -> str:
+    """
+    Generates markdown with headings, paragraphs, lists, tables and directives
+    until it has roughly the given number of characters.
+    """
+
+    blocks = []
+    length = 0
+    while length < size:
+        kind = rng.random()
+        if kind < 0.1:
+            block = "## " + " ".join(rng.choices(WORDS, k=3)).title()
+        elif kind < 0.2:
+            block = "\n".join("- " + " ".join(rng.choices(WORDS, k=5)) for _ in range(4))
+        elif kind < 0.25:
+            rows = ["| " + " | ".join(rng.choices(WORDS, k=3)) + " |" for _ in range(5)]
+            block = "\n".join([rows[0], "|---|---|---|"] + rows[1:])
+        elif kind < 0.3:
+            block = "alert:" + rng.choice(("info", "warning", "danger")) + ":" + " ".join(rng.choices(WORDS, k=8))
+        elif kind < 0.32:
+            block = "youtube:" + "".join(rng.choices("abcdefghijk", k=11))
+        else:
+            words = rng.choices(WORDS, k=40)
+            words[rng.randrange(len(words))] = "**" + rng.choice(WORDS) + "**"
+            block = " ".join(words) + "."
+
+        blocks.append(block)
+        length += len(block) + 2
+
+    return "\n\n".join(blocks)
+
+
+def generate_corpus(config: CorpusConfig) -> dict:
+    """
+    Creates the groups, states, menus and sections of a synthetic wiki.
+
+    Args:
+        config (CorpusConfig): The size of the wiki
+
+    Returns:
+        dict: Returns the generated groups, states, pages (menus without submenus) and the used words
+    """
+
+    # Imported here, the models need a configured django
+    from django.contrib.auth.models import Group
+    from allianceauth.authentication.models import State
+    from simplewiki.markdown.engine import create_markdown
+    from simplewiki.models import Menu, MenuSummary, Section
+    from simplewiki.search_index import rebuild_search_index
+    from simplewiki.text import html_to_text
+
+    rng = random.Random(config.seed)
+    markdown = create_markdown()
+
+    groups = [Group.objects.create(name=f"Benchmark Group {i}") for i in range(config.groups)]
+    states = [State.objects.create(name=f"Benchmark State {i}", priority=1000 + i) for i in range(config.states)]
+
+    def restrict(menu):
+        if rng.random() >= config.restricted:
+            return
+        if groups and (not states or rng.random() < 0.7):
+            menu.groups.add(rng.choice(groups))
+        elif states:
+            menu.states.add(rng.choice(states))
+
+    pages = []
+    index = 0
+    for i in range(config.menus):
+        menu = Menu.objects.create(title=f"Menu {i}", path=f"menu-{i}", index=index, icon="fas fa-book")
+        index += 1
+        restrict(menu)
+
+        if config.submenus == 0:
+            pages.append(menu)
+            continue
+
+        for j in range(config.submenus):
+            submenu = Menu.objects.create(title=f"Menu {i} Page {j}", path=f"menu-{i}-page-{j}", index=index, parent=menu)
+            index += 1
+            restrict(submenu)
+            pages.append(submenu)
+
+    sections = []
+    for page in pages:
+        for k in range(config.sections):
+            content = markdown(generate_markdown(rng, config.content_size))
+            sections.append(Section(title=f"{page.title} Section {k}",
+                                    menu=page,
+                                    index=k,
+                                    content=content,
+                                    plain_text=html_to_text(content),
+                                    last_edit="Benchmark",
+                                    last_edit_id=0))
+    # bulk_create skips save() and the signals, the summaries and the search index are updated here
+    Section.objects.bulk_create(sections, batch_size=500)
+    for page in pages:
+        MenuSummary.refresh(page.id)
+    rebuild_search_index()
+
+    return {'groups': groups, 'states': states, 'pages': pages, 'words': WORDS}
@@ -0,0 +1,257 @@
+"""
+SimpleWiki benchmark suite.
+
+Generates a synthetic wiki in a temporary test database and measures wall
+time, memory allocations and database queries of the renderer, the navbar and
+the reader and editor views. The results are written to a JSON file, pass a
+previous file with --compare to see the changes.
+
+Usage: python benchmarks/run.py [--menus 10] [--submenus 5] [--sections 10]
+           [--content-size 2000] [--groups 10] [--states 2] [--repeat 10]
+           [--output benchmark.json] [--compare baseline.json] [--only NAME ...]
+"""
+
+# Python
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+import django
+
+django.setup()
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, RequestFactory
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+
+from allianceauth.tests.auth_utils import AuthUtils
+
+import simplewiki
+from simplewiki.access import AccessPrincipal
+from simplewiki.markdown.engine import block_cache, create_markdown, render_blocks
+from simplewiki.menu_tree import MenuTree
+from simplewiki.views_helper import gen_context, invalidate_navbar_cache
+
+from benchmarks.corpus import CorpusConfig, generate_corpus, generate_markdown
+
+
+class QueryCounter:
+    """
+    Counts the executed database queries, also across test client requests
+    which reset django's query log.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Benchmark:
+    """
+    A measured operation. setup runs before every call and is not measured.
+    """
+
+    def __init__(self, name: str, run, setup=None):
+        self.name = name
+        self.run = run
+        self.setup = setup or (lambda: None)
+
+    def measure(self, repeat: int) -> dict:
+        # Warm up imports, template loaders and the connection
+        self.setup()
+        response = self.run()
+        if getattr(response, 'status_code', 200) >= 400:
+            raise RuntimeError(f"{self.name} returned status {response.status_code}")
+
+        timings = []
+        for _ in range(repeat):
+            self.setup()
+            started = time.perf_counter()
+            self.run()
+            timings.append((time.perf_counter() - started) * 1000)
+
+        self.setup()
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            self.run()
+
+        self.setup()
+        tracemalloc.start()
+        self.run()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {'wall_ms': {'min': round(min(timings), 3),
+                            'median': round(statistics.median(timings), 3),
+                            'mean': round(statistics.mean(timings), 3),
+                            'max': round(max(timings), 3)},
+                'queries': queries.count,
+                'alloc_peak_kib': round(peak / 1024, 1),
+                'alloc_retained_kib': round(current / 1024, 1)}
+
+
+def sort_payload() -> str:
+    """
+    Returns the reversed current menu order in the format the sort editor 
+    posts, so every post moves all menus.
+    """
+
+    tree = MenuTree.load()
+
+    return json.dumps([{'id': menu.id,
+                        'children': [{'id': child.id} for child in reversed(tree.children(menu))]}
+                       for menu in reversed(tree.roots)])
+
+
+def build_benchmarks(config: CorpusConfig, corpus: dict) -> list:
+    reader = AuthUtils.create_user("Benchmark Reader")
+    AuthUtils.add_main_character_2(reader, "Benchmark Reader", 90000001)
+    AuthUtils.add_permission_to_user_by_name("simplewiki.basic_access", reader)
+    reader.groups.add(*corpus['groups'][::2])
+    if corpus['states']:
+        reader.profile.state = corpus['states'][0]
+        reader.profile.save()
+
+    editor = AuthUtils.create_user("Benchmark Editor")
+    AuthUtils.add_main_character_2(editor, "Benchmark Editor", 90000002)
+    AuthUtils.add_permission_to_user_by_name("simplewiki.basic_access", editor)
+    AuthUtils.add_permission_to_user_by_name("simplewiki.editor_access", editor)
+
+    reader_client = Client()
+    reader_client.force_login(reader)
+    editor_client = Client()
+    editor_client.force_login(editor)
+
+    principal = AccessPrincipal.from_user(reader)
+    accessible = [page for page in corpus['pages'] if principal.can_access(page)]
+    page_url = reverse("simplewiki:dynamic_menu", args=[accessible[0].path if accessible else corpus['pages'][0].path])
+
+    markdown = create_markdown()
+    document = generate_markdown(random.Random(config.seed), config.content_size * config.sections)
+
+    edits = {'count': 0}
+
+    def edited_document():
+        # Changes one paragraph per call, the other blocks come from the block cache
+        edits['count'] += 1
+        render_blocks(document + "\n\nEdit " + str(edits['count']))
+
+    request_factory = RequestFactory()
+
+    def navbar():
+        # A new request per call, the context and its lazy menu tree are built like in the views
+        request = request_factory.get(page_url)
+        request.user = reader
+        gen_context(request)
+
+    sort_data = {}
+
+    def sort_setup():
+        sort_data['data'] = sort_payload()
+
+    return [
+        Benchmark("renderer", lambda: markdown(document)),
+        Benchmark("renderer_blocks_cold", lambda: render_blocks(document), setup=block_cache.clear),
+        Benchmark("renderer_blocks_edit", edited_document),
+        Benchmark("generate_menu_cold", navbar, setup=invalidate_navbar_cache),
+        Benchmark("generate_menu_warm", navbar),
+        Benchmark("dynamic_menus_cold", lambda: reader_client.get(page_url), setup=cache.clear),
+        Benchmark("dynamic_menus_warm", lambda: reader_client.get(page_url)),
+        Benchmark("search", lambda: reader_client.get(reverse("simplewiki:search"), {'query': corpus['words'][3]})),
+        Benchmark("search_suggest", lambda: reader_client.get(reverse("simplewiki:search_suggest"), {'query': corpus['words'][3][:3]})),
+        Benchmark("index", lambda: reader_client.get(reverse("simplewiki:index"))),
+        Benchmark("editor_sort_post", lambda: editor_client.post(reverse("simplewiki:editor_sort_post"), sort_data),
+                  setup=sort_setup),
+    ]
+
+
+def compare(results: dict, baseline_file: str):
+    with open(baseline_file, encoding="utf-8") as file:
+        baseline = json.load(file)['results']
+
+    print()
+    print(f"{'benchmark':<22} {'median ms':>12} {'baseline':>12} {'ratio':>7} {'queries':>9}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]
+        median = result['wall_ms']['median']
+        old_median = old['wall_ms']['median']
+        ratio = median / old_median if old_median else float('nan')
+        queries = f"{old['queries']}->{result['queries']}"
+        print(f"{name:<22} {median:>12.3f} {old_median:>12.3f} {ratio:>7.2f} {queries:>9}")
+
+
+def main():
+    defaults = CorpusConfig()
+    parser = argparse.ArgumentParser(description="SimpleWiki benchmark suite")
+    parser.add_argument("--menus", type=int, default=defaults.menus)
+    parser.add_argument("--submenus", type=int, default=defaults.submenus)
+    parser.add_argument("--sections", type=int, default=defaults.sections)
+    parser.add_argument("--content-size", type=int, default=defaults.content_size)
+    parser.add_argument("--groups", type=int, default=defaults.groups)
+    parser.add_argument("--states", type=int, default=defaults.states)
+    parser.add_argument("--restricted", type=float, default=defaults.restricted)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--only", nargs="*", help="Only run the benchmarks with these names")
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", help="A previous result file to compare against")
+    args = parser.parse_args()
+
+    config = CorpusConfig(menus=args.menus, submenus=args.submenus, sections=args.sections,
+                          content_size=args.content_size, groups=args.groups, states=args.states,
+                          restricted=args.restricted, seed=args.seed)
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        started = time.perf_counter()
+        corpus = generate_corpus(config)
+        print(f"Generated {len(corpus['pages'])} pages in {time.perf_counter() - started:.1f}s")
+
+        results = {}
+        for benchmark in build_benchmarks(config, corpus):
+            if args.only and benchmark.name not in args.only:
+                continue
+            results[benchmark.name] = benchmark.measure(args.repeat)
+            result = results[benchmark.name]
+            print(f"{benchmark.name:<22} median {result['wall_ms']['median']:>9.3f} ms  "
+                  f"queries {result['queries']:>4}  peak {result['alloc_peak_kib']:>9.1f} KiB")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    output = {'meta': {'simplewiki': simplewiki.__version__,
+                       'django': django.get_version(),
+                       'python': platform.python_version(),
+                       'database': connection.vendor,
+                       'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                       'repeat': args.repeat},
+              'corpus': config.as_dict(),
+              'results': results}
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(output, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""
+Django settings for the benchmark suite.
+
+Extends the test project with the Alliance Auth theme and menu apps, so the
+views render their full templates. Like the tests, it needs a local redis.
+"""
+
+from testauth.settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = INSTALLED_APPS + [  # noqa: F405
+    "allianceauth.theme",
+    "allianceauth.theme.darkly",
+    "allianceauth.theme.flatly",
+    "allianceauth.theme.materia",
+    "allianceauth.menu",
+]
+
+DEFAULT_THEME = "allianceauth.theme.flatly.auth_hooks.FlatlyThemeHook"
+DEFAULT_THEME_DARK = "allianceauth.theme.darkly.auth_hooks.DarklyThemeHook"
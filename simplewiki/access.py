@@ -0,0 +1,166 @@
+"""
+SimpleWiki Access
+
+AccessPrincipal -> the groups and state of the requesting user, computed once per request
+menu_access_classes -> menus with the same access rules share one access class bit
+"""
+
+# Python imports
+import hashlib
+
+# Django imports
+from django.core.handlers.wsgi import WSGIRequest
+
+# Alliance Auth imports
+from allianceauth.authentication.models import State
+
+# Custom imports
+from .models import Menu
+
+# Menus whose groups or states all match no existing group or state get only this group, 
+# nobody holds it, so they stay hidden until their access is set in the menu editor
+RESTRICTED_GROUP = "SimpleWiki: unmatched access"
+
+
+def access_fingerprint(user_groups, user_state) -> str:
+    """
+    Generates a canonical fingerprint for a combination of groups and state. 
+    Users with the same groups and the same state see exactly the same menus, 
+    so they can share everything that is cached per access profile.
+
+    Args:
+        user_groups (iterable): All group names held by the user
+        user_state (str): The name of the user's state
+
+    Returns:
+        str: Returns a stable hash of the sorted group names and the state
+    """
+
+    raw = ",".join(sorted(set(user_groups))) + "|" + (user_state or "")
+
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def menu_access_classes() -> dict:
+    """
+    Groups all menus by their access rules, the groups and states of the menu 
+    and of its parent menu (as in MenuQuerySet.accessible_ids). Every class is
+    a single bit, so a set of classes is an int and checking whether a user
+    may see something of a class is a bitwise AND.
+
+    Returns:
+        dict: Returns the access class bit of every menu id
+    """
+
+    parents = dict(Menu.objects.values_list('id', 'parent_id'))
+
+    groups = {}
+    for menu_id, group_id in Menu.groups.through.objects.values_list('menu_id', 'group_id'):
+        groups.setdefault(menu_id, set()).add(group_id)
+    states = {}
+    for menu_id, state_id in Menu.states.through.objects.values_list('menu_id', 'state_id'):
+        states.setdefault(menu_id, set()).add(state_id)
+
+    def rule(menu_id):
+        return (frozenset(groups.get(menu_id, ())), frozenset(states.get(menu_id, ())))
+
+    classes = {}
+    menu_classes = {}
+    for menu_id, parent_id in parents.items():
+        rules = frozenset(item for item in (rule(menu_id), rule(parent_id)) if any(item))
+        menu_classes[menu_id] = classes.setdefault(rules, 1 << len(classes))
+
+    return menu_classes
+
+
+class AccessPrincipal:
+    """
+    Represents the groups and the state of a user. Two principals with the same 
+    groups and state are equal and share the same fingerprint, which is used as 
+    key for everything that is cached per access profile.
+
+    Attributes:
+        group_ids (frozenset): The ids of all groups held by the user.
+        group_names (frozenset): The names of all groups held by the user.
+        state_id (int): The id of the user's state.
+        state_name (str): The name of the user's state.
+        fingerprint (str): A stable hash of the group names and the state name.
+    """
+
+    def __init__(self, group_ids, group_names, state_id, state_name):
+        self.group_ids = frozenset(group_ids)
+        self.group_names = frozenset(group_names)
+        self.state_id = state_id
+        self.state_name = state_name
+        self.fingerprint = access_fingerprint(self.group_names, self.state_name)
+        self._accessible_menu_ids = None
+
+    @classmethod
+    def from_user(cls, user):
+        """
+        Loads the groups and the state of a user, one query each.
+
+        Args:
+            user (User): The user to load
+
+        Returns:
+            AccessPrincipal: Returns the principal of the user
+        """
+
+        group_rows = list(user.groups.values_list('id', 'name'))
+        state_row = State.objects.filter(userprofile__user=user).values_list('id', 'name').first()
+        state_id, state_name = state_row if state_row else (None, "")
+
+        return cls([group_id for group_id, _ in group_rows],
+                   [group_name for _, group_name in group_rows],
+                   state_id,
+                   state_name)
+
+    @property
+    def accessible_menu_ids(self) -> frozenset:
+        """
+        Returns the ids of all menus the principal can access, queried on first use.
+        """
+
+        if self._accessible_menu_ids is None:
+            self._accessible_menu_ids = Menu.objects.accessible_ids(self.group_ids, self.state_id)
+
+        return self._accessible_menu_ids
+
+    def can_access(self, menu) -> bool:
+        """
+        Returns True if the principal can access the given menu.
+        """
+
+        return menu is not None and menu.id in self.accessible_menu_ids
+
+    def __eq__(self, other):
+        if not isinstance(other, AccessPrincipal):
+            return NotImplemented
+        return self.fingerprint == other.fingerprint
+
+    def __hash__(self):
+        return hash(self.fingerprint)
+
+    def __repr__(self):
+        return f"AccessPrincipal(groups={sorted(self.group_names)}, state={self.state_name!r})"
+
+
+def get_access_principal(request: WSGIRequest) -> AccessPrincipal:
+    """
+    Returns the access principal of the requesting user. The principal is 
+    computed on first access and then reused for the rest of the request.
+
+    Args:
+        request (WSGIRequest): The standard django request
+
+    Returns:
+        AccessPrincipal: Returns the principal of the requesting user
+    """
+
+    principal = getattr(request, '_simplewiki_principal', None)
+    if principal is None:
+        principal = AccessPrincipal.from_user(request.user)
+        request._simplewiki_principal = principal
+
+    return principal
@@ -9,12 +9,15 @@ from django.db import IntegrityError
 from django.utils.text import slugify
 from django.core.exceptions import ValidationError
 from django.db.models.deletion import ProtectedError
+from django.contrib.auth.models import Group
 
 from allianceauth.services.hooks import get_extension_logger
+from allianceauth.authentication.models import State
 from app_utils.logging import LoggerAddTag
 
 # Custom imports
 from .models import *
+from .ordering import append_key
 from . import __title__
 
 logger = LoggerAddTag(get_extension_logger(__name__), __title__)
@@ -56,12 +59,9 @@ def create_new_menu(request: WSGIRequest, context: dict) -> HttpResponse:
     if request.POST['confirm_create'] == '1':
         new_menu = Menu()
 
+        # New menus are parent menus, placed behind the last one
         try:
-            if Menu.objects.all().count() > 0:
-                index = Menu.objects.all().last().id
-            else:
-                index = 0
-            setattr(new_menu, 'index', index)
+            setattr(new_menu, 'index', append_key(Menu.objects.filter(parent=None)))
         except Exception as e:
             return render(request, 'simplewiki/error.html', gen_error_context(context, 'EDITOR_MENU_ADD_NO_INDEX', e))
 
@@ -83,43 +83,25 @@ def create_new_menu(request: WSGIRequest, context: dict) -> HttpResponse:
         except Exception as e:
             return render(request, 'simplewiki/error.html', gen_error_context(context, 'EDITOR_MENU_ADD_BAD_ICON', e))
 
-        # Take all inputs from the group multiple select and put them in a string, seperated by a comma
-        group_string = str()
-        
+        # Take all inputs from the group multiple select and look up the selected groups
         try:
-            groups = request.POST.getlist('group_select')
-
-            if groups == "":
-                group_string = None
-            else:
-                for group_item in groups:
-                    group_string += group_item
-                    group_string += ","
-                group_string = group_string[:-1]
+            groups = Group.objects.filter(name__in=request.POST.getlist('group_select'))
         except Exception as e:
             return render(request, 'simplewiki/error.html', gen_error_context(context, 'EDITOR_MENU_ADD_BAD_GROUP', e))
 
-        # Take all inputs from the state multiple select and put them in a string, seperated by a comma
-        state_string = str()
+        # Take all inputs from the state multiple select and look up the selected states
         try:
-            states = request.POST.getlist('state_select')
-
-            if states == "":
-                state_string = None
-            else:  
-                for state_item in states:
-                    state_string += state_item
-                    state_string += ","
-                state_string = state_string[:-1]
+            states = State.objects.filter(name__in=request.POST.getlist('state_select'))
         except Exception as e:
             return render(request, 'simplewiki/error.html', gen_error_context(context, 'EDITOR_MENU_ADD_BAD_STATE', e))
         
+        # Lazy loading checkbox, unchecked checkboxes are not sent
+        new_menu.lazy_sections = request.POST.get('lazy_sections') == 'on'
+
         # Taking the titel and converting it into a url suitable string
         try:
             new_menu.path = slugify(request.POST['title'])
             new_menu.parent = None
-            new_menu.groups = group_string
-            new_menu.states = state_string
         except (KeyError, ValueError, TypeError) as e:
                 context.update({'error_code': 'EDITOR_MENU_TITLE_BAD_URL'})
                 context.update({'error_django': str(e)})
@@ -127,9 +109,11 @@ def create_new_menu(request: WSGIRequest, context: dict) -> HttpResponse:
         except Exception as e:
                 return render(request, 'simplewiki/error.html', gen_error_context(context, 'EDITOR_MENU_ADD_TITLE_URL_UNKNOWN', e))
                 
-        # Save new_menu and check for errors
+        # Save new_menu and its access relations and check for errors
         try:
             new_menu.save()
+            new_menu.groups.set(groups)
+            new_menu.states.set(states)
         except (IntegrityError, ValidationError) as e:
             context.update({'error_code': 'EDITOR_MENU_ERROR_SAVE'})
             context.update({'error_django': str(e)})
@@ -187,39 +171,30 @@ def edit_existing_menu(request: WSGIRequest, context: dict, edit: str) -> HttpRe
         except Exception as e:
             return render(request, 'simplewiki/error.html', gen_error_context(context, 'EDITOR_MENU_EDIT_BAD_ICON', e))
         
-        # Take all inputs from the group multiple select and put them in a string, seperated by a comma
+        # Take all inputs from the group multiple select and look up the selected groups, "none" removes all groups
         try:
-            groups = request.POST.getlist('group_select')
-            group_string = ""
-            for group_item in groups:
-                if group_item == "none":
-                    group_string = ""
-                    break;
-                group_string += group_item
-                group_string += ","
-            group_string = group_string[:-1]
+            group_names = request.POST.getlist('group_select')
+            if "none" in group_names:
+                group_names = []
+            groups = Group.objects.filter(name__in=group_names)
         except Exception as e:
             return render(request, 'simplewiki/error.html', gen_error_context(context, 'EDITOR_MENU_EDIT_BAD_GROUP', e))
 
-        # Take all inputs from the state multiple select and put them in a string, seperated by a comma
+        # Take all inputs from the state multiple select and look up the selected states, "none" removes all states
         try:
-            states = request.POST.getlist('state_select')
-            state_string = str()
-            for state_item in states:
-                if state_item == "none":
-                    state_string = ""
-                    break;
-                state_string += state_item
-                state_string += ","
-            state_string = state_string[:-1]
+            state_names = request.POST.getlist('state_select')
+            if "none" in state_names:
+                state_names = []
+            states = State.objects.filter(name__in=state_names)
         except Exception as e:
             return render(request, 'simplewiki/error.html', gen_error_context(context, 'EDITOR_MENU_EDIT_BAD_STATE', e))
 
+        # Lazy loading checkbox, unchecked checkboxes are not sent
+        selected_menu.lazy_sections = request.POST.get('lazy_sections') == 'on'
+
         # Taking the title and converting it into a url suitable string
         try:
             selected_menu.path = slugify(request.POST['title'])
-            selected_menu.groups = group_string
-            selected_menu.states = state_string
         except (KeyError, ValueError, TypeError) as e:
             context.update({'error_code': 'EDITOR_MENU_EDIT_BAD_TITLE'})
             context.update({'error_django': str(e)})
@@ -227,9 +202,11 @@ def edit_existing_menu(request: WSGIRequest, context: dict, edit: str) -> HttpRe
         except Exception as e:
             return render(request, 'simplewiki/error.html', gen_error_context(context, 'EDITOR_MENU_EDIT_BAD_TITLE_UNKNOWN', e))
 
-        # Save selected_menu and check for errors
+        # Save selected_menu and its access relations and check for errors
         try:
             selected_menu.save()
+            selected_menu.groups.set(groups)
+            selected_menu.states.set(states)
         except (ValidationError, IntegrityError) as e:
             context.update({'error_code': 'EDITOR_MENU_EDIT_SAVE'})
             context.update({'error_django': str(e)})
@@ -292,6 +269,8 @@ def load_menu_edit_form(request: WSGIRequest, context: dict, edit: str) -> HttpR
     try:
         selected_menu = Menu.objects.get(path=edit)
         context.update({'selectedMenu': selected_menu})
+        context.update({'selected_groups': list(selected_menu.groups.all())})
+        context.update({'selected_states': list(selected_menu.states.all())})
         context.update({'user_action': 'edit'})
     except Menu.DoesNotExist as e:
         context.update({'error_code': 'EDITOR_MENU_EDIT_LOAD_FORM'})
@@ -1,3 +1,4 @@
+import copy
 import inspect
 import re
 
@@ -5,7 +6,7 @@ import re
 from django.core.handlers.wsgi import WSGIRequest
 from django.http import HttpResponse
 from django.shortcuts import render, redirect
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.utils.text import slugify
 from django.core.exceptions import ValidationError
 from django.db.models.deletion import ProtectedError
@@ -17,6 +18,8 @@ from allianceauth.eveonline.models import EveCharacter
 
 # Custom imports
 from .models import *
+from .ordering import append_key
+from .revisions import get_revision_content, record_revision
 
 # Logging
 from app_utils.logging import LoggerAddTag
@@ -83,19 +86,21 @@ def create_new_section(request: WSGIRequest, context: dict) -> HttpResponse:
         except Exception as e:
             return render(request, 'simplewiki/error.html', gen_error_context(context, 'EDITOR_SECTION_CREATE_UNKNOWN', e))
 
-        # Check if user changed the index. If they did, save the new one.
+        # Check if user set an index. If they didn't, place the section behind the last one of the menu.
         try:
-            index = request.POST['index']
+            index = request.POST.get('index', '')
             if re.match(r'^-?\d+$', index):
-                new_section.index = int(request.POST['index'])
+                new_section.index = int(index)
             else:
-                new_section.index = 0
+                new_section.index = append_key(Section.objects.filter(menu=new_section.menu))
         except Exception as e:
             return render(request, 'simplewiki/error.html', gen_error_context(context, 'EDITOR_SECTION_CREATE_INDEX', e))
 
-        # Save the object
+        # Save the object and its first revision
         try:
-            new_section.save()
+            with transaction.atomic():
+                new_section.save()
+                record_revision(new_section)
         except (ValidationError, IntegrityError) as e:
             context.update({'error_code': 'EDITOR_SECTION_CREATE_SAVE'})
             context.update({'error_django': str(e)})
@@ -133,6 +138,9 @@ def edit_existing_section(request: WSGIRequest, context: dict, edit: str) -> Htt
             context.update({'error_django': str(e)})
             return render(request, 'simplewiki/error.html', context)
 
+        # Keep the current state, it becomes the first revision of sections without history
+        previous = copy.copy(selected_section)
+
         # Get user who tries to edit the section
         try:
             user = UserProfile.objects.filter(user=request.user).first()
@@ -173,27 +181,33 @@ def edit_existing_section(request: WSGIRequest, context: dict, edit: str) -> Htt
 
         # Check if user changed the index. If they did, save the new one.
         try:
-            index = request.POST['index']
-            if re.match(r'^-?\d+$', index):
-                selected_section.index = int(request.POST['index'])
-            else:
-                selected_section.index = 0
+            index = request.POST.get('index', '')
+            index_changed = re.match(r'^-?\d+$', index) is not None
+            if index_changed:
+                selected_section.index = int(index)
         except Exception as e:
             return render(request, 'simplewiki/error.html', gen_error_context(context, 'EDITOR_SECTION_EDIT_INDEX', e))
 
         # Check if user changed the menu. If they did, save the new one.
         try:
+            previous_menu_id = selected_section.menu_id
             menu_path = request.POST['menu_path']
             if menu_path == "":
                 selected_section.menu = None
             else:
                 selected_section.menu = Menu.objects.get(path=menu_path)
+
+            # A section moved to another menu without a new index is placed behind its last section
+            if selected_section.menu_id != previous_menu_id and not index_changed:
+                selected_section.index = append_key(Section.objects.filter(menu=selected_section.menu))
         except Exception as e:
             return render(request, 'simplewiki/error.html', gen_error_context(context, 'EDITOR_SECTION_EDIT_MENU', e))
 
-        # Save the object
+        # Save the object and store the new content as a revision
         try:
-            selected_section.save()
+            with transaction.atomic():
+                selected_section.save()
+                record_revision(selected_section, previous)
         except (ValidationError, IntegrityError) as e:
             context.update({'error_code': 'EDITOR_SECTION_EDIT_SAVE'})
             context.update({'error_django': str(e)})
@@ -238,6 +252,53 @@ def delete_existing_section(request: WSGIRequest, context: dict, delete: str) ->
     elif request.POST['confirm_delete'] == '0':
         return redirect('simplewiki:editor_sections')
 
+def restore_section_revision(request: WSGIRequest, context: dict, section: Section, number: int) -> HttpResponse:
+    """
+    Restores the content of an older revision. The section is saved with the restored 
+    content and the current user as editor, which stores it as a new revision, so the 
+    restore itself can be undone.
+
+    Args:
+        request (WSGIRequest): The standard django request, passed over from the main view
+        context (dict): The context so far, will be updates and send to the template
+        section (Section): The section to restore
+        number (int): The number of the revision to restore
+
+    Returns:
+        HttpResponse: Returns the template and context to render
+    """
+
+    try:
+        content = get_revision_content(section.id, number)
+    except SectionRevision.DoesNotExist as e:
+        context.update({'error_code': 'EDITOR_SECTION_RESTORE_GET'})
+        context.update({'error_django': str(e)})
+        return render(request, 'simplewiki/error.html', context)
+
+    previous = copy.copy(section)
+    section.content = content
+
+    # Get user who restores the section
+    try:
+        user = UserProfile.objects.filter(user=request.user).first()
+        section.last_edit = user.main_character.character_name
+        section.last_edit_id = user.main_character.character_id
+    except Exception as e:
+        logger.error("Unable to find user who tries to restore a section")
+
+    try:
+        with transaction.atomic():
+            section.save()
+            record_revision(section, previous)
+    except (ValidationError, IntegrityError) as e:
+        context.update({'error_code': 'EDITOR_SECTION_RESTORE_SAVE'})
+        context.update({'error_django': str(e)})
+        return render(request, 'simplewiki/error.html', context)
+    except Exception as e:
+        return render(request, 'simplewiki/error.html', gen_error_context(context, 'EDITOR_SECTION_RESTORE_SAVE_UNKNOWN', e))
+
+    return redirect('simplewiki:editor_section_revisions', section_id=section.id)
+
 def load_section_edit_form(request: WSGIRequest, context: dict, edit: str) -> HttpResponse:
     """
     Handle Section Edit Get is the GET request helper function for editing menus. This function does 
@@ -6,3 +6,36 @@ from django.conf import settings
 # put your app settings here
 
 simplewiki_display_page_contents = getattr(settings, "SIMPLEWIKI_DISPLAY_PAGE_CONTENTS", True)
+
+# Seconds a generated navbar is cached per access profile, 0 disables the cache
+simplewiki_navbar_cache_timeout = getattr(settings, "SIMPLEWIKI_NAVBAR_CACHE_TIMEOUT", 3600)
+
+# Seconds a rendered page body is cached, 0 disables the cache
+simplewiki_page_cache_timeout = getattr(settings, "SIMPLEWIKI_PAGE_CACHE_TIMEOUT", 86400)
+
+# Load the section bodies of every page once they scroll into view, can also be enabled per menu
+simplewiki_lazy_sections = getattr(settings, "SIMPLEWIKI_LAZY_SECTIONS", False)
+
+# Number of rendered markdown texts kept in memory per process, 0 disables the cache
+simplewiki_markdown_cache_size = getattr(settings, "SIMPLEWIKI_MARKDOWN_CACHE_SIZE", 512)
+
+# Number of rendered markdown blocks (paragraphs, lists, tables, ...) kept in memory per process, 0 disables the cache
+simplewiki_markdown_block_cache_size = getattr(settings, "SIMPLEWIKI_MARKDOWN_BLOCK_CACHE_SIZE", 4096)
+
+# Search backend: "auto" uses the full-text index of the database if available, "python" an in-memory inverted index
+simplewiki_search_backend = getattr(settings, "SIMPLEWIKI_SEARCH_BACKEND", "auto")
+
+# Maximum number of characters of the text shown for every search result
+simplewiki_search_snippet_length = getattr(settings, "SIMPLEWIKI_SEARCH_SNIPPET_LENGTH", 240)
+
+# Number of search results per page
+simplewiki_search_page_size = getattr(settings, "SIMPLEWIKI_SEARCH_PAGE_SIZE", 20)
+
+# Maximum number of title suggestions shown while typing in the search bar
+simplewiki_search_suggestions = getattr(settings, "SIMPLEWIKI_SEARCH_SUGGESTIONS", 8)
+
+# Minimum trigram similarity (0 to 1) of a word and a search word in fuzzy searches
+simplewiki_search_fuzzy_threshold = getattr(settings, "SIMPLEWIKI_SEARCH_FUZZY_THRESHOLD", 0.4)
+
+# Every n-th revision of a section stores the full content, the others only the difference to the revision before
+simplewiki_revision_snapshot_interval = getattr(settings, "SIMPLEWIKI_REVISION_SNAPSHOT_INTERVAL", 20)
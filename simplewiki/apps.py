@@ -13,3 +13,7 @@ class simplewikiConfig(AppConfig):
     name = "simplewiki"
     label = "simplewiki"
     verbose_name = f"simplewiki App v{__version__}"
+
+    def ready(self):
+        # Connect the cache invalidation signals
+        from . import signals  # noqa: F401
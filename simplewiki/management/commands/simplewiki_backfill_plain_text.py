@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from simplewiki.models import Section
+from simplewiki.search_index import rebuild_search_index
+from simplewiki.text import backfill_plain_text
+
+# Command to compute the plain text of all sections
+class Command(BaseCommand):
+    """
+    A management command to compute the plain text column of all sections and rebuild the search index
+
+    Migration 0041 fills the column once, run this after importing sections with raw SQL or bulk tools
+    that bypass Section.save().
+    """
+
+    help = "Computes the plain text of all sections in batches and rebuilds the search index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500,
+                            help="Number of sections per bulk update")
+        parser.add_argument("--only-missing", action="store_true",
+                            help="Only sections without plain text")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size has to be at least 1")
+
+        started = time.monotonic()
+        changed = backfill_plain_text(Section, batch_size=options["batch_size"], only_missing=options["only_missing"])
+        rebuild_search_index()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated the plain text of {changed} sections and rebuilt the search index in {time.monotonic() - started:.2f}s."))
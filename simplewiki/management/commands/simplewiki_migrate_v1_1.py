@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.db.models import Q
 
+from simplewiki.access import RESTRICTED_GROUP
 from simplewiki.models import *
 
 # Command to migrate data from 1.0.x to 1.1.x, because of the move from strings to foreign keys
@@ -45,6 +46,37 @@ class Command(BaseCommand):
 
         print(GREEN + "Successfully migrated all data" + RESET)
 
+def get_existing_groups(menu, group_names):
+    """
+    Returns the existing groups of the given names. Unknown names are reported 
+    and skipped, a typo must not create a group that could grant access later. 
+    A menu whose groups are all unknown gets the RESTRICTED_GROUP instead, 
+    so it stays hidden as before.
+
+    Args:
+        menu (Menu): The migrated menu
+        group_names (list): The group names of the old menu
+
+    Returns:
+        list: Returns the groups to assign
+    """
+    # ANSI escape codes for some colors
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    RESET = '\033[0m'
+
+    group_names = [name.strip() for name in group_names if name.strip()]
+    groups = list(Group.objects.filter(name__in=group_names))
+
+    unknown_groups = sorted(set(group_names) - {group.name for group in groups})
+    if unknown_groups:
+        print(YELLOW + "Ignoring unknown groups " + ", ".join(unknown_groups) + " of menu " + menu.title + RESET)
+        if not groups:
+            print(RED + "Menu " + menu.title + " is restricted to the group " + RESTRICTED_GROUP + ", assign its groups in the menu editor" + RESET)
+            groups = [Group.objects.get_or_create(name=RESTRICTED_GROUP)[0]]
+
+    return groups
+
 def import_parent_menus(menu_item_parents):
     """
     Imports parent menus from version 1.0.x to version 1.1.x.
@@ -86,17 +118,14 @@ def import_parent_menus(menu_item_parents):
             print("Found a menu without a path, skipping it..")
             continue
         new_menu.parent = None
-        if old_menu_parent.groups:
-            if old_menu_parent.groups == "none":
-                new_menu.groups = ""
-            else:
-                new_menu.groups = old_menu_parent.groups
+        if old_menu_parent.groups and old_menu_parent.groups != "none":
+            group_names = old_menu_parent.groups.split(',')
         else:
-            new_menu.groups = ""
-        new_menu.states = ""
+            group_names = []
 
         try:
             new_menu.save()
+            new_menu.groups.set(get_existing_groups(new_menu, group_names))
             test_saved_menu = Menu.objects.filter(path=old_menu_parent.path)
             if test_saved_menu.exists():
                 print("Successfully migrated parent menu " + test_saved_menu.first().title)
@@ -147,10 +176,9 @@ def import_child_menus(menu_item_children):
             print("Found a menu child without a path, skipping..")
             continue
         if old_menu_child.groups:
-            new_menu_child.groups = old_menu_child.groups
+            group_names = old_menu_child.groups.split(',')
         else:
-            new_menu_child.groups = ""
-        new_menu_child.states = ""
+            group_names = []
 
         parent_menu = Menu.objects.filter(path=old_menu_child.parent)
         if parent_menu.exists():
@@ -161,6 +189,7 @@ def import_child_menus(menu_item_children):
 
         try:
             new_menu_child.save()
+            new_menu_child.groups.set(get_existing_groups(new_menu_child, group_names))
             test_saved_menu = Menu.objects.filter(path=old_menu_child.path)
             if test_saved_menu.exists():
                 print("Successfully migrated child menu " + test_saved_menu.first().title)
@@ -1,10 +1,8 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
-import mistune
-
 from simplewiki.models import Section
-from simplewiki.markdown import renderer as sw_renderer
+from simplewiki.markdown.engine import render_blocks
 
 # Command to migrate data from 1.0.x to 1.1.3
 class Command(BaseCommand):
@@ -26,13 +24,9 @@ class Command(BaseCommand):
         try: 
             all_sections = Section.objects.all()
 
-            markdown = mistune.create_markdown(escape=True, 
-                                       renderer=sw_renderer.SimpleWikiRenderer(), 
-                                       plugins=['strikethrough', 'url', 'footnotes', 'abbr', 'mark', 'insert', 'superscript', 'subscript', 'table'])
-
             for section in all_sections:
 
-                section.content = markdown(section.content)
+                section.content = render_blocks(section.content)
 
                 section.save()
 
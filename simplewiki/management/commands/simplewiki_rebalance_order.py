@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from simplewiki.models import Menu, Section
+from simplewiki.ordering import ORDER_GAP, rebalance_keys
+
+# Command to spread the ordering keys of menus and sections
+class Command(BaseCommand):
+    """
+    A management command to spread the index of sibling menus and sections ORDER_GAP apart again
+
+    Moving items between two neighbours halves the room between their keys. Run this periodically, 
+    e.g. from cron or with the simplewiki.tasks.rebalance_order task, to restore the gaps before 
+    they run out. Only siblings with two keys closer than --min-gap are renumbered.
+    """
+
+    help = "Spreads the ordering keys of menus and sections apart again, keeping their order."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-gap", type=int, default=ORDER_GAP // 32,
+                            help="Renumber siblings with two neighbouring keys closer than this")
+        parser.add_argument("--all", action="store_true",
+                            help="Renumber all siblings, regardless of their gaps")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Count the items that would get a new key without writing them")
+
+    def handle(self, *args, **options):
+        if options["min_gap"] < 1:
+            raise CommandError("--min-gap has to be at least 1")
+
+        min_gap = None if options["all"] else options["min_gap"]
+        started = time.monotonic()
+
+        menus = rebalance_keys(Menu, 'parent_id', min_gap=min_gap, dry_run=options["dry_run"])
+        sections = rebalance_keys(Section, 'menu_id', min_gap=min_gap, dry_run=options["dry_run"])
+
+        action = "Would renumber" if options["dry_run"] else "Renumbered"
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {menus} menus and {sections} sections in {time.monotonic() - started:.2f}s."))
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from simplewiki.models import MenuSummary, Section
+from simplewiki.markdown.transforms import TRANSFORMS, transform_section
+from simplewiki.search_index import update_search_index
+from simplewiki.text import html_to_text
+
+# Command to re-render or normalize the content of all sections
+class Command(BaseCommand):
+    """
+    A management command to re-render or normalize the content of all sections
+
+    Sections are streamed in batches ordered by id, transformed in a process pool
+    and written back with one bulk update per batch inside a transaction. After
+    every batch the last section id is stored in the checkpoint file, so an
+    interrupted run continues where it stopped. Before a batch is written the 
+    checkpoint also stores the hashes of the new contents, if the run stops 
+    between the commit and the checkpoint the next run skips the sections 
+    which already got their new content instead of transforming them twice.
+    """
+
+    help = "Re-renders (markdown) or normalizes (normalize) the content of all sections in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mode", choices=sorted(TRANSFORMS), default="normalize",
+                            help="normalize: line endings and trailing whitespace, markdown: convert markdown content to HTML")
+        parser.add_argument("--batch-size", type=int, default=500,
+                            help="Number of sections read, transformed and written per batch")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Number of worker processes, 1 transforms in this process")
+        parser.add_argument("--checkpoint", default="simplewiki_rerender.checkpoint",
+                            help="File storing the last written section id, removed after a complete run")
+        parser.add_argument("--restart", action="store_true",
+                            help="Ignore an existing checkpoint and start with the first section")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Transform all sections and report the changes without writing them")
+
+    def handle(self, *args, **options):
+        mode = options["mode"]
+        batch_size = options["batch_size"]
+        workers = options["workers"]
+        checkpoint = options["checkpoint"]
+        dry_run = options["dry_run"]
+
+        if batch_size < 1 or workers < 1:
+            raise CommandError("--batch-size and --workers have to be at least 1")
+
+        last_id, pending = (0, {}) if options["restart"] else self.read_checkpoint(checkpoint)
+        if last_id:
+            self.stdout.write(f"Resuming after section id {last_id}")
+
+        total = Section.objects.filter(id__gt=last_id).count()
+        self.stdout.write(f"===== Sections ({total}, mode: {mode}{', dry run' if dry_run else ''}) =====")
+
+        processed = 0
+        changed = 0
+        started = time.monotonic()
+
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            for batch in self.iter_batches(last_id, batch_size):
+                # Sections written by the interrupted run whose checkpoint wasn't stored
+                written = {section.id for section in batch if pending.get(section.id) == content_hash(section.content)}
+                items = [(mode, section.id, section.content) for section in batch if section.id not in written]
+                if pool is None:
+                    results = map(transform_section, items)
+                else:
+                    results = pool.map(transform_section, items, chunksize=max(1, len(items) // (workers * 4)))
+                new_contents = dict(results)
+
+                updated = []
+                for section in batch:
+                    if section.id not in written and new_contents[section.id] != section.content:
+                        section.content = new_contents[section.id]
+                        section.plain_text = html_to_text(section.content)
+                        updated.append(section)
+
+                if not dry_run:
+                    if updated:
+                        self.write_checkpoint(checkpoint, last_id, {section.id: content_hash(section.content) for section in updated})
+                    self.write_batch(updated)
+                    last_id = batch[-1].id
+                    self.write_checkpoint(checkpoint, last_id)
+
+                processed += len(batch)
+                changed += len(updated)
+                elapsed = time.monotonic() - started
+                rate = processed / elapsed if elapsed else 0
+                self.stdout.write(f"{processed}/{total} sections, {changed} changed, {rate:.0f} sections/s")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        if not dry_run and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        elapsed = time.monotonic() - started
+        action = "would change" if dry_run else "changed"
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {processed} sections in {elapsed:.2f}s, {action} {changed}."))
+
+    def iter_batches(self, last_id: int, batch_size: int):
+        """
+        Streams all sections after last_id ordered by id and yields them in lists of batch_size.
+        """
+
+        sections = (Section.objects.filter(id__gt=last_id)
+                                   .order_by('id')
+                                   .only('id', 'menu_id', 'title', 'content', 'plain_text')
+                                   .iterator(chunk_size=batch_size))
+
+        batch = []
+        for section in sections:
+            batch.append(section)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+    def write_batch(self, sections: list):
+        """
+        Writes the changed sections of one batch in a single transaction. bulk_update
+        doesn't send signals, so the summaries of the affected menus and the search 
+        index are updated here.
+        """
+
+        if not sections:
+            return
+
+        with transaction.atomic():
+            Section.objects.bulk_update(sections, ['content', 'plain_text'])
+            for menu_id in {section.menu_id for section in sections if section.menu_id is not None}:
+                MenuSummary.refresh(menu_id)
+            update_search_index(sections)
+
+    def read_checkpoint(self, checkpoint: str) -> tuple:
+        """
+        Returns the last written section id and the content hashes of the 
+        batch that was being written, by section id.
+        """
+
+        if not checkpoint or not os.path.exists(checkpoint):
+            return 0, {}
+
+        try:
+            with open(checkpoint, encoding="utf-8") as file:
+                data = json.load(file)
+            pending = {int(section_id): digest for section_id, digest in data.get("pending", {}).items()}
+            return int(data["last_id"]), pending
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise CommandError(f"Unable to read checkpoint {checkpoint}: {e}") from e
+
+    def write_checkpoint(self, checkpoint: str, last_id: int, pending: dict = None):
+        if not checkpoint:
+            return
+
+        data = {"last_id": last_id}
+        if pending:
+            data["pending"] = pending
+
+        with open(checkpoint, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
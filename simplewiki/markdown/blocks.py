@@ -0,0 +1,95 @@
+"""
+Splits markdown into top level blocks that render independently.
+
+Blocks are separated by blank lines outside of fenced code. Blocks that
+continue the previous one (indented lines, further items of a loose list) stay
+part of it. Documents are not split at all when mistune may parse a block
+differently depending on its neighbours: document wide definitions (link
+references, footnotes, abbreviations), raw HTML that may contain blank lines,
+empty list items followed by a blank line, blockquotes followed by lines
+without a quote marker and fence-like lines that do not start a block. The
+splitting is tested against rendering the whole document, it is not a full
+markdown parser.
+"""
+
+# Python
+import re
+
+_fence = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+_list_item = re.compile(r"^ {0,3}([-+*]|\d{1,9}[.)])(\s|$)")
+_indented = re.compile(r"^( {2,}|\t)")
+_quote = re.compile(r"^ {0,3}>")
+_unsplittable = re.compile(
+    r"^ {0,3}(\[[^\]]+\]:"                                   # link reference definitions and footnotes
+    r"|\*\[[^\]]+\]:"                                         # abbreviations
+    r"|<(pre|script|style|textarea)(\s|>|$)|<!--|<\?|<![A-Za-z]|<!\[CDATA\[)",  # raw HTML spanning blank lines
+    re.MULTILINE | re.IGNORECASE)
+# An empty list item followed by a blank line makes the whole list loose
+_empty_item = re.compile(r"^ *([-+*]|\d{1,9}[.)])[ \t]*\n[ \t]*(\n|$)", re.MULTILINE)
+
+
+def split_blocks(text: str):
+    """
+    Splits markdown text into independently renderable top level blocks.
+
+    Args:
+        text (str): The markdown text
+
+    Returns:
+        list: Returns the blocks or None if the text can only be rendered as a whole
+    """
+
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+    if _unsplittable.search(text) or _empty_item.search(text):
+        return None
+
+    blocks = []
+    current = []
+    blank = []
+    fence = None
+    in_list = False
+    in_quote = False
+
+    for line in text.split("\n"):
+        if fence is not None:
+            current.append(line)
+            match = _fence.match(line)
+            if match and match.group(1)[0] == fence[0] and len(match.group(1)) >= len(fence) and not line.strip().strip(fence[0]):
+                fence = None
+            continue
+
+        if not line.strip():
+            blank.append(line)
+            in_quote = False
+            continue
+
+        if blank:
+            # Indented continuations and further items of a loose list belong to the current block
+            continues = _indented.match(line) or (in_list and _list_item.match(line))
+            if current and not continues:
+                blocks.append("\n".join(current))
+                current = []
+                in_list = False
+            elif current:
+                current.extend(blank)
+            blank = []
+
+        # Lines that continue or interrupt a blockquote and fence-like lines inside
+        # a block change how mistune parses the text around them
+        match = _fence.match(line)
+        if (in_quote and not _quote.match(line)) or (match and current):
+            return None
+
+        current.append(line)
+        in_quote = bool(_quote.match(line))
+        if _list_item.match(line):
+            in_list = True
+
+        if match:
+            fence = match.group(1)
+
+    if current:
+        blocks.append("\n".join(current))
+
+    return blocks
@@ -0,0 +1,143 @@
+"""
+Paragraph directives of the SimpleWikiRenderer.
+
+A directive is a paragraph that starts with "<name>:", for example
+"youtube:<video id>:<width>:<height>". All registered names are matched with
+one compiled pattern and the paragraph is split only once, the handler then
+receives the raw text and its ":" separated parts.
+"""
+
+# Python
+import re
+
+# Registered directive handlers, name -> handler(text, parts)
+DIRECTIVES = {}
+
+_prefix_pattern = None
+
+
+def register_directive(name: str):
+    """
+    Decorator that registers a handler for paragraphs starting with "<name>:".
+    The handler is called with the paragraph text and text.split(":") and
+    returns the HTML of the paragraph.
+
+    Args:
+        name (str): The directive name, without the colon
+    """
+
+    def decorator(handler):
+        global _prefix_pattern
+
+        DIRECTIVES[name] = handler
+        _prefix_pattern = None
+
+        return handler
+
+    return decorator
+
+
+def unregister_directive(name: str):
+    """
+    Removes the handler of a directive, unknown names are ignored.
+
+    Args:
+        name (str): The directive name, without the colon
+    """
+
+    global _prefix_pattern
+
+    DIRECTIVES.pop(name, None)
+    _prefix_pattern = None
+
+
+def get_prefix_pattern():
+    """
+    Returns the compiled pattern matching the prefix of all registered directives.
+    """
+
+    global _prefix_pattern
+
+    if _prefix_pattern is None:
+        names = sorted(DIRECTIVES, key=len, reverse=True)
+        _prefix_pattern = re.compile("(" + "|".join(re.escape(name) for name in names) + "):")
+
+    return _prefix_pattern
+
+
+def render_directive(text: str):
+    """
+    Renders a paragraph with the matching directive handler.
+
+    Args:
+        text (str): The paragraph text
+
+    Returns:
+        str: Returns the HTML of the directive or None if the paragraph is no directive
+    """
+
+    match = get_prefix_pattern().match(text)
+    if match is None:
+        return None
+
+    return DIRECTIVES[match.group(1)](text, text.split(":"))
+
+
+def get_part(parts: list, index: int, default: str) -> str:
+    """
+    Returns the stripped part at the given index or the default if there is none.
+    """
+
+    if index < len(parts):
+        return parts[index].strip()
+
+    return default
+
+
+@register_directive("youtube")
+def youtube(text: str, parts: list) -> str:
+    video_id = parts[1].strip() # Extract the YouTube video ID
+
+    if not video_id:
+        return text
+
+    # Get width and height if specified
+    width = get_part(parts, 2, "100%")
+    height = get_part(parts, 3, "720px")
+
+    return f'<iframe width="{width}" height="{height}" src="https://www.youtube.com/embed/{video_id}" frameborder="0" allowfullscreen></iframe>'
+
+
+@register_directive("vimeo")
+def vimeo(text: str, parts: list) -> str:
+    video_id = parts[1].strip() # Extract the Vimeo video ID
+
+    # Get width and height if specified
+    width = get_part(parts, 2, "100%")
+    height = get_part(parts, 3, "720px")
+
+    return f'<iframe width="{width}" height="{height}" src="https://player.vimeo.com/video/{video_id}" frameborder="0" allow="autoplay; encrypted-media" allowfullscreen=""></iframe>'
+
+
+ALERT_TYPES = ("success", "info", "warning", "danger")
+
+
+@register_directive("alert")
+def alert(text: str, parts: list) -> str:
+    alert_type = parts[1].strip()
+    alert_text = ":".join(parts[2:]).strip()
+
+    if alert_type not in ALERT_TYPES:
+        return text
+
+    return f'<div class="alert alert-{alert_type}" role="alert">{alert_text}</div>'
+
+
+@register_directive("gdrive")
+def gdrive(text: str, parts: list) -> str:
+    gdrive_folder_id = parts[1].strip()
+    gdrive_type = get_part(parts, 2, "list")
+    gdrive_width = get_part(parts, 3, "100%")
+    gdrive_height = get_part(parts, 4, "600px")
+
+    return f'<iframe src="https://drive.google.com/embeddedfolderview?id={gdrive_folder_id}#{gdrive_type}" width="{gdrive_width}" height="{gdrive_height}" style="border:0px;"></iframe>'
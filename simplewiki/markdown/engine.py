@@ -0,0 +1,189 @@
+"""
+Shared markdown engine.
+
+The mistune parser is built once per thread and reused, rendered HTML is kept
+in a small LRU cache keyed by the hash of the markdown text. Texts that are not
+cached are split into top level blocks, only blocks that changed since they
+were last rendered go through the parser.
+"""
+
+# Python
+import hashlib
+import threading
+from collections import OrderedDict
+
+import mistune
+
+from ..app_settings import simplewiki_markdown_cache_size, simplewiki_markdown_block_cache_size
+from .blocks import split_blocks
+from .renderer import SimpleWikiRenderer
+
+# Plugins used for all markdown in SimpleWiki
+MARKDOWN_PLUGINS = ['strikethrough', 'url', 'footnotes', 'abbr', 'mark', 'insert', 'superscript', 'subscript', 'table']
+
+_local = threading.local()
+
+
+def create_markdown() -> mistune.Markdown:
+    """
+    Builds a new markdown parser with the SimpleWikiRenderer and all plugins.
+
+    Returns:
+        mistune.Markdown: Returns the configured parser
+    """
+
+    return mistune.create_markdown(escape=True,
+                                   renderer=SimpleWikiRenderer(),
+                                   plugins=MARKDOWN_PLUGINS)
+
+
+def get_markdown() -> mistune.Markdown:
+    """
+    Returns the markdown parser of the current thread. The parser is only
+    built on first use, so threads never share a parser while rendering.
+
+    Returns:
+        mistune.Markdown: Returns the configured parser
+    """
+
+    markdown = getattr(_local, 'markdown', None)
+    if markdown is None:
+        markdown = create_markdown()
+        _local.markdown = markdown
+
+    return markdown
+
+
+class RenderCache:
+    """
+    Thread-safe LRU cache of rendered HTML, keyed by the sha1 of the markdown text.
+
+    Attributes:
+        max_size (int): The maximum number of entries, 0 disables the cache.
+        hits (int): The number of lookups answered from the cache.
+        misses (int): The number of lookups that had to render.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """
+        Returns the cached HTML or None and counts the hit or miss.
+        """
+
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+
+            return html
+
+    def set(self, key: str, html: str):
+        """
+        Stores the HTML and drops the least recently used entries if the cache is full.
+        """
+
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes all entries and resets the counters.
+        """
+
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> dict:
+        """
+        Returns the counters and the current size of the cache.
+        """
+
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'size': len(self._entries),
+                    'max_size': self.max_size}
+
+    def __len__(self):
+        return len(self._entries)
+
+
+render_cache = RenderCache(simplewiki_markdown_cache_size)
+block_cache = RenderCache(simplewiki_markdown_block_cache_size)
+
+
+def render_blocks(text: str) -> str:
+    """
+    Converts markdown text to HTML block by block. Blocks that have been 
+    rendered before are taken from the block cache, so the cost of rendering 
+    an edited text depends on the size of the edit, not of the text.
+
+    Args:
+        text (str): The markdown text to convert
+
+    Returns:
+        str: Returns the resulting HTML
+    """
+
+    markdown = get_markdown()
+
+    blocks = split_blocks(text) if block_cache.max_size > 0 else None
+    if blocks is None:
+        return markdown(text)
+
+    html_blocks = []
+    for block in blocks:
+        key = RenderCache.key(block)
+        html = block_cache.get(key)
+        if html is None:
+            html = markdown(block)
+            block_cache.set(key, html)
+        html_blocks.append(html)
+
+    return "".join(html_blocks)
+
+
+def render_markdown(text: str) -> str:
+    """
+    Converts markdown text to HTML with the shared parser. Texts that have
+    been rendered before are answered from the LRU cache, all others are 
+    rendered block by block.
+
+    Args:
+        text (str): The markdown text to convert
+
+    Returns:
+        str: Returns the resulting HTML
+    """
+
+    if text is None:
+        text = ""
+
+    key = RenderCache.key(text)
+    html = render_cache.get(key)
+    if html is None:
+        html = render_blocks(text)
+        render_cache.set(key, html)
+
+    return html
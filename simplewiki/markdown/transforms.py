@@ -0,0 +1,68 @@
+"""
+Content transforms used by the simplewiki_rerender command.
+
+The functions only work on strings and don't touch the database, so they can
+run in worker processes of a process pool.
+"""
+
+# Python
+import re
+
+from .engine import render_blocks
+
+_trailing_whitespace = re.compile(r"[ \t]+$", re.MULTILINE)
+
+
+def normalize_content(text: str) -> str:
+    """
+    Normalizes line endings to "\\n", removes trailing whitespace of every line
+    and leading and trailing blank lines.
+
+    Args:
+        text (str): The section content
+
+    Returns:
+        str: Returns the normalized content
+    """
+
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = _trailing_whitespace.sub("", text)
+
+    return text.strip("\n")
+
+
+def render_content(text: str) -> str:
+    """
+    Converts markdown content to HTML with the shared parser of the worker, 
+    blocks repeated across sections are only rendered once per worker.
+
+    Args:
+        text (str): The markdown content
+
+    Returns:
+        str: Returns the resulting HTML
+    """
+
+    return render_blocks(text)
+
+
+TRANSFORMS = {
+    'normalize': normalize_content,
+    'markdown': render_content,
+}
+
+
+def transform_section(item: tuple) -> tuple:
+    """
+    Applies a transform to the content of one section.
+
+    Args:
+        item (tuple): The transform name, section id and content
+
+    Returns:
+        tuple: Returns the section id and the new content
+    """
+
+    mode, section_id, content = item
+
+    return section_id, TRANSFORMS[mode](content)
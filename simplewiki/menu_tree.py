@@ -0,0 +1,117 @@
+"""
+SimpleWiki Menu Tree
+
+Loads all menus with a single query and arranges them into an immutable 
+parent -> children tree, so views and templates don't need to query the 
+children of every parent menu on their own.
+"""
+
+# Python imports
+from types import MappingProxyType
+
+# Custom imports
+from .models import Menu
+
+
+class MenuTree:
+    """
+    Represents all menus of the wiki as an immutable parent -> children tree.
+
+    Attributes:
+        menus (tuple): All menus, sorted by their index.
+        roots (tuple): All parent menus (menus without a parent), sorted by their index.
+    """
+
+    def __init__(self, menus):
+        menus = tuple(menus)
+        by_id = {menu.id: menu for menu in menus}
+
+        children = {}
+        for menu in menus:
+            if menu.parent_id is not None and menu.parent_id in by_id:
+                # Fill the foreign key cache, so menu.parent doesn't query again
+                menu.parent = by_id[menu.parent_id]
+                children.setdefault(menu.parent_id, []).append(menu)
+
+        self.menus = menus
+        self.roots = tuple(menu for menu in menus if menu.parent_id is None)
+        self._by_id = MappingProxyType(by_id)
+        self._by_path = MappingProxyType({menu.path: menu for menu in menus})
+        self._children = MappingProxyType({parent_id: tuple(items) for parent_id, items in children.items()})
+
+    @classmethod
+    def load(cls):
+        """
+        Loads all menus with one query and builds the tree.
+
+        Returns:
+            MenuTree: Returns the tree of all menus
+        """
+
+        return cls(Menu.objects.select_related('summary').order_by('index', 'id'))
+
+    def get(self, path: str):
+        """
+        Returns the menu with the given path or None if no such menu exists.
+        """
+
+        return self._by_path.get(path)
+
+    def get_by_id(self, menu_id: int):
+        """
+        Returns the menu with the given id or None if no such menu exists.
+        """
+
+        return self._by_id.get(menu_id)
+
+    def children(self, menu) -> tuple:
+        """
+        Returns all submenus of the given menu, sorted by their index.
+
+        Args:
+            menu (Menu): The parent menu
+
+        Returns:
+            tuple: Returns the submenus, an empty tuple if there are none
+        """
+
+        if menu is None:
+            return ()
+
+        return self._children.get(menu.id, ())
+
+    def has_children(self, menu) -> bool:
+        """
+        Returns True if the given menu has at least one submenu.
+        """
+
+        return len(self.children(menu)) > 0
+
+    def __iter__(self):
+        return iter(self.menus)
+
+    def __len__(self):
+        return len(self.menus)
+
+
+def get_menu_tree(request=None) -> MenuTree:
+    """
+    Returns the menu tree for the current request. The tree is loaded once per 
+    request and then shared between the view and its templates.
+
+    Args:
+        request (WSGIRequest): The standard django request, optional
+
+    Returns:
+        MenuTree: Returns the tree of all menus
+    """
+
+    if request is None:
+        return MenuTree.load()
+
+    menu_tree = getattr(request, '_simplewiki_menu_tree', None)
+    if menu_tree is None:
+        menu_tree = MenuTree.load()
+        request._simplewiki_menu_tree = menu_tree
+
+    return menu_tree
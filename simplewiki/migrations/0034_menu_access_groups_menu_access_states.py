@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('authentication', '0015_user_profiles'),
+        ('simplewiki', '0033_section_last_edit_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menu',
+            name='access_groups',
+            field=models.ManyToManyField(blank=True, related_name='+', to='auth.group'),
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='access_states',
+            field=models.ManyToManyField(blank=True, related_name='+', to='authentication.state'),
+        ),
+    ]
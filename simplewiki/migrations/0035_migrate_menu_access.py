@@ -0,0 +1,76 @@
+# Moves the comma separated menu groups and states into the new access relations
+
+from django.db import migrations
+
+# Alliance Auth
+from allianceauth.services.hooks import get_extension_logger
+
+# Logging
+from app_utils.logging import LoggerAddTag
+from simplewiki import __title__
+
+logger = LoggerAddTag(get_extension_logger(__name__), __title__)
+
+# The group name is kept here, so later changes to simplewiki.access don't change this migration
+RESTRICTED_GROUP = "SimpleWiki: unmatched access"
+
+
+def split_names(value):
+    """
+    Splits a comma separated list of names, ignoring empty and "none" entries
+    """
+
+    if not value:
+        return []
+
+    return [name.strip() for name in value.split(',') if name.strip() and name.strip().lower() != "none"]
+
+
+def forwards(apps, schema_editor):
+    Menu = apps.get_model('simplewiki', 'Menu')
+    Group = apps.get_model('auth', 'Group')
+    State = apps.get_model('authentication', 'State')
+
+    for menu in Menu.objects.all():
+        # Only existing groups and states are assigned, a typo must not create a group that could grant access later
+        group_names = split_names(menu.groups)
+        groups = list(Group.objects.filter(name__in=group_names))
+        unknown_groups = sorted(set(group_names) - {group.name for group in groups})
+        if unknown_groups:
+            logger.warning(f'Menu "{menu.title}": ignoring unknown groups {", ".join(unknown_groups)}')
+
+        state_names = split_names(menu.states)
+        states = list(State.objects.filter(name__in=state_names))
+        unknown_states = sorted(set(state_names) - {state.name for state in states})
+        if unknown_states:
+            logger.warning(f'Menu "{menu.title}": ignoring unknown states {", ".join(unknown_states)}')
+
+        # Nobody could access a menu whose groups or states all match nothing, 
+        # without any relations it would become visible for everyone
+        if (group_names and not groups) or (state_names and not states):
+            groups = [Group.objects.get_or_create(name=RESTRICTED_GROUP)[0]]
+            logger.error(f'Menu "{menu.title}" only had unknown groups or states and is now restricted to '
+                         f'the group "{RESTRICTED_GROUP}", assign its access in the menu editor')
+
+        menu.access_groups.set(groups)
+        menu.access_states.set(states)
+
+
+def backwards(apps, schema_editor):
+    Menu = apps.get_model('simplewiki', 'Menu')
+
+    for menu in Menu.objects.all():
+        menu.groups = ",".join(menu.access_groups.order_by('name').values_list('name', flat=True))
+        menu.states = ",".join(menu.access_states.order_by('name').values_list('name', flat=True))
+        menu.save(update_fields=['groups', 'states'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simplewiki', '0034_menu_access_groups_menu_access_states'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simplewiki', '0035_migrate_menu_access'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='menu',
+            name='groups',
+        ),
+        migrations.RemoveField(
+            model_name='menu',
+            name='states',
+        ),
+        migrations.RenameField(
+            model_name='menu',
+            old_name='access_groups',
+            new_name='groups',
+        ),
+        migrations.RenameField(
+            model_name='menu',
+            old_name='access_states',
+            new_name='states',
+        ),
+        migrations.AlterField(
+            model_name='menu',
+            name='groups',
+            field=models.ManyToManyField(blank=True, related_name='simplewiki_menus', to='auth.group'),
+        ),
+        migrations.AlterField(
+            model_name='menu',
+            name='states',
+            field=models.ManyToManyField(blank=True, related_name='simplewiki_menus', to='authentication.state'),
+        ),
+    ]
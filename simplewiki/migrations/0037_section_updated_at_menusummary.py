@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simplewiki', '0036_remove_menu_groups_remove_menu_states_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuSummary',
+            fields=[
+                ('menu', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='simplewiki.menu')),
+                ('section_count', models.IntegerField(default=0)),
+                ('last_edit', models.CharField(blank=True, max_length=255)),
+                ('last_edit_id', models.IntegerField(default=0)),
+                ('last_edit_at', models.DateTimeField(blank=True, null=True)),
+                ('content_version', models.IntegerField(default=0)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='section',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Backfills the section edit times and the menu summaries
+
+import datetime
+
+from django.conf import settings
+from django.db import migrations
+
+
+def forwards(apps, schema_editor):
+    Menu = apps.get_model('simplewiki', 'Menu')
+    Section = apps.get_model('simplewiki', 'Section')
+    MenuSummary = apps.get_model('simplewiki', 'MenuSummary')
+
+    # Existing sections only know the date of their last edit
+    for section in Section.objects.all():
+        updated_at = datetime.datetime.combine(section.last_edit_date, datetime.time.min)
+        if settings.USE_TZ:
+            updated_at = updated_at.replace(tzinfo=datetime.timezone.utc)
+        Section.objects.filter(pk=section.pk).update(updated_at=updated_at)
+
+    for menu in Menu.objects.all():
+        sections = Section.objects.filter(menu=menu)
+        latest = sections.order_by('-updated_at', '-id').first()
+
+        MenuSummary.objects.update_or_create(
+            menu=menu,
+            defaults={'section_count': sections.count(),
+                      'last_edit': latest.last_edit if latest else "",
+                      'last_edit_id': latest.last_edit_id if latest else 0,
+                      'last_edit_at': latest.updated_at if latest else None,
+                      'content_version': 1})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simplewiki', '0037_section_updated_at_menusummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
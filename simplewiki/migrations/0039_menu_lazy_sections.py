@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simplewiki', '0038_backfill_menu_summaries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menu',
+            name='lazy_sections',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Creates the full-text search index of the sections
+
+from django.db import migrations
+from django.utils.html import strip_tags
+
+# Alliance Auth
+from allianceauth.services.hooks import get_extension_logger
+
+# Logging
+from app_utils.logging import LoggerAddTag
+from simplewiki import __title__
+
+logger = LoggerAddTag(get_extension_logger(__name__), __title__)
+
+# The index names are kept here, so later changes to simplewiki.search_index don't change this migration
+FTS_TABLE = "simplewiki_section_fts"
+FULLTEXT_INDEX = "simplewiki_section_fulltext"
+
+
+def forwards(apps, schema_editor):
+    """
+    Creates the full-text index of the section titles and contents. Nothing is
+    created for databases without full-text support, they use the inverted index.
+    """
+
+    vendor = schema_editor.connection.vendor
+    Section = apps.get_model('simplewiki', 'Section')
+
+    if vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            try:
+                cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(title, body, tokenize='unicode61 remove_diacritics 2')")
+            except Exception as e:
+                logger.warning(f"SQLite has no FTS5 support, search uses the inverted index instead: {e}")
+                return
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            for section_id, title, content in Section.objects.using(schema_editor.connection.alias).values_list('id', 'title', 'content').iterator():
+                cursor.execute(f"INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (%s, %s, %s)",
+                               [section_id, title, strip_tags(content)])
+    elif vendor == 'postgresql':
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {FULLTEXT_INDEX} ON simplewiki_section "
+                              f"USING GIN (to_tsvector('simple', title || ' ' || content))")
+    elif vendor == 'mysql':
+        schema_editor.execute(f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX} ON simplewiki_section (title, content)")
+
+
+def backwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {FULLTEXT_INDEX}")
+    elif vendor == 'mysql':
+        schema_editor.execute(f"DROP INDEX {FULLTEXT_INDEX} ON simplewiki_section")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simplewiki', '0039_menu_lazy_sections'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,120 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:21
+
+# Python
+import html
+import re
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+# Alliance Auth
+from allianceauth.services.hooks import get_extension_logger
+
+# Logging
+from app_utils.logging import LoggerAddTag
+from simplewiki import __title__
+
+logger = LoggerAddTag(get_extension_logger(__name__), __title__)
+
+# The index names and text conversion are kept here, so later changes to
+# simplewiki.search_index and simplewiki.text don't change this migration.
+# simplewiki_backfill_plain_text recomputes the plain text with the current conversion.
+FTS_TABLE = "simplewiki_section_fts"
+FULLTEXT_INDEX = "simplewiki_section_fulltext"
+
+_block_tags = re.compile(r"</?(p|div|br|hr|li|ul|ol|tr|td|th|table|thead|tbody|h[1-6]|blockquote|pre|section|article|iframe)\b[^>]*>", re.IGNORECASE)
+_invisible = re.compile(r"<(script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_whitespace = re.compile(r"\s+")
+
+
+def html_to_text(content):
+    if not content:
+        return ""
+
+    text = _invisible.sub(" ", content)
+    text = _block_tags.sub(" ", text)
+    text = html.unescape(strip_tags(text))
+
+    return _whitespace.sub(" ", text).strip()
+
+
+def backfill(apps, schema_editor):
+    Section = apps.get_model('simplewiki', 'Section')
+    alias = schema_editor.connection.alias
+
+    batch = []
+    for section in Section.objects.using(alias).order_by('id').only('id', 'content', 'plain_text').iterator(chunk_size=500):
+        section.plain_text = html_to_text(section.content)
+        batch.append(section)
+        if len(batch) >= 500:
+            Section.objects.using(alias).bulk_update(batch, ['plain_text'])
+            batch = []
+
+    if batch:
+        Section.objects.using(alias).bulk_update(batch, ['plain_text'])
+
+
+def drop_fulltext_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {FULLTEXT_INDEX}")
+    elif vendor == 'mysql':
+        schema_editor.execute(f"DROP INDEX {FULLTEXT_INDEX} ON simplewiki_section")
+
+
+def create_fulltext_index(apps, schema_editor, column):
+    """
+    Creates the full-text index of the section titles and the given text column.
+    Nothing is created for databases without full-text support.
+    """
+
+    vendor = schema_editor.connection.vendor
+    Section = apps.get_model('simplewiki', 'Section')
+
+    if vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            try:
+                cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(title, body, tokenize='unicode61 remove_diacritics 2')")
+            except Exception as e:
+                logger.warning(f"SQLite has no FTS5 support, search uses the inverted index instead: {e}")
+                return
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            for section_id, title, text in Section.objects.using(schema_editor.connection.alias).values_list('id', 'title', column).iterator():
+                body = text if column == 'plain_text' else html_to_text(text)
+                cursor.execute(f"INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (%s, %s, %s)",
+                               [section_id, title, body])
+    elif vendor == 'postgresql':
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {FULLTEXT_INDEX} ON simplewiki_section "
+                              f"USING GIN (to_tsvector('simple', title || ' ' || {column}))")
+    elif vendor == 'mysql':
+        schema_editor.execute(f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX} ON simplewiki_section (title, {column})")
+
+
+def index_plain_text(apps, schema_editor):
+    drop_fulltext_index(schema_editor)
+    create_fulltext_index(apps, schema_editor, 'plain_text')
+
+
+def index_content(apps, schema_editor):
+    drop_fulltext_index(schema_editor)
+    create_fulltext_index(apps, schema_editor, 'content')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simplewiki', '0040_section_fulltext_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='section',
+            name='plain_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.RunPython(index_plain_text, index_content),
+    ]
@@ -0,0 +1,53 @@
+# Creates the trigram index for fuzzy searches on PostgreSQL
+
+from django.db import migrations, transaction
+
+# Alliance Auth
+from allianceauth.services.hooks import get_extension_logger
+
+# Logging
+from app_utils.logging import LoggerAddTag
+from simplewiki import __title__
+
+logger = LoggerAddTag(get_extension_logger(__name__), __title__)
+
+# The index name is kept here, so later changes to simplewiki.search_index don't change this migration
+TRIGRAM_INDEX = "simplewiki_section_trigram"
+
+
+def forwards(apps, schema_editor):
+    """
+    Installs pg_trgm and creates a trigram index of the titles and plain texts
+    on PostgreSQL. Without the permission to install the extension, fuzzy
+    searches use the in-memory trigram index.
+    """
+
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except Exception as e:
+        logger.warning(f"Unable to install pg_trgm, fuzzy search uses the in-memory trigram index instead: {e}")
+        return
+
+    schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON simplewiki_section "
+                          f"USING GIN (title gin_trgm_ops, plain_text gin_trgm_ops)")
+
+
+def backwards(apps, schema_editor):
+    # The extension stays installed
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simplewiki', '0041_section_plain_text'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
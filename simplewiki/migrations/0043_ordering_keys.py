@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:35
+
+from django.db import migrations, models
+
+# Distance between the keys of two neighbouring items, kept here so later changes to simplewiki.ordering don't change this migration
+ORDER_GAP = 1024
+
+
+def spread_siblings(model, group_field, using):
+    """
+    Spreads the indexes of all siblings ORDER_GAP apart, keeping their order
+    """
+
+    items = (model.objects.using(using)
+                          .order_by(group_field, 'index', 'id')
+                          .only('id', group_field, 'index'))
+
+    changed = []
+    position = 0
+    previous_group = object()
+    for item in items:
+        group = getattr(item, group_field)
+        position = position + 1 if group == previous_group else 0
+        previous_group = group
+
+        if item.index != position * ORDER_GAP:
+            item.index = position * ORDER_GAP
+            changed.append(item)
+
+    model.objects.using(using).bulk_update(changed, ['index'], batch_size=500)
+
+
+def spread_keys(apps, schema_editor):
+    # Existing indexes are consecutive numbers, spread them out so items fit in between
+    alias = schema_editor.connection.alias
+    spread_siblings(apps.get_model('simplewiki', 'Menu'), 'parent_id', alias)
+    spread_siblings(apps.get_model('simplewiki', 'Section'), 'menu_id', alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simplewiki', '0042_section_trigram_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='menu',
+            index=models.Index(fields=['parent', 'index'], name='simplewiki_menu_order'),
+        ),
+        migrations.AddIndex(
+            model_name='section',
+            index=models.Index(fields=['menu', 'index'], name='simplewiki_section_order'),
+        ),
+        migrations.RunPython(spread_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simplewiki', '0043_ordering_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SectionRevision',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('base', models.PositiveIntegerField()),
+                ('is_snapshot', models.BooleanField(default=False)),
+                ('data', models.BinaryField()),
+                ('checksum', models.CharField(max_length=40)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('last_edit', models.CharField(blank=True, max_length=255)),
+                ('last_edit_id', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('section', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='simplewiki.section')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='sectionrevision',
+            constraint=models.UniqueConstraint(fields=('section', 'number'), name='simplewiki_revision_number'),
+        ),
+    ]
@@ -6,7 +6,16 @@ SectionItem model -> the sections that will appear under a menu
 """
 
 # Django
+from django.contrib.auth.models import Group
 from django.db import models
+from django.db.models import Count, Exists, F, OuterRef
+from django.utils import timezone
+
+# Alliance Auth
+from allianceauth.authentication.models import State
+
+# Custom imports
+from .text import html_to_text
 
 
 class General(models.Model):
@@ -22,6 +31,54 @@ class General(models.Model):
 
 # v2
 
+class MenuQuerySet(models.QuerySet):
+    """
+    QuerySet for menus, filters menus by group and state access in SQL
+    """
+
+    def accessible_by(self, group_ids, state_id):
+        """
+        Filters all menus which can be accessed with the given groups and state. 
+        A menu without groups is accessible for every group, a menu without states 
+        is accessible for every state. Otherwise the user needs at least one 
+        of the menu's groups and one of the menu's states.
+
+        Args:
+            group_ids (iterable): The ids of all groups held by the user
+            state_id (int): The id of the user's state
+
+        Returns:
+            MenuQuerySet: Returns the filtered queryset
+        """
+
+        group_access = Menu.groups.through.objects.filter(menu_id=OuterRef('pk'))
+        state_access = Menu.states.through.objects.filter(menu_id=OuterRef('pk'))
+
+        return self.filter(
+            ~Exists(group_access) | Exists(group_access.filter(group_id__in=group_ids)),
+            ~Exists(state_access) | Exists(state_access.filter(state_id=state_id)),
+        )
+
+    def accessible_ids(self, group_ids, state_id) -> frozenset:
+        """
+        Returns the ids of all menus which can be accessed with the given groups 
+        and state. A submenu is only accessible if its parent menu is accessible 
+        as well.
+
+        Args:
+            group_ids (iterable): The ids of all groups held by the user
+            state_id (int): The id of the user's state
+
+        Returns:
+            frozenset: Returns the ids of all accessible menus
+        """
+
+        rows = self.accessible_by(group_ids, state_id).values_list('id', 'parent_id')
+        accessible = {menu_id: parent_id for menu_id, parent_id in rows}
+
+        return frozenset(menu_id for menu_id, parent_id in accessible.items()
+                         if parent_id is None or parent_id in accessible)
+
 class Menu(models.Model):
     """
     Represents a menu item in the SimpleWiki application.
@@ -32,8 +89,9 @@ class Menu(models.Model):
         icon (str): The icon of the menu item.
         path (str): The path of the menu item.
         parent (Menu): The parent menu item, if any.
-        groups (str): The groups that have access to the menu item.
-        states (str): The states in which the menu item is visible.
+        groups (Group): The groups that have access to the menu item, none means every group.
+        states (State): The states in which the menu item is visible, none means every state.
+        lazy_sections (bool): Whether the section bodies are loaded once they scroll into view.
     """
     index = models.IntegerField(default=0,
                                 unique=False,
@@ -55,12 +113,22 @@ class Menu(models.Model):
         null=True,
         blank=True
     )
-    groups = models.CharField(max_length=255,
-                              null=False,
-                              blank=True)
-    states = models.CharField(max_length=255,
-                              null=False,
-                              blank=True)
+    groups = models.ManyToManyField(Group,
+                                    related_name='simplewiki_menus',
+                                    blank=True)
+    states = models.ManyToManyField(State,
+                                    related_name='simplewiki_menus',
+                                    blank=True)
+    lazy_sections = models.BooleanField(default=False,
+                                        null=False)
+
+    objects = MenuQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Submenus of a parent in their order, see simplewiki.ordering
+            models.Index(fields=['parent', 'index'], name='simplewiki_menu_order'),
+        ]
 
     def __str__(self):
         if self.parent:
@@ -73,6 +141,7 @@ class Section(models.Model):
     Represents a section in the SimpleWiki application.
 
     A section is a container for content that is organized under a title and an optional menu.
+    The plain text of the content is stored next to it for search and search snippets.
     """
 
     title = models.CharField(max_length=255,
@@ -94,6 +163,11 @@ class Section(models.Model):
                             blank=True)
     content = models.TextField(null=False,
                                blank=True)
+    # content without HTML tags and with normalized whitespace, set on save
+    plain_text = models.TextField(null=False,
+                                  blank=True,
+                                  default="",
+                                  editable=False)
     # editor's charcter name
     last_edit = models.CharField(max_length=255,
                                  null=False,
@@ -102,18 +176,151 @@ class Section(models.Model):
     last_edit_date = models.DateField(auto_now=True, 
                                       null=False, 
                                       blank=True)
+    # edited on (date and time)
+    updated_at = models.DateTimeField(auto_now=True,
+                                      null=False,
+                                      blank=True)
     # editor's character id
     last_edit_id = models.IntegerField(default=0,
                                        null=False,
                                        blank=True,
                                        unique=False)
 
+    class Meta:
+        indexes = [
+            # Sections of a page in their order, see simplewiki.ordering
+            models.Index(fields=['menu', 'index'], name='simplewiki_section_order'),
+        ]
+
     def __str__(self):
         if self.menu:
             return self.title + " (" + self.menu.title + ")"
         else:
             return self.title
 
+    def save(self, *args, **kwargs):
+        self.plain_text = html_to_text(self.content)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'plain_text'}
+
+        super().save(*args, **kwargs)
+
+class MenuSummary(models.Model):
+    """
+    Represents the denormalized section summary of a menu in the SimpleWiki application.
+
+    The summary is updated whenever a section of the menu is saved or deleted, so 
+    pages don't need to aggregate over their sections on every view.
+
+    Attributes:
+        menu (Menu): The summarized menu.
+        section_count (int): The number of sections under the menu.
+        last_edit (str): The character name of the latest editor.
+        last_edit_id (int): The character id of the latest editor.
+        last_edit_at (datetime): The time of the latest section edit.
+        content_version (int): Incremented on every change of the menu's sections.
+        changed_at (datetime): The time of the latest change, including deleted sections.
+    """
+
+    menu = models.OneToOneField(Menu,
+                                on_delete=models.CASCADE,
+                                related_name='summary',
+                                primary_key=True)
+    section_count = models.IntegerField(default=0,
+                                        null=False)
+    last_edit = models.CharField(max_length=255,
+                                 null=False,
+                                 blank=True)
+    last_edit_id = models.IntegerField(default=0,
+                                       null=False)
+    last_edit_at = models.DateTimeField(null=True,
+                                        blank=True)
+    content_version = models.IntegerField(default=0,
+                                          null=False)
+    changed_at = models.DateTimeField(default=timezone.now,
+                                      null=False)
+
+    def __str__(self):
+        return self.menu.title + " (v" + str(self.content_version) + ")"
+
+    @classmethod
+    def refresh(cls, menu_id: int):
+        """
+        Recalculates the summary of a menu from its sections and increments its 
+        content version.
+
+        Args:
+            menu_id (int): The id of the menu to refresh
+        """
+
+        sections = Section.objects.filter(menu_id=menu_id)
+        section_count = sections.aggregate(count=Count('id'))['count']
+        latest = sections.order_by('-updated_at', '-id').values('last_edit', 'last_edit_id', 'updated_at').first()
+
+        cls.objects.get_or_create(menu_id=menu_id)
+        cls.objects.filter(menu_id=menu_id).update(
+            section_count=section_count,
+            last_edit=latest['last_edit'] if latest else "",
+            last_edit_id=latest['last_edit_id'] if latest else 0,
+            last_edit_at=latest['updated_at'] if latest else None,
+            content_version=F('content_version') + 1,
+            changed_at=timezone.now())
+
+class SectionRevision(models.Model):
+    """
+    Represents one stored version of a section's content in the SimpleWiki application.
+
+    Every few revisions the full content is stored as a snapshot, the revisions 
+    in between only store the compressed difference to the revision before them,
+    see simplewiki.revisions. The metadata fields can be read without the data.
+
+    Attributes:
+        section (Section): The section this revision belongs to.
+        number (int): The revision number, counting from 1 per section.
+        base (int): The number of the snapshot this revision is reconstructed from.
+        is_snapshot (bool): True if data holds the full content.
+        data (bytes): The zlib compressed content or difference.
+        checksum (str): The SHA-1 of the content.
+        size (int): The length of the content.
+        title (str): The section title at the time of the revision.
+        last_edit (str): The character name of the editor.
+        last_edit_id (int): The character id of the editor.
+        created_at (datetime): The time of the edit.
+    """
+
+    section = models.ForeignKey(Section,
+                                on_delete=models.CASCADE,
+                                related_name='revisions')
+    number = models.PositiveIntegerField(null=False)
+    base = models.PositiveIntegerField(null=False)
+    is_snapshot = models.BooleanField(default=False,
+                                      null=False)
+    data = models.BinaryField(null=False)
+    checksum = models.CharField(max_length=40,
+                                null=False)
+    size = models.PositiveIntegerField(default=0,
+                                       null=False)
+    title = models.CharField(max_length=255,
+                             null=False,
+                             blank=True)
+    last_edit = models.CharField(max_length=255,
+                                 null=False,
+                                 blank=True)
+    last_edit_id = models.IntegerField(default=0,
+                                       null=False)
+    created_at = models.DateTimeField(default=timezone.now,
+                                      null=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['section', 'number'], name='simplewiki_revision_number'),
+        ]
+
+    def __str__(self):
+        return self.title + " (r" + str(self.number) + ")"
+
 # v1
 # TODO: Will be removed in a later version, used for now to store old data
 
@@ -0,0 +1,127 @@
+"""
+SimpleWiki Ordering
+
+Menus and sections are sorted by an integer index. Siblings are spread
+ORDER_GAP apart, so an item can be moved between two others by giving it the
+key in the middle of their keys, without renumbering the other siblings.
+Only once two neighbours have run out of room, the siblings are spread out
+again. New items are appended ORDER_GAP after the last sibling.
+
+Menus are siblings if they have the same parent, sections if they belong to
+the same menu. Both have a (parent, index) / (menu, index) database index.
+"""
+
+# Django
+from django.db import transaction
+from django.db.models import Max
+
+# Distance between the keys of two neighbouring items after a rebalance
+ORDER_GAP = 1024
+
+
+def key_between(before, after):
+    """
+    Returns a key between the keys of two neighbouring items.
+
+    Args:
+        before (int): The key of the previous item, None for the first position
+        after (int): The key of the next item, None for the last position
+
+    Returns:
+        int: Returns the new key or None if there is no room between the two keys
+    """
+
+    if before is None and after is None:
+        return 0
+    if before is None:
+        return after - ORDER_GAP
+    if after is None:
+        return before + ORDER_GAP
+    if after - before > 1:
+        return (before + after) // 2
+
+    return None
+
+
+def rebalance(items: list, field: str = 'index') -> list:
+    """
+    Spreads the keys of the given sorted siblings ORDER_GAP apart, the caller
+    writes the changed items, e.g. with one bulk_update.
+
+    Args:
+        items (list): The siblings in their current order
+        field (str): The name of the key field
+
+    Returns:
+        list: Returns the items whose key changed
+    """
+
+    changed = []
+    for position, item in enumerate(items):
+        key = position * ORDER_GAP
+        if getattr(item, field) != key:
+            setattr(item, field, key)
+            changed.append(item)
+
+    return changed
+
+
+def append_key(siblings, field: str = 'index') -> int:
+    """
+    Returns the key for a new item behind all given siblings.
+
+    Args:
+        siblings (QuerySet): The future siblings of the new item
+        field (str): The name of the key field
+
+    Returns:
+        int: Returns the new key
+    """
+
+    last = siblings.aggregate(last=Max(field))['last']
+
+    return 0 if last is None else last + ORDER_GAP
+
+
+def rebalance_keys(model, group_field: str, field: str = 'index', min_gap: int = None, 
+                   using: str = 'default', dry_run: bool = False) -> int:
+    """
+    Spreads the keys of siblings ORDER_GAP apart, keeping their order. Used 
+    by migration 0043, the simplewiki_rebalance_order command and the 
+    rebalance task. Writes happen with one bulk update per sibling group in 
+    one transaction and don't send signals, the order itself doesn't change.
+
+    Args:
+        model (Model): The (historical) Menu or Section model
+        group_field (str): The field grouping the siblings, "parent_id" or "menu_id"
+        field (str): The name of the key field
+        min_gap (int): Only siblings with two neighbours closer than this, None for all siblings
+        using (str): The database alias
+        dry_run (bool): Only count the items that would change
+
+    Returns:
+        int: Returns the number of items with a new key
+    """
+
+    changed = 0
+    with transaction.atomic(using=using):
+        items = (model.objects.using(using)
+                              .select_for_update()
+                              .order_by(group_field, field, 'id')
+                              .only('id', group_field, field))
+
+        groups = {}
+        for item in items:
+            groups.setdefault(getattr(item, group_field), []).append(item)
+
+        for siblings in groups.values():
+            keys = [getattr(item, field) for item in siblings]
+            if min_gap is not None and all(after - before >= min_gap for before, after in zip(keys, keys[1:])):
+                continue
+
+            updated = rebalance(siblings, field)
+            changed += len(updated)
+            if updated and not dry_run:
+                model.objects.using(using).bulk_update(updated, [field], batch_size=500)
+
+    return changed
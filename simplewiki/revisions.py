@@ -0,0 +1,234 @@
+"""
+SimpleWiki Revisions
+
+Every saved edit of a section is stored as a revision. Storing the full content
+of every edit would grow quickly for large pages that are edited often, so only
+every SIMPLEWIKI_REVISION_SNAPSHOT_INTERVAL-th revision is a full snapshot. The
+revisions in between store the difference to the revision before them. Both
+are compressed with zlib.
+
+The content is split into tokens that end with a line break or a ">", so the
+single-line HTML of the editor still diffs per tag. A difference is a list of
+[start, end] token ranges copied from the previous content and strings with
+new text.
+
+A revision is reconstructed from its snapshot and at most interval - 1
+differences, read with one query. A difference that wouldn't be smaller than
+the full content is stored as a snapshot instead.
+"""
+
+# Python
+import difflib
+import hashlib
+import json
+import re
+import zlib
+
+# Django
+from django.db import transaction
+from django.db.models import Subquery
+from django.utils import timezone
+
+# Custom imports
+from .app_settings import simplewiki_revision_snapshot_interval
+from .models import Section, SectionRevision
+
+# A token is a run of text ending with a line break or the end of a tag
+_tokens = re.compile(r"[^\n>]*[\n>]|[^\n>]+")
+
+# The fields needed to list revisions, the data is only read to reconstruct one
+REVISION_METADATA = ('id', 'section', 'number', 'base', 'is_snapshot', 'checksum',
+                     'size', 'title', 'last_edit', 'last_edit_id', 'created_at')
+
+
+def tokenize_content(content: str) -> list:
+    return _tokens.findall(content)
+
+
+def content_checksum(content: str) -> str:
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def make_delta(old: str, new: str) -> bytes:
+    """
+    Returns the compressed difference that turns one content into another.
+
+    Args:
+        old (str): The content of the previous revision
+        new (str): The content of the new revision
+
+    Returns:
+        bytes: Returns the zlib compressed list of copied ranges and inserted texts
+    """
+
+    old_tokens = tokenize_content(old)
+    new_tokens = tokenize_content(new)
+
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_tokens, new_tokens)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif tag in ('replace', 'insert'):
+            ops.append("".join(new_tokens[j1:j2]))
+
+    return zlib.compress(json.dumps(ops, separators=(',', ':')).encode('utf-8'))
+
+
+def apply_delta(old: str, delta: bytes) -> str:
+    """
+    Applies a difference created by make_delta.
+
+    Args:
+        old (str): The content of the previous revision
+        delta (bytes): The compressed difference
+
+    Returns:
+        str: Returns the content of the next revision
+    """
+
+    old_tokens = tokenize_content(old)
+    parts = []
+    for op in json.loads(zlib.decompress(delta).decode('utf-8')):
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(old_tokens[op[0]:op[1]])
+
+    return "".join(parts)
+
+
+def compress_content(content: str) -> bytes:
+    return zlib.compress(content.encode('utf-8'))
+
+
+def decompress_content(data: bytes) -> str:
+    return zlib.decompress(bytes(data)).decode('utf-8')
+
+
+def get_revision_content(section_id: int, number: int) -> str:
+    """
+    Reconstructs the content of a revision from its snapshot and the
+    differences after it, read with one query.
+
+    Args:
+        section_id (int): The id of the section
+        number (int): The revision number
+
+    Returns:
+        str: Returns the content of the revision
+
+    Raises:
+        SectionRevision.DoesNotExist: If the section has no such revision
+    """
+
+    base = SectionRevision.objects.filter(section_id=section_id, number=number).values('base')[:1]
+    chain = list(SectionRevision.objects.filter(section_id=section_id, number__lte=number, number__gte=Subquery(base))
+                                        .order_by('number')
+                                        .values_list('is_snapshot', 'data'))
+    if not chain:
+        raise SectionRevision.DoesNotExist(f"Section {section_id} has no revision {number}")
+
+    content = None
+    for is_snapshot, data in chain:
+        content = decompress_content(data) if is_snapshot else apply_delta(content, bytes(data))
+
+    return content
+
+
+def record_revision(section: Section, previous: Section = None):
+    """
+    Stores the current content of a saved section as its next revision.
+    Nothing is stored if the content and title didn't change.
+
+    Sections without revisions, e.g. created before revisions were stored,
+    first get a revision of their previous state, if it is passed.
+
+    Args:
+        section (Section): The saved section
+        previous (Section): A copy of the section before the edit
+
+    Returns:
+        SectionRevision: Returns the new revision or None
+    """
+
+    checksum = content_checksum(section.content)
+
+    with transaction.atomic():
+        # Serializes the revisions of one section
+        list(Section.objects.select_for_update().filter(pk=section.pk).values_list('pk'))
+
+        latest = (SectionRevision.objects.filter(section=section)
+                                         .order_by('-number')
+                                         .only(*REVISION_METADATA)
+                                         .first())
+
+        if latest is None and previous is not None and content_checksum(previous.content) != checksum:
+            latest = SectionRevision.objects.create(
+                section=section, number=1, base=1, is_snapshot=True,
+                data=compress_content(previous.content), checksum=content_checksum(previous.content),
+                size=len(previous.content), title=previous.title, last_edit=previous.last_edit,
+                last_edit_id=previous.last_edit_id, created_at=previous.updated_at or timezone.now())
+
+        if latest is not None and latest.checksum == checksum and latest.title == section.title:
+            return None
+
+        revision = SectionRevision(section=section, checksum=checksum, size=len(section.content),
+                                   title=section.title, last_edit=section.last_edit,
+                                   last_edit_id=section.last_edit_id, created_at=timezone.now())
+        revision.number = latest.number + 1 if latest else 1
+
+        full = compress_content(section.content)
+        if latest is None or revision.number - latest.base >= simplewiki_revision_snapshot_interval:
+            delta = None
+        else:
+            # The previous content is only reconstructed if the section was changed without a revision
+            if previous is not None and content_checksum(previous.content) == latest.checksum:
+                old = previous.content
+            else:
+                old = get_revision_content(section.pk, latest.number)
+
+            delta = make_delta(old, section.content)
+
+        if delta is None or len(delta) >= len(full):
+            revision.is_snapshot = True
+            revision.base = revision.number
+            revision.data = full
+        else:
+            revision.base = latest.base
+            revision.data = delta
+
+        revision.save()
+
+    return revision
+
+
+def diff_lines(old: str, new: str, context: int = 3) -> list:
+    """
+    Returns a unified difference of two contents for display, one token per line.
+
+    Args:
+        old (str): The older content
+        new (str): The newer content
+        context (int): Number of unchanged tokens around every change
+
+    Returns:
+        list: Returns (kind, text) tuples, kind is "header", "added", "removed" or "unchanged"
+    """
+
+    old_lines = [token.rstrip("\n") for token in tokenize_content(old)]
+    new_lines = [token.rstrip("\n") for token in tokenize_content(new)]
+
+    lines = []
+    # The first two lines are the file headers
+    for line in list(difflib.unified_diff(old_lines, new_lines, n=context, lineterm=""))[2:]:
+        if line.startswith('@@'):
+            lines.append(('header', line))
+        elif line.startswith('+'):
+            lines.append(('added', line[1:]))
+        elif line.startswith('-'):
+            lines.append(('removed', line[1:]))
+        else:
+            lines.append(('unchanged', line[1:]))
+
+    return lines
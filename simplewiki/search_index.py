@@ -0,0 +1,771 @@
+"""
+Full-text search index of all sections.
+
+Depending on the database, searches use SQLite FTS5, a PostgreSQL GIN index or
+a MySQL/MariaDB FULLTEXT index, created by migration 0040. Other databases,
+and SQLite builds without FTS5, use an in-memory inverted index per process.
+Every word of the query has to match the beginning of a word in the title or
+plain text of a section.
+
+Results are ranked by the engine (FTS5 bm25, ts_rank, MySQL relevance or BM25
+over the inverted index) and read page by page with a keyset cursor of the
+rank and section id, so a page never loads more than its own sections.
+
+Fuzzy searches match words with similar trigrams instead of prefixes, which
+finds misspelled names. They use pg_trgm on PostgreSQL if the extension is
+installed (migration 0042) and an in-memory trigram index otherwise.
+"""
+
+# Python
+import bisect
+import math
+import random
+import re
+import threading
+from collections import Counter
+
+# Django
+from django.core.cache import cache
+from django.db import connection, models, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from allianceauth.services.hooks import get_extension_logger
+from app_utils.logging import LoggerAddTag
+
+# Custom imports
+from .app_settings import simplewiki_search_backend, simplewiki_search_fuzzy_threshold
+from .access import menu_access_classes
+from .models import Section
+from . import __title__
+
+logger = LoggerAddTag(get_extension_logger(__name__), __title__)
+
+# Name of the SQLite FTS5 table and the PostgreSQL/MySQL indexes
+FTS_TABLE = "simplewiki_section_fts"
+FULLTEXT_INDEX = "simplewiki_section_fulltext"
+TRIGRAM_INDEX = "simplewiki_section_trigram"
+
+# Incremented on every change, processes with an older inverted index rebuild it
+INDEX_VERSION_KEY = "simplewiki:search:version"
+TRIGRAM_VERSION_KEY = "simplewiki:search:trigram:version"
+
+# Ranks are stored as integers, engine scores are multiplied by this factor
+RANK_SCALE = 1000000
+
+_word = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> list:
+    """
+    Splits a text into lower case words.
+    """
+
+    return _word.findall(text.lower())
+
+
+def trigrams(word: str) -> set:
+    """
+    Returns the trigrams of a word, padded like pg_trgm: "ab" -> "  a", " ab", "ab ".
+    """
+
+    padded = "  " + word + " "
+    return {padded[position:position + 3] for position in range(len(padded) - 2)}
+
+
+def section_text(title: str, plain_text: str) -> str:
+    """
+    Returns the searchable text of a section, its title and plain text.
+    """
+
+    return title + "\n" + plain_text
+
+
+class DatabaseSearchBackend:
+    """
+    Searches with the full-text index of the database.
+    """
+
+    name = 'database'
+
+    def __init__(self, vendor: str):
+        self.vendor = vendor
+
+    def match(self, words: list) -> str:
+        if self.vendor == 'sqlite':
+            return " ".join('"' + word + '"*' for word in words)
+        elif self.vendor == 'postgresql':
+            return " & ".join(word + ":*" for word in words)
+        return " ".join("+" + word + "*" for word in words)
+
+    def search(self, words: list):
+        if self.vendor == 'sqlite':
+            sql = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+        elif self.vendor == 'postgresql':
+            sql = "SELECT id FROM simplewiki_section WHERE to_tsvector('simple', title || ' ' || plain_text) @@ to_tsquery('simple', %s)"
+        else:
+            sql = "SELECT id FROM simplewiki_section WHERE MATCH(title, plain_text) AGAINST (%s IN BOOLEAN MODE)"
+
+        return Section.objects.filter(id__in=RawSQL(sql, [self.match(words)]))
+
+    def rank(self, words: list) -> RawSQL:
+        """
+        Returns the integer rank of a section for the query, higher is better.
+        SQLite ranks in ranked_page instead.
+        """
+
+        if self.vendor == 'postgresql':
+            sql = (f"CAST(ts_rank(to_tsvector('simple', simplewiki_section.title || ' ' || simplewiki_section.plain_text), "
+                   f"to_tsquery('simple', %s)) * {RANK_SCALE} AS bigint)")
+        else:
+            sql = (f"CAST(MATCH(simplewiki_section.title, simplewiki_section.plain_text) AGAINST (%s IN BOOLEAN MODE) "
+                   f"* {RANK_SCALE} AS SIGNED)")
+
+        return RawSQL(sql, [self.match(words)], output_field=models.BigIntegerField())
+
+    def ranked_page(self, words: list, menu_ids=None, after: tuple = None, limit: int = 21) -> list:
+        """
+        Returns (rank, section id, None) of one page of results on SQLite. The 
+        FTS table is matched once and joined with the sections, the rows are 
+        ordered by bm25, title matches weigh more than matches in the text.
+
+        Args:
+            words (list): The search words
+            menu_ids (set): Only sections of these menus, None for all sections
+            after (tuple): The rank and section id of the cursor, None for the first page
+            limit (int): The maximum number of results
+
+        Returns:
+            list: Returns the ranked section ids, best first
+        """
+
+        sql = (f"SELECT ranked.rank, ranked.id FROM "
+               f"(SELECT rowid AS id, CAST(-bm25({FTS_TABLE}, 10.0, 1.0) * {RANK_SCALE} AS INTEGER) AS rank "
+               f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s) AS ranked "
+               f"INNER JOIN simplewiki_section ON simplewiki_section.id = ranked.id")
+        conditions = []
+        params = [self.match(words)]
+        if menu_ids is not None:
+            menu_ids = list(menu_ids)
+            conditions.append("simplewiki_section.menu_id IN (" + ", ".join(["%s"] * len(menu_ids)) + ")")
+            params += menu_ids
+        if after is not None:
+            conditions.append("(ranked.rank < %s OR (ranked.rank = %s AND ranked.id > %s))")
+            params += [after[0], after[0], after[1]]
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY ranked.rank DESC, ranked.id LIMIT %s"
+        params.append(limit)
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [(rank, section_id, None) for rank, section_id in cursor.fetchall()]
+
+    def update(self, sections: list):
+        # PostgreSQL and MySQL maintain their indexes themselves
+        if self.vendor != 'sqlite' or not sections:
+            return
+
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [[section.id] for section in sections])
+            cursor.executemany(f"INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (%s, %s, %s)",
+                               [[section.id, section.title, section.plain_text] for section in sections])
+
+    def remove(self, section_ids: list):
+        if self.vendor != 'sqlite' or not section_ids:
+            return
+
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [[section_id] for section_id in section_ids])
+
+
+class TrigramDatabaseBackend(DatabaseSearchBackend):
+    """
+    Fuzzy searches with the pg_trgm index, every word has to be similar to a
+    word of the title or the text.
+    """
+
+    name = 'pg_trgm'
+
+    def __init__(self):
+        super().__init__('postgresql')
+
+    def search(self, words: list):
+        condition = " AND ".join("(%s <%% title OR %s <%% plain_text)" for _ in words)
+        sql = f"SELECT id FROM simplewiki_section WHERE {condition}"
+
+        # The <% operator uses pg_trgm.word_similarity_threshold, it is set for this transaction only
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)", 
+                           [str(simplewiki_search_fuzzy_threshold)])
+            cursor.execute(sql, [word for word in words for _ in range(2)])
+            section_ids = [row[0] for row in cursor.fetchall()]
+
+        return Section.objects.filter(id__in=section_ids)
+
+    def rank(self, words: list) -> RawSQL:
+        similarity = " + ".join("GREATEST(word_similarity(%s, simplewiki_section.title), word_similarity(%s, simplewiki_section.plain_text))"
+                                for _ in words)
+        sql = f"CAST(({similarity}) * {RANK_SCALE} AS bigint)"
+
+        return RawSQL(sql, [word for word in words for _ in range(2)], output_field=models.BigIntegerField())
+
+
+class InvertedIndex:
+    """
+    In-memory inverted index of all sections, word -> section ids. Prefix
+    lookups use the sorted vocabulary, the word counts of every section are
+    kept for ranking.
+
+    Every section is also tagged with the access class bit of its menu (0 
+    without a menu) and the sections are partitioned by it, so the sections 
+    a user may see are the union of the partitions allowed by the user's 
+    access mask and permission checks are one set intersection per query.
+    """
+
+    def __init__(self, menu_classes: dict = None):
+        self.postings = {}
+        self.documents = {}
+        self.total_length = 0
+        self.menu_classes = menu_classes or {}
+        self.partitions = {}
+        self._access = {}
+        self._allowed = {}
+        self._vocabulary = None
+
+    def add(self, section_id: int, text: str, menu_id: int = None):
+        self.remove(section_id)
+        counts = Counter(tokenize(text))
+        self.documents[section_id] = counts
+        self.total_length += sum(counts.values())
+        for word in counts:
+            if word not in self.postings:
+                self.postings[word] = set()
+                self.word_added(word)
+            self.postings[word].add(section_id)
+
+        access_class = self.menu_classes.get(menu_id, 0)
+        self._access[section_id] = access_class
+        self.partitions.setdefault(access_class, set()).add(section_id)
+        self._allowed.clear()
+        self._vocabulary = None
+
+    def remove(self, section_id: int):
+        counts = self.documents.pop(section_id, {})
+        self.total_length -= sum(counts.values())
+        for word in counts:
+            ids = self.postings[word]
+            ids.discard(section_id)
+            if not ids:
+                del self.postings[word]
+                self.word_removed(word)
+
+        access_class = self._access.pop(section_id, None)
+        if access_class is not None:
+            self.partitions[access_class].discard(section_id)
+            self._allowed.clear()
+        self._vocabulary = None
+
+    def access_mask(self, menu_ids) -> int:
+        """
+        Returns the access classes of the given (accessible) menus as one bitmap.
+        """
+
+        mask = 0
+        for menu_id in menu_ids:
+            mask |= self.menu_classes.get(menu_id, 0)
+        return mask
+
+    def allowed(self, menu_ids: frozenset) -> set:
+        """
+        Returns the ids of all sections in the access classes of the given
+        menus, kept per menu set until the index changes.
+        """
+
+        ids = self._allowed.get(menu_ids)
+        if ids is None:
+            mask = self.access_mask(menu_ids)
+            ids = set()
+            for access_class, section_ids in self.partitions.items():
+                if access_class & mask:
+                    ids |= section_ids
+            self._allowed[menu_ids] = ids
+        return ids
+
+    def word_added(self, word: str):
+        pass
+
+    def word_removed(self, word: str):
+        pass
+
+    def vocabulary(self) -> list:
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        return self._vocabulary
+
+    def lookup(self, prefix: str) -> set:
+        """
+        Returns the ids of all sections with a word starting with prefix.
+        """
+
+        ids = set()
+        for word in self.expand(prefix):
+            ids |= self.postings[word]
+        return ids
+
+    def expand(self, prefix: str) -> list:
+        """
+        Returns all indexed words starting with prefix.
+        """
+
+        vocabulary = self.vocabulary()
+        position = bisect.bisect_left(vocabulary, prefix)
+        end = position
+        while end < len(vocabulary) and vocabulary[end].startswith(prefix):
+            end += 1
+        return vocabulary[position:end]
+
+    def search(self, words: list) -> set:
+        result = None
+        for word in words:
+            ids = self.lookup(word)
+            result = ids if result is None else result & ids
+            if not result:
+                return set()
+        return result or set()
+
+    def rank(self, words: list, section_ids: set, k1: float = 1.2, b: float = 0.75) -> dict:
+        """
+        Returns the BM25 score of every given section, all words starting
+        with a search word count as a match of that word.
+        """
+
+        count = len(self.documents)
+        average_length = self.total_length / count if count else 0
+        scores = dict.fromkeys(section_ids, 0.0)
+
+        for prefix in words:
+            frequencies = Counter()
+            for word in self.expand(prefix):
+                for section_id in self.postings[word] & section_ids:
+                    frequencies[section_id] += self.documents[section_id][word]
+
+            idf = math.log(1 + (count - len(frequencies) + 0.5) / (len(frequencies) + 0.5))
+            for section_id, frequency in frequencies.items():
+                length = sum(self.documents[section_id].values())
+                norm = k1 * (1 - b + b * length / average_length) if average_length else k1
+                scores[section_id] += idf * frequency * (k1 + 1) / (frequency + norm)
+
+        return scores
+
+
+class TrigramIndex(InvertedIndex):
+    """
+    Inverted index that also maps the trigrams of all words to the words, 
+    to find words similar to a misspelled one.
+    """
+
+    def __init__(self, menu_classes: dict = None):
+        super().__init__(menu_classes)
+        self.grams = {}
+        self.gram_counts = {}
+
+    def word_added(self, word: str):
+        word_grams = trigrams(word)
+        self.gram_counts[word] = len(word_grams)
+        for gram in word_grams:
+            self.grams.setdefault(gram, set()).add(word)
+
+    def word_removed(self, word: str):
+        self.gram_counts.pop(word, None)
+        for gram in trigrams(word):
+            words = self.grams.get(gram)
+            if words is not None:
+                words.discard(word)
+                if not words:
+                    del self.grams[gram]
+
+    def similar(self, word: str, threshold: float) -> dict:
+        """
+        Returns all indexed words with a trigram similarity (shared trigrams 
+        divided by all trigrams of both words, as in pg_trgm) of at least threshold.
+        """
+
+        word_grams = trigrams(word)
+        shared = Counter()
+        for gram in word_grams:
+            for candidate in self.grams.get(gram, ()):
+                shared[candidate] += 1
+
+        similar = {}
+        for candidate, count in shared.items():
+            similarity = count / (len(word_grams) + self.gram_counts[candidate] - count)
+            if similarity >= threshold:
+                similar[candidate] = similarity
+        return similar
+
+    def fuzzy_search(self, words: list, threshold: float) -> dict:
+        """
+        Returns the sections with a similar word for every search word, with 
+        the summed similarity of the best matches and the matched words.
+        """
+
+        result = None
+        for word in words:
+            best = {}
+            for candidate, similarity in self.similar(word, threshold).items():
+                for section_id in self.postings[candidate]:
+                    if section_id not in best or similarity > best[section_id][0]:
+                        best[section_id] = (similarity, candidate)
+
+            if result is None:
+                result = {section_id: (similarity, [candidate]) for section_id, (similarity, candidate) in best.items()}
+            else:
+                result = {section_id: (score + best[section_id][0], candidates + [best[section_id][1]])
+                          for section_id, (score, candidates) in result.items() if section_id in best}
+            if not result:
+                return {}
+        return result or {}
+
+
+class PythonSearchBackend:
+    """
+    Searches with an in-memory inverted index. Changes in this process update
+    the index directly, changes in other processes are noticed by the shared
+    version counter and cause a rebuild.
+    """
+
+    name = 'python'
+    index_class = InvertedIndex
+    version_key = INDEX_VERSION_KEY
+
+    def __init__(self):
+        self.index = None
+        self.version = None
+        self._lock = threading.Lock()
+
+    def get_shared_version(self) -> int:
+        # Starts at a random number, so an evicted counter never matches an old version
+        cache.add(self.version_key, random.randrange(1 << 30), None)
+        return cache.get(self.version_key, 0)
+
+    def get_index(self) -> InvertedIndex:
+        with self._lock:
+            version = self.get_shared_version()
+            if self.index is None or self.version != version:
+                index = self.index_class(menu_access_classes())
+                for section_id, title, plain_text, menu_id in Section.objects.values_list('id', 'title', 'plain_text', 'menu_id').iterator():
+                    index.add(section_id, section_text(title, plain_text), menu_id)
+                self.index = index
+                self.version = version
+            return self.index
+
+    def search(self, words: list):
+        return Section.objects.filter(id__in=self.get_index().search(words))
+
+    def ranked_ids(self, words: list, menu_ids=None) -> list:
+        """
+        Returns (rank, section id, matched words) of all matching sections, best first.
+        """
+
+        index = self.get_index()
+        section_ids = index.search(words)
+        if menu_ids is not None:
+            section_ids &= index.allowed(frozenset(menu_ids))
+
+        scores = index.rank(words, section_ids)
+        return sorted(((int(score * RANK_SCALE), section_id, None) for section_id, score in scores.items()),
+                      key=lambda item: (-item[0], item[1]))
+
+    def changed(self, apply):
+        """
+        Applies a change to the index once the current transaction is committed, 
+        otherwise another process could build its index from the old rows under 
+        the new version.
+        """
+
+        transaction.on_commit(lambda: self.apply_change(apply))
+
+    def apply_change(self, apply):
+        with self._lock:
+            self.get_shared_version()
+            try:
+                version = cache.incr(self.version_key)
+            except ValueError:
+                version = None
+            # Only this change happened since the last sync, update the index in place
+            if self.index is not None and version is not None and version == (self.version or 0) + 1:
+                apply(self.index)
+                self.version = version
+            else:
+                self.index = None
+
+    def invalidate(self):
+        """
+        Drops the index of every process, the next search rebuilds it.
+        """
+
+        def apply(index):
+            self.index = None
+        self.changed(apply)
+
+    def update(self, sections: list):
+        def apply(index):
+            for section in sections:
+                if section.menu_id is not None and section.menu_id not in index.menu_classes:
+                    # A menu created after the index was built, its access class is unknown
+                    self.index = None
+                    return
+                index.add(section.id, section_text(section.title, section.plain_text), section.menu_id)
+        self.changed(apply)
+
+    def remove(self, section_ids: list):
+        def apply(index):
+            for section_id in section_ids:
+                index.remove(section_id)
+        self.changed(apply)
+
+
+class TrigramSearchBackend(PythonSearchBackend):
+    """
+    Fuzzy searches with an in-memory trigram index, kept up to date like the
+    inverted index of the PythonSearchBackend.
+    """
+
+    name = 'trigram'
+    index_class = TrigramIndex
+    version_key = TRIGRAM_VERSION_KEY
+
+    def search(self, words: list):
+        return Section.objects.filter(id__in=self.get_index().fuzzy_search(words, simplewiki_search_fuzzy_threshold))
+
+    def ranked_ids(self, words: list, menu_ids=None) -> list:
+        index = self.get_index()
+        matches = index.fuzzy_search(words, simplewiki_search_fuzzy_threshold)
+        if menu_ids is not None and matches:
+            allowed = index.allowed(frozenset(menu_ids))
+            matches = {section_id: match for section_id, match in matches.items() if section_id in allowed}
+
+        return sorted(((int(score * RANK_SCALE), section_id, terms) for section_id, (score, terms) in matches.items()),
+                      key=lambda item: (-item[0], item[1]))
+
+
+_backend = None
+_fuzzy_backend = None
+_python_backend = PythonSearchBackend()
+_trigram_backend = TrigramSearchBackend()
+
+
+def get_search_backend():
+    """
+    Returns the search backend. With SIMPLEWIKI_SEARCH_BACKEND "auto" the
+    full-text index of the database is used if it exists.
+    """
+
+    global _backend
+
+    if _backend is None:
+        vendor = connection.vendor
+        if simplewiki_search_backend == 'python':
+            _backend = _python_backend
+        elif vendor == 'sqlite':
+            has_table = FTS_TABLE in connection.introspection.table_names(include_views=True)
+            _backend = DatabaseSearchBackend(vendor) if has_table else _python_backend
+        elif vendor in ('postgresql', 'mysql'):
+            _backend = DatabaseSearchBackend(vendor)
+        else:
+            _backend = _python_backend
+
+    return _backend
+
+
+def get_fuzzy_backend():
+    """
+    Returns the backend of fuzzy searches, pg_trgm if it is installed on 
+    PostgreSQL, the in-memory trigram index otherwise.
+    """
+
+    global _fuzzy_backend
+
+    if _fuzzy_backend is None:
+        _fuzzy_backend = _trigram_backend
+        if simplewiki_search_backend != 'python' and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                if cursor.fetchone():
+                    _fuzzy_backend = TrigramDatabaseBackend()
+
+    return _fuzzy_backend
+
+
+def reset_search_backend():
+    """
+    Forgets the selected backends, the next search selects them again.
+    """
+
+    global _backend, _fuzzy_backend
+
+    _backend = None
+    _fuzzy_backend = None
+
+
+def search_sections(query: str, menu_ids=None):
+    """
+    Returns all sections matching every word of the query.
+
+    Args:
+        query (str): The search query
+        menu_ids (set): Only sections under these menus, usually the accessible menus of the user.
+                        Sections without a menu are never returned then.
+
+    Returns:
+        QuerySet: Returns the matching sections
+    """
+
+    words = tokenize(query or "")
+    if not words or menu_ids is not None and not menu_ids:
+        return Section.objects.none()
+
+    sections = get_search_backend().search(words)
+    if menu_ids is not None:
+        sections = sections.filter(menu_id__in=menu_ids)
+
+    return sections
+
+
+def parse_cursor(cursor: str):
+    """
+    Returns the rank and section id of a cursor or None if it is invalid.
+    """
+
+    try:
+        rank, section_id = cursor.split(":")
+        return int(rank), int(section_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def search_page(query: str, menu_ids=None, cursor: str = None, page_size: int = 20, fuzzy: bool = False) -> tuple:
+    """
+    Returns one page of the ranked search results. The cursor points behind 
+    the last section of the previous page, so each page is a single index
+    query no matter how deep it is.
+
+    Args:
+        query (str): The search query
+        menu_ids (set): All menus the user can access, in-memory indexes 
+                        filter by the access classes of these menus
+        cursor (str): The next_cursor of the previous page, None for the first page
+        page_size (int): The maximum number of sections per page
+        fuzzy (bool): Match similar words instead of word beginnings, the 
+                      matched words of the in-memory index are stored in section.terms
+
+    Returns:
+        tuple: Returns the sections with their rank and the cursor of the next page or None
+    """
+
+    words = tokenize(query or "")
+    if not words or menu_ids is not None and not menu_ids:
+        return [], None
+
+    after = parse_cursor(cursor) if cursor else None
+    backend = get_fuzzy_backend() if fuzzy else get_search_backend()
+
+    if isinstance(backend, DatabaseSearchBackend) and backend.vendor != 'sqlite':
+        sections = backend.search(words).annotate(rank=backend.rank(words))
+        if menu_ids is not None:
+            sections = sections.filter(menu_id__in=menu_ids)
+        if after is not None:
+            sections = sections.filter(Q(rank__lt=after[0]) | Q(rank=after[0], id__gt=after[1]))
+
+        results = list(sections.select_related('menu')
+                               .only('id', 'title', 'icon', 'plain_text', 'menu__title', 'menu__path')
+                               .order_by('-rank', 'id')[:page_size + 1])
+        has_next = len(results) > page_size
+        results = results[:page_size]
+    else:
+        if isinstance(backend, DatabaseSearchBackend):
+            ranked = backend.ranked_page(words, menu_ids, after, page_size + 1)
+        else:
+            ranked = backend.ranked_ids(words, menu_ids)
+            if after is not None:
+                ranked = [item for item in ranked if (-item[0], item[1]) > (-after[0], after[1])]
+            ranked = ranked[:page_size + 1]
+
+        sections = (Section.objects.select_related('menu')
+                                   .only('id', 'title', 'icon', 'plain_text', 'menu__title', 'menu__path')
+                                   .in_bulk([section_id for _, section_id, _ in ranked[:page_size]]))
+        results = []
+        for rank, section_id, terms in ranked[:page_size]:
+            if section_id in sections:
+                sections[section_id].rank = rank
+                if terms:
+                    sections[section_id].terms = terms
+                results.append(sections[section_id])
+        has_next = len(ranked) > page_size
+
+    next_cursor = f"{results[-1].rank}:{results[-1].id}" if has_next and results else None
+
+    return results, next_cursor
+
+
+def update_search_index(sections: list):
+    """
+    Adds or updates sections in the search index. Called by the Section
+    signals, bulk updates have to call it themselves.
+    """
+
+    sections = list(sections)
+    get_search_backend().update(sections)
+    _trigram_backend.update(sections)
+
+
+def remove_from_search_index(section_ids: list):
+    """
+    Removes sections from the search index.
+    """
+
+    section_ids = list(section_ids)
+    get_search_backend().remove(section_ids)
+    _trigram_backend.remove(section_ids)
+
+
+def search_access_changed():
+    """
+    Menus or their groups and states changed, the in-memory indexes have to
+    load the access classes again.
+    """
+
+    _python_backend.invalidate()
+    _trigram_backend.invalidate()
+
+
+def rebuild_search_index():
+    """
+    Rebuilds the search index from the stored sections, PostgreSQL and MySQL
+    maintain their indexes themselves.
+    """
+
+    backend = get_search_backend()
+
+    # Tells every process to rebuild its trigram index
+    _trigram_backend.invalidate()
+
+    if backend.name == 'python':
+        # Tells every process to rebuild its inverted index
+        backend.invalidate()
+        return
+
+    if backend.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    batch = []
+    for section in Section.objects.order_by('id').only('id', 'title', 'plain_text').iterator(chunk_size=500):
+        batch.append(section)
+        if len(batch) >= 500:
+            backend.update(batch)
+            batch = []
+    backend.update(batch)
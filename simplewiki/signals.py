@@ -0,0 +1,104 @@
+"""App Signals"""
+
+# Django
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+# Custom imports
+from .models import Menu, MenuSummary, Section
+from .views_helper import invalidate_navbar_cache
+from .search_index import remove_from_search_index, search_access_changed, update_search_index
+from .suggest import invalidate_title_index
+
+
+def invalidate_menu_caches():
+    """
+    Invalidates all cached navbars, title suggestions and the access classes
+    of the search index. Also called after bulk updates of menus, which 
+    don't send signals. The caches are only invalidated once the current 
+    transaction is committed, otherwise another request could cache the 
+    old menus under the new version.
+    """
+
+    transaction.on_commit(invalidate_navbar_cache)
+    invalidate_title_index()
+    search_access_changed()
+
+
+@receiver([post_save, post_delete], sender=Menu)
+def menu_changed(sender, instance, **kwargs):
+    """
+    Invalidates everything depending on the menus once a menu got created, 
+    edited or deleted. A saved menu also gets a new content version, its 
+    cached page body contains the menu's path and settings.
+    """
+
+    invalidate_menu_caches()
+
+    if kwargs.get('signal') is post_save and not kwargs.get('created'):
+        MenuSummary.refresh(instance.pk)
+
+
+@receiver(m2m_changed, sender=Menu.groups.through)
+@receiver(m2m_changed, sender=Menu.states.through)
+def menu_access_changed(sender, instance, action, **kwargs):
+    """
+    Invalidates everything depending on the menus once the groups or states 
+    of a menu changed
+    """
+
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_menu_caches()
+
+
+@receiver(pre_save, sender=Section)
+def section_moving(sender, instance, **kwargs):
+    """
+    Remembers the previous menu and title of a section, so both menu summaries 
+    can be refreshed if the section moves to another menu and title 
+    suggestions are only rebuilt if the title or menu changed
+    """
+
+    instance._simplewiki_previous_menu_id = None
+    instance._simplewiki_previous_title = None
+    if instance.pk is not None:
+        previous = Section.objects.filter(pk=instance.pk).values_list('menu_id', 'title').first()
+        if previous is not None:
+            instance._simplewiki_previous_menu_id, instance._simplewiki_previous_title = previous
+
+
+@receiver([post_save, post_delete], sender=Section)
+def section_changed(sender, instance, **kwargs):
+    """
+    Refreshes the summary of the section's menu once a section got created, 
+    edited or deleted. This also changes the ETag and cached body of the page.
+    """
+
+    menu_ids = {instance.menu_id, getattr(instance, '_simplewiki_previous_menu_id', None)}
+    for menu_id in menu_ids:
+        if menu_id is not None and Menu.objects.filter(pk=menu_id).exists():
+            MenuSummary.refresh(menu_id)
+
+
+@receiver(post_save, sender=Section)
+def section_saved(sender, instance, **kwargs):
+    """
+    Updates the section in the search index and the title suggestions
+    """
+
+    update_search_index([instance])
+
+    previous = (getattr(instance, '_simplewiki_previous_menu_id', None), getattr(instance, '_simplewiki_previous_title', None))
+    if kwargs.get('created') or previous != (instance.menu_id, instance.title):
+        invalidate_title_index()
+
+
+@receiver(post_delete, sender=Section)
+def section_deleted(sender, instance, **kwargs):
+    """
+    Removes the section from the search index and the title suggestions
+    """
+
+    remove_from_search_index([instance.id])
+    invalidate_title_index()
@@ -0,0 +1,166 @@
+"""
+Title suggestions for the search bar.
+
+Every process keeps a sorted array of all words of all menu and section
+titles. A lookup is a binary search for the typed prefix, the matches are
+filtered by the menus the caller's access fingerprint can see. The array is
+rebuilt once the shared version changes, which the menu and section signals
+do whenever a title, a menu or the access of a menu changes.
+"""
+
+# Python
+import bisect
+import threading
+import uuid
+from urllib.parse import quote
+
+# Django
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+
+# Custom imports
+from .models import Menu, Section
+from .search_index import tokenize
+
+# Changed by the signals, processes with an older title index rebuild it
+SUGGEST_VERSION_KEY = "simplewiki:suggest:version"
+
+
+class TitleIndex:
+    """
+    Sorted array of (word, entry) pairs for all menu and section titles.
+
+    Attributes:
+        entries (list): (kind, title, menu id, menu title, url) of every title.
+        keys (list): The sorted words of all titles.
+        positions (list): The entry number of every word in keys.
+    """
+
+    def __init__(self, entries: list):
+        pairs = sorted((word, number)
+                       for number, entry in enumerate(entries)
+                       for word in set(tokenize(entry[1])))
+
+        self.entries = entries
+        self.keys = [word for word, _ in pairs]
+        self.positions = [number for _, number in pairs]
+        self._menu_ids = {}
+
+    @classmethod
+    def load(cls):
+        """
+        Loads all pages (menus without submenus) and their sections, one query each.
+
+        Returns:
+            TitleIndex: Returns the index of all titles
+        """
+
+        menus = list(Menu.objects.values_list('id', 'title', 'path', 'parent_id'))
+        parent_ids = {parent_id for _, _, _, parent_id in menus if parent_id is not None}
+        pages = {menu_id: (title, reverse('simplewiki:dynamic_menu', args=[path]))
+                 for menu_id, title, path, _ in menus if menu_id not in parent_ids}
+
+        entries = [('menu', title, menu_id, title, url) for menu_id, (title, url) in pages.items()]
+        for title, menu_id in Section.objects.filter(menu_id__in=pages).values_list('title', 'menu_id').order_by('index', 'id'):
+            menu_title, url = pages[menu_id]
+            entries.append(('section', title, menu_id, menu_title, url + "#" + quote(title)))
+
+        return cls(entries)
+
+    def menu_ids(self, principal) -> frozenset:
+        """
+        Returns the accessible menu ids of the principal, kept per access
+        fingerprint as long as this index lives.
+        """
+
+        menu_ids = self._menu_ids.get(principal.fingerprint)
+        if menu_ids is None:
+            menu_ids = principal.accessible_menu_ids
+            self._menu_ids[principal.fingerprint] = menu_ids
+
+        return menu_ids
+
+    def suggest(self, query: str, principal, limit: int = 8) -> list:
+        """
+        Returns the titles matching every word of the query, the last word may
+        be incomplete. Menus come before sections, shorter titles first.
+
+        Args:
+            query (str): The typed text
+            principal (AccessPrincipal): The caller
+            limit (int): The maximum number of suggestions
+
+        Returns:
+            list: Returns dicts with the type, title, menu and url of every suggestion
+        """
+
+        words = tokenize(query or "")
+        if not words:
+            return []
+
+        matches = None
+        for word in words:
+            start = bisect.bisect_left(self.keys, word)
+            numbers = set()
+            while start < len(self.keys) and self.keys[start].startswith(word):
+                numbers.add(self.positions[start])
+                start += 1
+
+            matches = numbers if matches is None else matches & numbers
+            if not matches:
+                return []
+
+        menu_ids = self.menu_ids(principal)
+        found = [self.entries[number] for number in matches if self.entries[number][2] in menu_ids]
+        found.sort(key=lambda entry: (entry[0] != 'menu', len(entry[1]), entry[1].lower()))
+
+        return [{'type': kind, 'title': title, 'menu': menu_title, 'url': url}
+                for kind, title, _, menu_title, url in found[:limit]]
+
+
+_index = None
+_version = None
+_lock = threading.Lock()
+
+
+def get_suggest_version() -> str:
+    version = cache.get(SUGGEST_VERSION_KEY)
+    if version is None:
+        cache.add(SUGGEST_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(SUGGEST_VERSION_KEY)
+
+    return version
+
+
+def get_title_index() -> TitleIndex:
+    """
+    Returns the title index of this process, rebuilt if a title changed since it was loaded.
+    """
+
+    global _index, _version
+
+    with _lock:
+        version = get_suggest_version()
+        if _index is None or _version != version:
+            _index = TitleIndex.load()
+            _version = version
+
+        return _index
+
+
+def invalidate_title_index():
+    """
+    Tells every process to rebuild its title index on the next suggestion, 
+    once the current transaction is committed
+    """
+
+    transaction.on_commit(lambda: cache.set(SUGGEST_VERSION_KEY, uuid.uuid4().hex, None))
+
+
+def suggest_titles(query: str, principal, limit: int = 8) -> list:
+    """
+    Returns title suggestions for the search bar, see TitleIndex.suggest.
+    """
+
+    return get_title_index().suggest(query, principal, limit)
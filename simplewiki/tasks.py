@@ -1,12 +1,20 @@
 """App Tasks"""
 
-# Standard Library
-import logging
-
 # Third Party
 from celery import shared_task
 
-logger = logging.getLogger(__name__)
+# Alliance Auth
+from allianceauth.services.hooks import get_extension_logger
+
+# Custom imports
+from .models import Menu, Section
+from .ordering import ORDER_GAP, rebalance_keys
+
+# Logging
+from app_utils.logging import LoggerAddTag
+from . import __title__
+
+logger = LoggerAddTag(get_extension_logger(__name__), __title__)
 
 # simplewiki Task
 @shared_task
@@ -14,3 +22,17 @@ def simplewiki_task():
     """simplewiki Task"""
 
     pass
+
+
+@shared_task
+def rebalance_order():
+    """
+    Spreads the ordering keys of crowded sibling menus and sections apart 
+    again, see the simplewiki_rebalance_order command. Add it to the 
+    CELERYBEAT_SCHEDULE to run it periodically.
+    """
+
+    menus = rebalance_keys(Menu, 'parent_id', min_gap=ORDER_GAP // 32)
+    sections = rebalance_keys(Section, 'menu_id', min_gap=ORDER_GAP // 32)
+
+    logger.info(f"Renumbered {menus} menus and {sections} sections")
@@ -1,13 +1,13 @@
-import mistune
 import re
 
 from django import template
 
-from ..markdown import renderer as sw_renderer
+from ..markdown.engine import render_markdown
 
 def markdown_to_html(text):
     """
-    Converts markdown text to HTML using the SimpleWikiRenderer.
+    Converts markdown text to HTML using the shared SimpleWikiRenderer parser. 
+    Repeated texts are answered from the render cache.
 
     Args:
         text (str): The markdown text to convert.
@@ -15,11 +15,7 @@ def markdown_to_html(text):
     Returns:
         str: The resulting HTML.
     """
-    markdown = mistune.create_markdown(escape=True, 
-                                       renderer=sw_renderer.SimpleWikiRenderer(), 
-                                       plugins=['strikethrough', 'url', 'footnotes', 'abbr', 'mark', 'insert', 'superscript', 'subscript', 'table'])
-
-    html = markdown(text)
+    html = render_markdown(text)
 
     return html
 
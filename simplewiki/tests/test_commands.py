@@ -0,0 +1,165 @@
+"""
+simplewiki management command tests
+"""
+
+# Python
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+# Django
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.test import TestCase
+
+from simplewiki.access import RESTRICTED_GROUP
+from simplewiki.management.commands.simplewiki_rerender import content_hash
+from simplewiki.models import Menu, MenuItem, MenuSummary, Section
+from simplewiki.search_index import search_sections
+
+
+class TestRerenderCommand(TestCase):
+    """
+    Tests for simplewiki_rerender
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.menu = Menu.objects.create(title="Fleet", path="fleet", index=0)
+        cls.sections = [Section.objects.create(title=f"Section {i}", menu=cls.menu, index=i, content=f"Line {i}  \r\nNext\r\n")
+                        for i in range(5)]
+
+    def setUp(self):
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), "rerender.checkpoint")
+
+    def rerender(self, *args):
+        out = StringIO()
+        call_command("simplewiki_rerender", "--workers", "1", "--batch-size", "2", 
+                     "--checkpoint", self.checkpoint, *args, stdout=out)
+        return out.getvalue()
+
+    def test_normalize_updates_sections_and_summary(self):
+        version = MenuSummary.objects.get(menu=self.menu).content_version
+
+        output = self.rerender()
+
+        self.assertIn("Processed 5 sections", output)
+        self.assertEqual(Section.objects.get(pk=self.sections[0].pk).content, "Line 0\nNext")
+        self.assertEqual(MenuSummary.objects.get(menu=self.menu).content_version, version + 3)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_dry_run_writes_nothing(self):
+        output = self.rerender("--dry-run")
+
+        self.assertIn("would change 5", output)
+        self.assertEqual(Section.objects.get(pk=self.sections[0].pk).content, "Line 0  \r\nNext\r\n")
+
+    def test_resumes_after_checkpoint(self):
+        with open(self.checkpoint, "w") as file:
+            json.dump({"last_id": self.sections[2].pk}, file)
+
+        self.rerender()
+
+        self.assertEqual(Section.objects.get(pk=self.sections[2].pk).content, "Line 2  \r\nNext\r\n")
+        self.assertEqual(Section.objects.get(pk=self.sections[3].pk).content, "Line 3\nNext")
+
+    def test_markdown_mode(self):
+        Section.objects.filter(pk=self.sections[0].pk).update(content="**Shield** fits")
+
+        self.rerender("--mode", "markdown")
+
+        self.assertEqual(Section.objects.get(pk=self.sections[0].pk).content, "<p><strong>Shield</strong> fits</p>\n")
+
+
+    def test_markdown_mode_skips_sections_written_before_a_crash(self):
+        html = "<p><strong>Shield</strong> fits</p>\n"
+        Section.objects.filter(pk=self.sections[0].pk).update(content=html)
+        Section.objects.filter(pk=self.sections[1].pk).update(content="**Armor** fits")
+
+        # The batch was committed, but the run stopped before the checkpoint moved on
+        with open(self.checkpoint, "w") as file:
+            json.dump({"last_id": 0, "pending": {str(self.sections[0].pk): content_hash(html)}}, file)
+
+        output = self.rerender("--mode", "markdown")
+
+        self.assertIn("Processed 5 sections", output)
+        self.assertEqual(Section.objects.get(pk=self.sections[0].pk).content, html)
+        self.assertEqual(Section.objects.get(pk=self.sections[1].pk).content, "<p><strong>Armor</strong> fits</p>\n")
+
+    def test_checkpoint_stores_the_pending_batch(self):
+        checkpoints = []
+        with patch("simplewiki.management.commands.simplewiki_rerender.Command.write_checkpoint", 
+                   lambda command, checkpoint, last_id, pending=None: checkpoints.append((last_id, pending))):
+            self.rerender()
+
+        self.assertEqual(checkpoints[0], (0, {self.sections[0].pk: content_hash("Line 0\nNext"), 
+                                              self.sections[1].pk: content_hash("Line 1\nNext")}))
+        self.assertEqual(checkpoints[1], (self.sections[1].pk, None))
+
+
+class TestBackfillPlainTextCommand(TestCase):
+    """
+    Tests for simplewiki_backfill_plain_text
+    """
+
+    def test_backfills_plain_text_and_search_index(self):
+        Section.objects.bulk_create([Section(title="Fittings", content="<p>Shield <b>fits</b></p>")])
+
+        out = StringIO()
+        call_command("simplewiki_backfill_plain_text", stdout=out)
+
+        self.assertIn("Updated the plain text of 1 sections", out.getvalue())
+        self.assertEqual(Section.objects.get(title="Fittings").plain_text, "Shield fits")
+        self.assertEqual(list(search_sections("shield").values_list('title', flat=True)), ["Fittings"])
+
+
+class TestRebalanceOrderCommand(TestCase):
+    """
+    Tests for simplewiki_rebalance_order
+    """
+
+    def test_spreads_crowded_siblings(self):
+        fleet = Menu.objects.create(title="Fleet", path="fleet", index=0)
+        rules = Menu.objects.create(title="Rules", path="rules", index=4096)
+        crowded = [Section.objects.create(title=f"Fleet {i}", menu=fleet, index=10 + i) for i in range(3)]
+        spread = [Section.objects.create(title=f"Rules {i}", menu=rules, index=i * 2048) for i in range(2)]
+
+        out = StringIO()
+        call_command("simplewiki_rebalance_order", stdout=out)
+
+        self.assertIn("Renumbered 0 menus and 3 sections", out.getvalue())
+        self.assertEqual([section.title for section in Section.objects.filter(menu=fleet).order_by('index')],
+                         [section.title for section in crowded])
+        self.assertEqual(list(Section.objects.filter(menu=fleet).order_by('index').values_list('index', flat=True)), [0, 1024, 2048])
+        self.assertEqual(Section.objects.get(pk=spread[1].pk).index, 2048)
+
+
+class TestMigrateV11Command(TestCase):
+    """
+    Tests for simplewiki_migrate_v1_1
+    """
+
+    def test_only_assigns_existing_groups(self):
+        directors = Group.objects.create(name="Directors")
+        MenuItem.objects.create(index=0, title="Doctrines", path="doctrines", groups="Directors,Directros")
+        MenuItem.objects.create(index=1, title="Fleet", path="fleet", parent="doctrines", groups="Typo")
+
+        with patch("builtins.print"):
+            call_command("simplewiki_migrate_v1_1")
+
+        self.assertEqual(list(Menu.objects.get(path="doctrines").groups.all()), [directors])
+        self.assertEqual(list(Menu.objects.get(path="fleet").groups.values_list('name', flat=True)), [RESTRICTED_GROUP])
+        self.assertEqual(list(Group.objects.order_by('name').values_list('name', flat=True)), ["Directors", RESTRICTED_GROUP])
+
+    def test_menu_with_only_unknown_groups_stays_hidden(self):
+        directors = Group.objects.create(name="Directors")
+        MenuItem.objects.create(index=0, title="Doctrines", path="doctrines", groups="Typo")
+        MenuItem.objects.create(index=1, title="Public", path="public", groups="")
+
+        with patch("builtins.print"):
+            call_command("simplewiki_migrate_v1_1")
+
+        visible = Menu.objects.accessible_by([directors.id], None).values_list('path', flat=True)
+        self.assertEqual(list(visible), ["public"])
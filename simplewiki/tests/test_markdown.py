@@ -0,0 +1,153 @@
+"""
+simplewiki markdown tests
+"""
+
+# Python
+import threading
+
+# Django
+from django.test import TestCase
+
+from simplewiki.markdown.directives import register_directive, unregister_directive
+from simplewiki.markdown.blocks import split_blocks
+from simplewiki.markdown.engine import RenderCache, block_cache, create_markdown, get_markdown, render_blocks, render_cache, render_markdown
+from simplewiki.markdown.renderer import SimpleWikiRenderer
+from simplewiki.templatetags.markdown_filters import markdown_to_html
+
+
+class TestMarkdownEngine(TestCase):
+    """
+    Tests for the shared markdown parser and its render cache
+    """
+
+    def setUp(self):
+        render_cache.clear()
+        block_cache.clear()
+
+    def test_output_matches_new_parser(self):
+        text = "# Fleet\n\nalert:info:Form up at **Jita**\n\n| a | b |\n|---|---|\n| 1 | 2 |"
+
+        self.assertEqual(markdown_to_html(text), create_markdown()(text))
+
+    def test_parser_is_reused_per_thread(self):
+        self.assertIs(get_markdown(), get_markdown())
+
+        parsers = []
+        thread = threading.Thread(target=lambda: parsers.append(get_markdown()))
+        thread.start()
+        thread.join()
+
+        self.assertIsNot(parsers[0], get_markdown())
+
+    def test_render_cache_counts_hits_and_misses(self):
+        render_markdown("Shield fits")
+        render_markdown("Shield fits")
+        render_markdown("Armor fits")
+
+        info = render_cache.info()
+        self.assertEqual(info['hits'], 1)
+        self.assertEqual(info['misses'], 2)
+        self.assertEqual(info['size'], 2)
+
+    def test_only_changed_blocks_are_rendered(self):
+        text = "# Fleet\n\nForm up in Jita.\n\n- shield\n\n- armor\n\nalert:info:Bring ammo"
+        render_blocks(text)
+        self.assertEqual(block_cache.info()['misses'], 4)
+
+        html = render_blocks(text.replace("Jita", "Amarr"))
+
+        self.assertEqual(block_cache.info()['misses'], 5)
+        self.assertEqual(html, create_markdown()(text.replace("Jita", "Amarr")))
+
+    def test_block_output_matches_whole_document(self):
+        texts = ["para\n- x\n\n- y", 
+                 "```\na\n\n\nb\n```\n\nafter", 
+                 "- item\n\n    continued\n\nnext", 
+                 "    code\n\n\n    more", 
+                 "a\r\n\r\nb\r\n"]
+
+        for text in texts:
+            self.assertEqual(render_blocks(text), create_markdown()(text))
+
+    def test_documents_with_definitions_are_not_split(self):
+        self.assertIsNone(split_blocks("Fits[^1]\n\n[^1]: Shield"))
+        self.assertIsNone(split_blocks("[zkill]\n\n[zkill]: https://zkillboard.com"))
+        self.assertIsNone(split_blocks("<pre>\n\nx\n</pre>"))
+        self.assertEqual(len(split_blocks("a\n\nb")), 2)
+
+    def test_lazy_blockquotes_are_not_split(self):
+        texts = ["> quote\nlazy\n\nnext",
+                 "> quote\n- item\n\n# Fleet",
+                 "  indented\n+ shield\n\n>quote\n2) armor"]
+
+        for text in texts:
+            self.assertIsNone(split_blocks(text))
+            self.assertEqual(render_blocks(text), create_markdown()(text))
+
+    def test_lazy_lists_are_not_split(self):
+        texts = ["> quote\n1. one\n\n---",
+                 "- item\nlazy\n\n  continued\n\nnext"]
+
+        for text in texts:
+            self.assertEqual(render_blocks(text), create_markdown()(text))
+
+    def test_fence_inside_paragraph_is_not_split(self):
+        texts = ["</div>\n```\n\n```\n\n~~~~",
+                 "Fits\n~~~\n\nshield\n~~~"]
+
+        for text in texts:
+            self.assertIsNone(split_blocks(text))
+            self.assertEqual(render_blocks(text), create_markdown()(text))
+
+    def test_empty_list_items_are_not_split(self):
+        texts = ["- item\n-\n\n---",
+                 "* item\n* \n\n| a | b |",
+                 "1. one\n1. \n\n"]
+
+        for text in texts:
+            self.assertIsNone(split_blocks(text))
+            self.assertEqual(render_blocks(text), create_markdown()(text))
+
+    def test_render_cache_drops_least_recently_used(self):
+        lru = RenderCache(2)
+        lru.set("a", "<p>a</p>")
+        lru.set("b", "<p>b</p>")
+        lru.get("a")
+        lru.set("c", "<p>c</p>")
+
+        self.assertEqual(lru.get("b"), None)
+        self.assertEqual(lru.get("a"), "<p>a</p>")
+        self.assertEqual(len(lru), 2)
+
+
+class TestDirectives(TestCase):
+    """
+    Tests for the paragraph directives of the SimpleWikiRenderer
+    """
+
+    def setUp(self):
+        self.renderer = SimpleWikiRenderer()
+
+    def test_directive_output(self):
+        self.assertEqual(self.renderer.paragraph("youtube:abc:50%"), 
+                         '<iframe width="50%" height="720px" src="https://www.youtube.com/embed/abc" frameborder="0" allowfullscreen></iframe>')
+        self.assertEqual(self.renderer.paragraph("youtube:"), "youtube:")
+        self.assertEqual(self.renderer.paragraph("alert:info:Form up: now"), 
+                         '<div class="alert alert-info" role="alert">Form up: now</div>')
+        self.assertEqual(self.renderer.paragraph("alert:unknown:text"), "alert:unknown:text")
+        self.assertEqual(self.renderer.paragraph("gdrive:abc"), 
+                         '<iframe src="https://drive.google.com/embeddedfolderview?id=abc#list" width="100%" height="600px" style="border:0px;"></iframe>')
+        self.assertEqual(self.renderer.paragraph("a __b__ c"), "a <u>b</u> c<br>")
+        self.assertEqual(self.renderer.paragraph("Youtube:abc"), "<p>Youtube:abc</p>\n")
+
+    def test_register_directive(self):
+        @register_directive("quote")
+        def quote(text, parts):
+            return "<blockquote>" + ":".join(parts[1:]).strip() + "</blockquote>"
+
+        try:
+            self.assertEqual(self.renderer.paragraph("quote: Fly safe"), "<blockquote>Fly safe</blockquote>")
+        finally:
+            unregister_directive("quote")
+
+        self.assertEqual(self.renderer.paragraph("quote: Fly safe"), "<p>quote: Fly safe</p>\n")
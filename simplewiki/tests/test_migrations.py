@@ -0,0 +1,54 @@
+"""
+simplewiki migration tests
+"""
+
+# Django
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+# Alliance Auth
+from allianceauth.authentication.models import State
+
+from simplewiki.access import RESTRICTED_GROUP
+from simplewiki.models import Menu
+
+
+class TestMigrateMenuAccess(TransactionTestCase):
+    """
+    Tests for migration 0035, which moves the menu groups and states into relations
+    """
+
+    migrate_from = [('simplewiki', '0034_menu_access_groups_menu_access_states')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        self.migrate_to = executor.loader.graph.leaf_nodes('simplewiki')
+        executor.migrate(self.migrate_from)
+        self.apps = executor.loader.project_state(self.migrate_from).apps
+
+    def tearDown(self):
+        MigrationExecutor(connection).migrate(self.migrate_to)
+
+    def migrate(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.migrate_to)
+
+    def test_menus_with_only_unknown_names_stay_hidden(self):
+        directors = Group.objects.create(name="Directors")
+        member = State.objects.get(name="Member")
+
+        OldMenu = self.apps.get_model('simplewiki', 'Menu')
+        OldMenu.objects.create(title="Typo Groups", path="typo-groups", index=0, groups="Directros", states="")
+        OldMenu.objects.create(title="Typo States", path="typo-states", index=1, groups="Directors", states="Memebr")
+        OldMenu.objects.create(title="Directors", path="directors", index=2, groups="Directors,Directros", states="Member")
+        OldMenu.objects.create(title="Public", path="public", index=3, groups="", states="")
+
+        self.migrate()
+
+        visible = Menu.objects.accessible_by([directors.id], member.id).order_by('index').values_list('path', flat=True)
+        self.assertEqual(list(visible), ["directors", "public"])
+        self.assertEqual(list(Menu.objects.get(path="typo-states").groups.values_list('name', flat=True)), [RESTRICTED_GROUP])
+        self.assertFalse(Group.objects.filter(name="Directros").exists())
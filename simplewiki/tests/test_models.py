@@ -0,0 +1,47 @@
+"""
+simplewiki model tests
+"""
+
+# Django
+from django.test import TestCase
+
+from simplewiki.models import Menu, MenuSummary, Section
+
+
+class TestMenuSummary(TestCase):
+    """
+    Tests for the per-menu section summary
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fleet = Menu.objects.create(title="Fleet", path="fleet", index=0)
+        cls.mining = Menu.objects.create(title="Mining", path="mining", index=1)
+
+    def test_section_save_updates_summary(self):
+        Section.objects.create(title="Fittings", menu=self.fleet, last_edit="Bruce Wayne", last_edit_id=1001)
+        Section.objects.create(title="Doctrines", menu=self.fleet, last_edit="Alfred", last_edit_id=1002)
+
+        summary = MenuSummary.objects.get(menu=self.fleet)
+        self.assertEqual(summary.section_count, 2)
+        self.assertEqual(summary.last_edit, "Alfred")
+        self.assertEqual(summary.content_version, 2)
+        self.assertIsNotNone(summary.last_edit_at)
+
+    def test_moved_section_updates_both_menus(self):
+        section = Section.objects.create(title="Fittings", menu=self.fleet)
+
+        section.menu = self.mining
+        section.save()
+
+        self.assertEqual(MenuSummary.objects.get(menu=self.fleet).section_count, 0)
+        self.assertEqual(MenuSummary.objects.get(menu=self.mining).section_count, 1)
+
+    def test_section_delete_updates_summary(self):
+        section = Section.objects.create(title="Fittings", menu=self.fleet, last_edit="Bruce Wayne")
+        section.delete()
+
+        summary = MenuSummary.objects.get(menu=self.fleet)
+        self.assertEqual(summary.section_count, 0)
+        self.assertEqual(summary.last_edit, "")
+        self.assertIsNone(summary.last_edit_at)
@@ -0,0 +1,96 @@
+"""
+simplewiki revision tests
+"""
+
+# Python
+import copy
+from unittest.mock import patch
+
+# Django
+from django.test import TestCase
+
+from simplewiki.models import Menu, Section, SectionRevision
+from simplewiki.revisions import apply_delta, get_revision_content, make_delta, record_revision
+
+
+def edit(section, content):
+    previous = copy.copy(section)
+    section.content = content
+    section.save()
+    return record_revision(section, previous)
+
+
+class TestDelta(TestCase):
+    """
+    Tests for the difference encoding
+    """
+
+    def test_delta_round_trip(self):
+        old = '<p>Shield fits</p><ul><li>Drake</li><li>Ferox</li></ul>\nArmor'
+        new = '<p>Shield fits</p><ul><li>Drake</li><li>Cyclone</li></ul>\nArmor fits'
+
+        self.assertEqual(apply_delta(old, make_delta(old, new)), new)
+        self.assertEqual(apply_delta(new, make_delta(new, old)), old)
+        self.assertEqual(apply_delta("", make_delta("", new)), new)
+        self.assertEqual(apply_delta(new, make_delta(new, "")), "")
+
+
+@patch("simplewiki.revisions.simplewiki_revision_snapshot_interval", 3)
+class TestRevisions(TestCase):
+    """
+    Tests for storing and reconstructing revisions
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.menu = Menu.objects.create(title="Fleet", path="fleet", index=0)
+
+    def test_snapshots_and_differences(self):
+        paragraph = "<p>Fly in formation and keep your transversal.</p>\n" * 50
+        section = Section.objects.create(title="Fittings", menu=self.menu, content=paragraph)
+        record_revision(section)
+
+        contents = [paragraph]
+        for number in range(2, 8):
+            contents.append(paragraph + f"<p>Change {number}</p>")
+            edit(section, contents[-1])
+
+        revisions = list(SectionRevision.objects.filter(section=section).order_by('number').values_list('number', 'base', 'is_snapshot'))
+        self.assertEqual(revisions, [(1, 1, True), (2, 1, False), (3, 1, False), (4, 4, True),
+                                     (5, 4, False), (6, 4, False), (7, 7, True)])
+
+        for number, content in enumerate(contents, 1):
+            self.assertEqual(get_revision_content(section.id, number), content)
+
+        # The snapshot and at most interval - 1 differences are read with one query
+        with self.assertNumQueries(1):
+            get_revision_content(section.id, 6)
+
+        with self.assertRaises(SectionRevision.DoesNotExist):
+            get_revision_content(section.id, 8)
+
+    def test_unchanged_content_is_not_stored(self):
+        section = Section.objects.create(title="Fittings", menu=self.menu, content="<p>Shield</p>")
+        record_revision(section)
+
+        self.assertIsNone(edit(section, "<p>Shield</p>"))
+        self.assertEqual(SectionRevision.objects.filter(section=section).count(), 1)
+
+    def test_first_edit_keeps_the_previous_content(self):
+        section = Section.objects.create(title="Fittings", menu=self.menu, content="<p>Shield</p>", last_edit="Alfred")
+
+        revision = edit(section, "<p>Armor</p>")
+
+        self.assertEqual(revision.number, 2)
+        self.assertEqual(get_revision_content(section.id, 1), "<p>Shield</p>")
+        self.assertEqual(SectionRevision.objects.get(section=section, number=1).last_edit, "Alfred")
+
+    def test_content_changed_without_revision_is_reconstructed(self):
+        section = Section.objects.create(title="Fittings", menu=self.menu, content="<p>Shield</p>" * 20)
+        record_revision(section)
+        Section.objects.filter(pk=section.pk).update(content="<p>Bulk</p>")
+        section.refresh_from_db()
+
+        edit(section, "<p>Shield</p>" * 20 + "<p>Armor</p>")
+
+        self.assertEqual(get_revision_content(section.id, 2), "<p>Shield</p>" * 20 + "<p>Armor</p>")
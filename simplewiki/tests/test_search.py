@@ -0,0 +1,181 @@
+"""
+simplewiki search tests
+"""
+
+# Python
+from unittest import skipUnless
+from unittest.mock import patch
+
+# Django
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+
+from simplewiki import search_index
+from simplewiki.models import Menu, Section
+from simplewiki.search_index import (PythonSearchBackend, TrigramDatabaseBackend, TrigramIndex, get_search_backend, 
+                                     search_page, search_sections, trigrams)
+from simplewiki.text import html_to_text, make_snippet
+
+
+class TestPlainText(TestCase):
+    """
+    Tests for the plain text column of sections
+    """
+
+    def test_html_to_text(self):
+        self.assertEqual(html_to_text('<p>Shield&nbsp;fits</p><p>for   the\n<b>Ferox</b></p>'), "Shield fits for the Ferox")
+        self.assertEqual(html_to_text('<div class="alert">Hi</div><script>var alert = 1;</script>'), "Hi")
+        self.assertEqual(html_to_text(""), "")
+
+    def test_plain_text_is_set_on_save(self):
+        section = Section.objects.create(title="Fittings", content="<h1>Fleet</h1><ul><li>Shield</li><li>Armor</li></ul>")
+        self.assertEqual(section.plain_text, "Fleet Shield Armor")
+
+        section.content = "<p>Capacitor</p>"
+        section.save(update_fields=['content'])
+        self.assertEqual(Section.objects.get(pk=section.pk).plain_text, "Capacitor")
+
+    def test_make_snippet(self):
+        self.assertEqual(make_snippet("Shield fits for the <Ferox>", ["fer", "shield"]),
+                         "<mark>Shield</mark> fits for the &lt;<mark>Ferox</mark>&gt;")
+
+        snippet = make_snippet("word " * 100 + "Ferox tank " + "word " * 100, ["ferox"], length=60)
+        self.assertTrue(snippet.startswith("… word"))
+        self.assertTrue(snippet.endswith(" …"))
+        self.assertIn("<mark>Ferox</mark> tank", snippet)
+        self.assertLessEqual(len(snippet), 60 + len("… <mark></mark> …"))
+
+
+class SearchIndexTestMixin:
+    """
+    Tests run against every search backend
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.menu = Menu.objects.create(title="Fleet", path="fleet", index=0)
+        cls.fittings = Section.objects.create(title="Fittings", menu=cls.menu, 
+                                              content='<div class="alert">Shield fits for the Ferox</div>')
+        cls.doctrines = Section.objects.create(title="Doctrines", menu=cls.menu, 
+                                               content="<p>Armor doctrine, bring a Ferox anyway</p>")
+
+    def search(self, query):
+        return set(search_sections(query).values_list('title', flat=True))
+
+    def test_words_and_prefixes_match(self):
+        self.assertEqual(self.search("ferox"), {"Fittings", "Doctrines"})
+        self.assertEqual(self.search("FEROX shi"), {"Fittings"})
+        self.assertEqual(self.search("doctr"), {"Doctrines"})
+
+    def test_html_markup_is_not_indexed(self):
+        self.assertEqual(self.search("alert"), set())
+        self.assertEqual(self.search("div"), set())
+
+    def test_index_follows_saves_and_deletes(self):
+        self.fittings.content = "<p>Capacitor boosters</p>"
+        self.fittings.save()
+        self.assertEqual(self.search("shield"), set())
+        self.assertEqual(self.search("capacitor"), {"Fittings"})
+
+        self.doctrines.delete()
+        self.assertEqual(self.search("armor"), set())
+
+    def test_empty_query_matches_nothing(self):
+        self.assertEqual(self.search("  !? "), set())
+
+    def test_fuzzy_search_finds_misspelled_words(self):
+        results, _ = search_page("ferrox shild", {self.menu.id}, fuzzy=True)
+
+        self.assertEqual([section.title for section in results], ["Fittings"])
+        self.assertEqual(results[0].terms, ["ferox", "shield"])
+
+        self.fittings.delete()
+        self.assertEqual([section.title for section in search_page("ferrox", {self.menu.id}, fuzzy=True)[0]], ["Doctrines"])
+
+    def test_search_page_skips_inaccessible_sections(self):
+        secret = Menu.objects.create(title="Secret", path="secret", index=1)
+        secret.groups.add(Group.objects.create(name="Directors"))
+        Section.objects.create(title="Plans", menu=secret, content="<p>Ferox fleet plans</p>")
+        Section.objects.create(title="Drafts", content="<p>Ferox drafts</p>")
+
+        results, _ = search_page("ferox", {self.menu.id})
+        self.assertEqual({section.title for section in results}, {"Fittings", "Doctrines"})
+
+        results, _ = search_page("ferox", {self.menu.id, secret.id})
+        self.assertEqual({section.title for section in results}, {"Fittings", "Doctrines", "Plans"})
+
+    def test_search_page_follows_cursor(self):
+        first, cursor = search_page("ferox", {self.menu.id}, page_size=1)
+        second, last_cursor = search_page("ferox", {self.menu.id}, cursor, page_size=1)
+
+        self.assertEqual({first[0].title, second[0].title}, {"Fittings", "Doctrines"})
+        self.assertIsNone(last_cursor)
+        self.assertEqual(search_page("ferox", set()), ([], None))
+
+
+class TestDatabaseSearch(SearchIndexTestMixin, TestCase):
+
+    def test_uses_fts5(self):
+        self.assertEqual(get_search_backend().name, 'database')
+
+
+class TestPythonSearch(SearchIndexTestMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        patcher = patch.object(search_index, '_backend', PythonSearchBackend())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_index_changes_after_commit(self):
+        self.assertEqual(self.search("capacitor"), set())
+        version = cache.get(search_index.INDEX_VERSION_KEY)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fittings.content = "<p>Capacitor boosters</p>"
+            self.fittings.save()
+            # Other processes must not rebuild their index from the uncommitted rows under a new version
+            self.assertEqual(cache.get(search_index.INDEX_VERSION_KEY), version)
+
+        self.assertEqual(cache.get(search_index.INDEX_VERSION_KEY), version + 1)
+        self.assertEqual(self.search("capacitor"), {"Fittings"})
+
+
+@skipUnless(connection.vendor == 'postgresql', "pg_trgm is only available on PostgreSQL")
+class TestTrigramDatabaseSearch(TestCase):
+    """
+    Tests for fuzzy searches with pg_trgm
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fittings = Section.objects.create(title="Fittings", content="<p>Shield fits for the Ferox</p>")
+
+    def test_fuzzy_threshold_is_applied(self):
+        # "sheeld" has a word similarity of 4/7 to "shield", below the pg_trgm default of 0.6
+        with patch.object(search_index, 'simplewiki_search_fuzzy_threshold', 0.4):
+            self.assertEqual(list(TrigramDatabaseBackend().search(["sheeld"])), [self.fittings])
+
+        with patch.object(search_index, 'simplewiki_search_fuzzy_threshold', 0.7):
+            self.assertEqual(list(TrigramDatabaseBackend().search(["sheeld"])), [])
+
+
+class TestTrigramIndex(TestCase):
+    """
+    Tests for the in-memory trigram index
+    """
+
+    def test_similar_words(self):
+        self.assertEqual(trigrams("ab"), {"  a", " ab", "ab "})
+
+        index = TrigramIndex()
+        index.add(1, "Ferox Vexor Drake")
+        index.add(2, "Ferox fleet")
+
+        self.assertEqual(set(index.similar("ferrox", 0.4)), {"ferox"})
+        self.assertEqual(set(index.fuzzy_search(["ferox", "vexxor"], 0.4)), {1})
+
+        index.remove(1)
+        self.assertEqual(index.similar("vexxor", 0.4), {})
@@ -0,0 +1,328 @@
+"""
+simplewiki view tests
+"""
+
+# Python
+import json
+from unittest.mock import patch
+
+# Django
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import TestCase
+from django.urls import reverse
+
+# Alliance Auth
+from allianceauth.authentication.models import State
+from allianceauth.tests.auth_utils import AuthUtils
+
+from simplewiki.models import Menu, Section
+from simplewiki.views_helper import get_navbar_cache_version
+
+
+def fake_render(request, template_name, context=None, *args, **kwargs):
+    """
+    Replaces django's render, the page templates extend the Alliance Auth theme 
+    which is not installed in the test project
+    """
+
+    response = HttpResponse(template_name)
+    response.template_name = template_name
+    response.wiki_context = context
+    return response
+
+
+@patch("simplewiki.views.render", fake_render)
+class TestViews(TestCase):
+    """
+    Tests for the reader views
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = AuthUtils.create_user("Bruce Wayne")
+        AuthUtils.add_main_character_2(cls.user, "Bruce Wayne", 1001)
+        AuthUtils.add_permission_to_user_by_name("simplewiki.basic_access", cls.user)
+
+        cls.parent = Menu.objects.create(title="Doctrines", path="doctrines", index=0)
+        cls.child = Menu.objects.create(title="Fleet", path="fleet", index=1, parent=cls.parent)
+        cls.secret = Menu.objects.create(title="Secret", path="secret", index=2, parent=cls.parent)
+        cls.secret.groups.add(Group.objects.create(name="Directors"))
+        cls.section = Section.objects.create(title="Fittings", menu=cls.child, content="<p>Shield fits</p>")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_index_redirects_to_first_accessible_menu(self):
+        response = self.client.get(reverse("simplewiki:index"))
+
+        self.assertRedirects(response, reverse("simplewiki:dynamic_menu", args=["fleet"]), fetch_redirect_response=False)
+
+    def test_dynamic_menu_renders_sections(self):
+        response = self.client.get(reverse("simplewiki:dynamic_menu", args=["fleet"]))
+
+        self.assertEqual(response.template_name, 'simplewiki/dynamic_page.html')
+        self.assertIn("Shield fits", response.wiki_context['page_body'])
+
+        navbar = response.wiki_context['navbar']
+        self.assertEqual([submenu['path'] for submenu in navbar[0]['submenus']], ["fleet"])
+
+    def test_unchanged_page_returns_not_modified(self):
+        url = reverse("simplewiki:dynamic_menu", args=["fleet"])
+        etag = self.client.get(url).headers['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.section.content = "<p>Armor fits</p>"
+        self.section.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Armor fits", response.wiki_context['page_body'])
+
+    def test_reader_context_has_no_editor_entries(self):
+        response = self.client.get(reverse("simplewiki:dynamic_menu", args=["fleet"]))
+
+        self.assertNotIn('all_groups', response.wiki_context)
+        self.assertNotIn('section_items', response.wiki_context)
+
+    def test_unknown_menu_renders_error(self):
+        response = self.client.get(reverse("simplewiki:dynamic_menu", args=["unknown"]))
+
+        self.assertEqual(response.wiki_context['error_code'], 'USER_MENU_NOT_FOUND')
+
+    def test_menu_without_group_renders_error(self):
+        response = self.client.get(reverse("simplewiki:dynamic_menu", args=["secret"]))
+
+        self.assertEqual(response.wiki_context['error_code'], 'USER_PERMISSION_MISSING_GROUP')
+
+    def test_submenu_requires_parent_access(self):
+        self.parent.states.add(State.objects.get(name="Member"))
+
+        response = self.client.get(reverse("simplewiki:dynamic_menu", args=["fleet"]))
+
+        self.assertEqual(response.wiki_context['error_code'], 'USER_PERMISSION_MISSING_STATE')
+
+    def test_lazy_page_renders_only_titles(self):
+        self.child.lazy_sections = True
+        self.child.save()
+
+        response = self.client.get(reverse("simplewiki:dynamic_menu", args=["fleet"]))
+
+        self.assertIn("Fittings", response.wiki_context['page_body'])
+        self.assertNotIn("Shield fits", response.wiki_context['page_body'])
+        self.assertIn(reverse("simplewiki:section_body", args=["fleet", self.section.id]), response.wiki_context['page_body'])
+
+    def test_renamed_menu_renders_new_section_links(self):
+        self.child.lazy_sections = True
+        self.child.save()
+        self.client.get(reverse("simplewiki:dynamic_menu", args=["fleet"]))
+
+        self.child.path = "fleet-ops"
+        self.child.save()
+
+        response = self.client.get(reverse("simplewiki:dynamic_menu", args=["fleet-ops"]))
+        self.assertIn(reverse("simplewiki:section_body", args=["fleet-ops", self.section.id]), response.wiki_context['page_body'])
+
+    def test_section_body_returns_content(self):
+        url = reverse("simplewiki:section_body", args=["fleet", self.section.id])
+
+        response = self.client.get(url)
+        self.assertEqual(response.content, b"<p>Shield fits</p>")
+
+        response = self.client.get(url, {'format': 'json'})
+        self.assertEqual(response.json()['content'], "<p>Shield fits</p>")
+
+        response = self.client.get(url, {'format': 'json'}, HTTP_IF_NONE_MATCH=response.headers['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_section_body_checks_access(self):
+        hidden = Section.objects.create(title="Plans", menu=self.secret, content="<p>Top secret</p>")
+
+        response = self.client.get(reverse("simplewiki:section_body", args=["secret", hidden.id]), {'format': 'json'})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['status'], 'error')
+
+        # The section has to belong to the requested menu
+        response = self.client.get(reverse("simplewiki:section_body", args=["fleet", hidden.id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_search_only_returns_accessible_sections(self):
+        Section.objects.create(title="Plans", menu=self.secret, content="<p>Secret shield fits</p>")
+        Section.objects.create(title="Drafts", menu=None, content="<p>Shield drafts</p>")
+
+        response = self.client.get(reverse("simplewiki:search"), {'query': "shield"})
+
+        self.assertNotIn('error_code', response.wiki_context)
+        self.assertEqual([section.title for section in response.wiki_context['available_results']], ["Fittings"])
+        self.assertEqual(response.wiki_context['available_results'][0].snippet, "<mark>Shield</mark> fits")
+
+    def test_search_pages_with_cursor(self):
+        for number in range(3):
+            Section.objects.create(title=f"Shield {number}", menu=self.child, content="<p>Shield shield tank</p>")
+        for number in range(6):
+            Section.objects.create(title=f"Armor {number}", menu=self.child, content="<p>Armor tank</p>")
+
+        with patch("simplewiki.views.simplewiki_search_page_size", 2):
+            first = self.client.get(reverse("simplewiki:search"), {'query': "shield", 'format': 'json'}).json()
+            second = self.client.get(reverse("simplewiki:search"), 
+                                     {'query': "shield", 'format': 'json', 'cursor': first['next_cursor']}).json()
+
+        self.assertEqual(len(first['results']), 2)
+        self.assertEqual(len(second['results']), 2)
+        self.assertIsNone(second['next_cursor'])
+
+        titles = [result['title'] for result in first['results'] + second['results']]
+        self.assertEqual(sorted(titles), ["Fittings", "Shield 0", "Shield 1", "Shield 2"])
+        # Sections with the word in the title and the text rank first
+        self.assertEqual(titles[-1], "Fittings")
+        self.assertEqual(first['results'][0]['url'], reverse("simplewiki:dynamic_menu", args=["fleet"]) + "#Shield%200")
+
+    def test_search_suggest_returns_accessible_titles(self):
+        Section.objects.create(title="Fleet Plans", menu=self.secret, content="<p>Top secret</p>")
+        url = reverse("simplewiki:search_suggest")
+
+        suggestions = self.client.get(url, {'query': "fi"}).json()['suggestions']
+        self.assertEqual([(item['type'], item['title']) for item in suggestions], [('section', "Fittings")])
+        self.assertEqual(suggestions[0]['url'], reverse("simplewiki:dynamic_menu", args=["fleet"]) + "#Fittings")
+
+        self.assertEqual([item['title'] for item in self.client.get(url, {'query': "fle"}).json()['suggestions']], ["Fleet"])
+
+        # Renaming a section rebuilds the title index once the rename is committed
+        with self.captureOnCommitCallbacks(execute=True):
+            self.section.title = "Doctrine Fits"
+            self.section.save()
+            suggestions = self.client.get(url, {'query': "fi"}).json()['suggestions']
+            self.assertEqual([item['title'] for item in suggestions], ["Fittings"])
+
+        suggestions = self.client.get(url, {'query': "fi"}).json()['suggestions']
+        self.assertEqual([item['title'] for item in suggestions], ["Doctrine Fits"])
+
+    def test_search_falls_back_to_similar_words(self):
+        response = self.client.get(reverse("simplewiki:search"), {'query': "shild"})
+
+        self.assertTrue(response.wiki_context['fuzzy'])
+        self.assertEqual([section.title for section in response.wiki_context['available_results']], ["Fittings"])
+        self.assertEqual(response.wiki_context['available_results'][0].snippet, "<mark>Shield</mark> fits")
+
+    def test_editor_sort_post_updates_all_menus_at_once(self):
+        AuthUtils.add_permission_to_user_by_name("simplewiki.editor_access", self.user)
+        other = Menu.objects.create(title="Rules", path="rules", index=3)
+        url = reverse("simplewiki:editor_sort_post")
+        data = [{'id': other.id, 'children': [{'id': self.secret.id}]},
+                {'id': self.parent.id, 'children': [{'id': self.child.id}]}]
+
+        # Session, user and permissions, then one select and one update in a savepoint
+        with self.assertNumQueries(12):
+            response = self.client.post(url, {'data': json.dumps(data)})
+        self.assertEqual(response.json(), {'status': 'success', 'updated': 4})
+
+        menus = {menu.id: (menu.index, menu.parent_id) for menu in Menu.objects.all()}
+        self.assertEqual(menus, {other.id: (0, None), self.secret.id: (0, other.id), 
+                                 self.parent.id: (1024, None), self.child.id: (0, self.parent.id)})
+
+        # Unknown menus change nothing
+        data[0]['id'] = 999
+        response = self.client.post(url, {'data': json.dumps(data)})
+        self.assertEqual(response.json()['status'], 'error')
+        self.assertEqual(Menu.objects.get(pk=self.secret.id).parent_id, other.id)
+
+    def test_editor_sort_move_only_writes_the_moved_menu(self):
+        AuthUtils.add_permission_to_user_by_name("simplewiki.editor_access", self.user)
+        Menu.objects.filter(pk=self.parent.pk).update(index=0)
+        Menu.objects.filter(pk=self.child.pk).update(index=1024)
+        Menu.objects.filter(pk=self.secret.pk).update(index=2048)
+        url = reverse("simplewiki:editor_sort_move")
+
+        # Secret moves in front of Fleet
+        response = self.client.post(url, {'menu_id': self.secret.id, 'parent_id': self.parent.id, 
+                                          'after_id': "", 'before_id': self.child.id})
+        self.assertEqual(response.json(), {'status': 'success', 'index': 0})
+        self.assertEqual(Menu.objects.get(pk=self.child.pk).index, 1024)
+
+        # Fleet moves to the root level, after Doctrines
+        response = self.client.post(url, {'menu_id': self.child.id, 'parent_id': "", 'after_id': self.parent.id, 'before_id': ""})
+        self.assertEqual(response.json()['status'], 'success')
+        self.assertEqual(Menu.objects.get(pk=self.child.pk).parent_id, None)
+
+        # Menus with submenus stay parent menus
+        response = self.client.post(url, {'menu_id': self.parent.id, 'parent_id': self.child.id})
+        self.assertEqual(response.json()['status'], 'error')
+
+    def test_editor_sort_move_invalidates_caches_after_commit(self):
+        AuthUtils.add_permission_to_user_by_name("simplewiki.editor_access", self.user)
+        version = get_navbar_cache_version()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post(reverse("simplewiki:editor_sort_move"), 
+                                        {'menu_id': self.secret.id, 'parent_id': "", 'after_id': self.parent.id, 'before_id': ""})
+            self.assertEqual(response.json()['status'], 'success')
+            self.assertEqual(get_navbar_cache_version(), version)
+
+        self.assertTrue(callbacks)
+        self.assertNotEqual(get_navbar_cache_version(), version)
+
+    def test_editor_sort_move_rejects_stale_neighbours(self):
+        AuthUtils.add_permission_to_user_by_name("simplewiki.editor_access", self.user)
+        other = Menu.objects.create(title="Rules", path="rules", index=0)
+        Menu.objects.filter(pk=self.child.pk).update(index=1024)
+        Menu.objects.filter(pk=self.secret.pk).update(index=2048)
+        url = reverse("simplewiki:editor_sort_move")
+
+        # Neighbours in the wrong order
+        response = self.client.post(url, {'menu_id': other.id, 'parent_id': self.parent.id, 'after_id': self.secret.id, 'before_id': self.child.id})
+        self.assertEqual(response.status_code, 400)
+
+        # Neighbours below another parent
+        response = self.client.post(url, {'menu_id': self.child.id, 'parent_id': "", 'after_id': other.id, 'before_id': self.secret.id})
+        self.assertEqual(response.status_code, 400)
+
+        # Not the last sibling
+        response = self.client.post(url, {'menu_id': other.id, 'parent_id': self.parent.id, 'after_id': self.child.id, 'before_id': ""})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['status'], 'error')
+
+        self.assertEqual(Menu.objects.get(pk=other.pk).parent_id, None)
+
+    def test_editor_sort_move_rebalances_without_room(self):
+        AuthUtils.add_permission_to_user_by_name("simplewiki.editor_access", self.user)
+        other = Menu.objects.create(title="Rules", path="rules", index=2, parent=self.parent)
+        Menu.objects.filter(pk=self.child.pk).update(index=1)
+
+        response = self.client.post(reverse("simplewiki:editor_sort_move"), 
+                                    {'menu_id': other.id, 'parent_id': self.parent.id, 'after_id': self.child.id, 'before_id': self.secret.id})
+        self.assertEqual(response.json()['status'], 'success')
+
+        children = [menu.title for menu in Menu.objects.filter(parent=self.parent).order_by('index')]
+        self.assertEqual(children, ["Fleet", "Rules", "Secret"])
+
+    def test_section_edit_stores_revisions(self):
+        AuthUtils.add_permission_to_user_by_name("simplewiki.editor_access", self.user)
+        url = reverse("simplewiki:editor_sections") + "?edit=Fittings"
+        data = {'confirm_edit': "1", 'title': "", 'icon': "", 'index': "", 'menu_path': "fleet"}
+
+        self.client.post(url, dict(data, content="<p>Shield fits</p><p>Drake</p>"))
+        self.client.post(url, dict(data, content="<p>Shield fits</p><p>Ferox</p>"))
+
+        response = self.client.get(reverse("simplewiki:editor_section_revisions", args=[self.section.id]))
+        revisions = response.wiki_context['revisions']
+        self.assertEqual([revision.number for revision in revisions], [3, 2, 1])
+        self.assertEqual(revisions[0].last_edit, "Bruce Wayne")
+        self.assertEqual(revisions[0].get_deferred_fields(), {'base', 'checksum', 'data', 'last_edit_id', 'section_id'})
+
+        response = self.client.get(reverse("simplewiki:editor_section_revision", args=[self.section.id, 3]))
+        diff = response.wiki_context['diff']
+        self.assertIn(('removed', "Drake</p>"), diff)
+        self.assertIn(('added', "Ferox</p>"), diff)
+
+        # Restoring stores the old content as a new revision
+        response = self.client.post(reverse("simplewiki:editor_section_revision", args=[self.section.id, 1]))
+        self.assertRedirects(response, reverse("simplewiki:editor_section_revisions", args=[self.section.id]), fetch_redirect_response=False)
+        self.assertEqual(Section.objects.get(pk=self.section.pk).content, "<p>Shield fits</p>")
+        self.assertEqual(self.section.revisions.count(), 4)
+
+        response = self.client.get(reverse("simplewiki:editor_section_revision", args=[self.section.id, 9]))
+        self.assertEqual(response.wiki_context['error_code'], 'EDITOR_SECTION_REVISION_GET')
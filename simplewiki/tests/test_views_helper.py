@@ -0,0 +1,81 @@
+"""
+simplewiki views helper tests
+"""
+
+# Django
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import TestCase
+
+from allianceauth.authentication.models import State
+
+from simplewiki.models import Menu
+from simplewiki.access import AccessPrincipal, access_fingerprint, menu_access_classes
+from simplewiki.views_helper import generate_menu
+
+
+class TestNavbarCache(TestCase):
+    """
+    Tests for the per access profile navbar cache
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def member_principal(self):
+        # A fresh principal per "request", the accessible menus are memoized on it
+        return AccessPrincipal([], [], State.objects.get(name="Member").id, "Member")
+
+    def test_fingerprint_is_canonical(self):
+        self.assertEqual(access_fingerprint(["b", "a"], "Member"),
+                         access_fingerprint(["a", "b", "a"], "Member"))
+        self.assertNotEqual(access_fingerprint(["a"], "Member"),
+                            access_fingerprint(["a"], "Guest"))
+
+    def test_menus_with_same_rules_share_access_class(self):
+        directors = Group.objects.create(name="Directors")
+        public = Menu.objects.create(title="Welcome", path="welcome", index=0)
+        other_public = Menu.objects.create(title="Rules", path="rules", index=1)
+        secret = Menu.objects.create(title="Secret", path="secret", index=2)
+        secret.groups.add(directors)
+        plans = Menu.objects.create(title="Plans", path="plans", index=3, parent=secret)
+        plans.groups.add(directors)
+
+        classes = menu_access_classes()
+
+        self.assertEqual(classes[public.id], classes[other_public.id])
+        self.assertEqual(classes[secret.id], classes[plans.id])
+        self.assertNotEqual(classes[public.id], classes[secret.id])
+        self.assertEqual(bin(classes[secret.id]).count("1"), 1)
+
+    def test_principals_with_same_access_are_equal(self):
+        self.assertEqual(AccessPrincipal([1, 2], ["b", "a"], 1, "Member"),
+                         AccessPrincipal([2, 1], ["a", "b"], 1, "Member"))
+
+    def test_navbar_is_cached(self):
+        Menu.objects.create(title="Welcome", path="welcome", index=0)
+
+        context = {}
+        generate_menu(context, self.member_principal())
+        self.assertEqual([item['path'] for item in context['navbar']], ["welcome"])
+
+        principal = self.member_principal()
+        with self.assertNumQueries(0):
+            generate_menu(context, principal)
+
+    def test_menu_change_invalidates_navbar(self):
+        menu = Menu.objects.create(title="Welcome", path="welcome", index=0)
+
+        context = {}
+        generate_menu(context, self.member_principal())
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            menu.groups.add(Group.objects.create(name="Hidden"))
+
+            # Until the commit other requests still read the old menus, the cached navbar stays
+            generate_menu(context, self.member_principal())
+            self.assertEqual(len(context['navbar']), 1)
+
+        self.assertTrue(callbacks)
+        generate_menu(context, self.member_principal())
+        self.assertEqual(context['navbar'], [])
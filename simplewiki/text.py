@@ -0,0 +1,129 @@
+"""
+Plain text helpers for the section content.
+"""
+
+# Python
+import html
+import re
+
+# Django
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import SafeString, mark_safe
+
+# Tags that separate words, "<p>a</p><p>b</p>" has to become "a b", not "ab"
+_block_tags = re.compile(r"</?(p|div|br|hr|li|ul|ol|tr|td|th|table|thead|tbody|h[1-6]|blockquote|pre|section|article|iframe)\b[^>]*>", re.IGNORECASE)
+_invisible = re.compile(r"<(script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_whitespace = re.compile(r"\s+")
+
+
+def html_to_text(content: str) -> str:
+    """
+    Converts the HTML content of a section into its visible text with single
+    spaces between words.
+
+    Args:
+        content (str): The HTML content
+
+    Returns:
+        str: Returns the plain text
+    """
+
+    if not content:
+        return ""
+
+    text = _invisible.sub(" ", content)
+    text = _block_tags.sub(" ", text)
+    text = html.unescape(strip_tags(text))
+
+    return _whitespace.sub(" ", text).strip()
+
+
+def make_snippet(text: str, words: list, length: int = 240) -> SafeString:
+    """
+    Cuts the part of a plain text around the first matching word and 
+    highlights every word starting with one of the search words.
+
+    Args:
+        text (str): The plain text of a section
+        words (list): The lower case search words
+        length (int): The maximum length of the snippet
+
+    Returns:
+        SafeString: Returns the escaped snippet with the matches in <mark> tags
+    """
+
+    if not text:
+        return mark_safe("")
+
+    pattern = None
+    start = 0
+    if words:
+        alternatives = "|".join(re.escape(word) for word in sorted(set(words), key=len, reverse=True))
+        pattern = re.compile(r"\b(?:" + alternatives + r")\w*", re.IGNORECASE)
+        match = pattern.search(text)
+        if match and match.end() > length:
+            # Show some words in front of the match, starting at a word boundary
+            start = text.find(" ", max(0, match.start() - length // 3), match.start())
+            start = match.start() if start == -1 else start + 1
+
+    end = start + length
+    if end < len(text):
+        space = text.rfind(" ", start, end)
+        end = space if space > start else end
+    else:
+        end = len(text)
+
+    window = text[start:end]
+    parts = []
+    position = 0
+    for match in pattern.finditer(window) if pattern else ():
+        parts.append(escape(window[position:match.start()]))
+        parts.append("<mark>" + escape(match.group()) + "</mark>")
+        position = match.end()
+    parts.append(escape(window[position:]))
+
+    snippet = "".join(parts)
+    if start > 0:
+        snippet = "… " + snippet
+    if end < len(text):
+        snippet = snippet + " …"
+
+    return mark_safe(snippet)
+
+
+def backfill_plain_text(section_model, using: str = 'default', batch_size: int = 500, only_missing: bool = False) -> int:
+    """
+    Computes the plain text of stored sections in batches. Used by the
+    migration and the simplewiki_backfill_plain_text command.
+
+    Args:
+        section_model (Model): The (historical) Section model
+        using (str): The database alias
+        batch_size (int): The number of sections per bulk update
+        only_missing (bool): Only sections without plain text
+
+    Returns:
+        int: Returns the number of changed sections
+    """
+
+    sections = section_model.objects.using(using).order_by('id').only('id', 'content', 'plain_text')
+    if only_missing:
+        sections = sections.filter(plain_text="")
+
+    changed = 0
+    batch = []
+    for section in sections.iterator(chunk_size=batch_size):
+        plain_text = html_to_text(section.content)
+        if plain_text != section.plain_text:
+            section.plain_text = plain_text
+            batch.append(section)
+        if len(batch) >= batch_size:
+            section_model.objects.using(using).bulk_update(batch, ['plain_text'])
+            changed += len(batch)
+            batch = []
+
+    if batch:
+        section_model.objects.using(using).bulk_update(batch, ['plain_text'])
+        changed += len(batch)
+
+    return changed
@@ -10,13 +10,18 @@ urlpatterns = [
     # basic_access pages
     path("", views.index, name="index"),
     path('search/', views.search, name='search'),
+    path('search/suggest/', views.search_suggest, name='search_suggest'),
     path('<str:menu_path>/', views.dynamic_menus, name='dynamic_menu'),
+    path('<str:menu_path>/sections/<int:section_id>/', views.section_body, name='section_body'),
     
     # editor_access pages
     path("editor/menus/", views.editor_menus, name="editor_menus"),
     path("editor/sections/", views.editor_sections, name="editor_sections"),
     path("editor/sort/", views.editor_sort, name="editor_sort"),
+    path("editor/sections/<int:section_id>/revisions/", views.editor_section_revisions, name="editor_section_revisions"),
+    path("editor/sections/<int:section_id>/revisions/<int:number>/", views.editor_section_revision, name="editor_section_revision"),
 
     # rest api
     path("editor/sort/post/", views.editor_sort_post, name="editor_sort_post"),
+    path("editor/sort/move/", views.editor_sort_move, name="editor_sort_move"),
 ]
@@ -3,6 +3,7 @@
 # Python imports
 import inspect
 import json 
+from urllib.parse import quote
 
 # Django imports
 from django.contrib.auth.decorators import login_required, permission_required
@@ -12,8 +13,11 @@ from django.contrib.auth.models import Group
 from django.core.handlers.wsgi import WSGIRequest
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect
+from django.db import transaction
 from django.db.models import Q
 from django.core.exceptions import PermissionDenied
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
 
 from allianceauth.services.hooks import get_extension_logger
 from allianceauth.authentication.models import State
@@ -22,8 +26,14 @@ from allianceauth.authentication.models import State
 from .models import *
 from .admin_helper_menus import *
 from .admin_helper_sections import *
-from .app_settings import simplewiki_display_page_contents
+from .app_settings import simplewiki_display_page_contents, simplewiki_search_snippet_length, simplewiki_search_page_size, simplewiki_search_suggestions
 from .views_helper import *
+from .search_index import search_page, tokenize
+from .ordering import ORDER_GAP, key_between, rebalance
+from .revisions import REVISION_METADATA, diff_lines, get_revision_content
+from .signals import invalidate_menu_caches
+from .suggest import suggest_titles
+from .text import make_snippet
 
 from app_utils.logging import LoggerAddTag
 from . import __title__
@@ -47,52 +57,28 @@ def index(request: WSGIRequest) -> HttpResponse:
 
     context = gen_context(request)
 
-    # Only get parent menus
-    menus = Menu.objects.filter(parent=None).order_by("index")
-
-    user_groups = list(request.user.groups.values_list('name', flat=True))
-    user_state = request.user.profile.state.name
-
-    if menus.count() > 0:
-        for parent_menu in menus:
-            # Extract and format permissions for parent menu
-            group_names, state_names = "", ""
-            if parent_menu.groups or parent_menu.states:
-                group_names = parent_menu.groups.split(',')
-                state_names = parent_menu.states.split(',')
-
-            # If parent menu has groups AND user does not have permission to access the parent menu
-            if parent_menu.groups and not any(group_name in user_groups for group_name in group_names):
-                continue
-
-            # If parent menu has states AND user does not have permission to access the parent menu
-            if parent_menu.states and not any(user_state == state for state in state_names):
-                continue
-
-            # Get all child menus associated with parent_menu
-            child_menus = parent_menu.children.all().order_by("index")
-
-            if child_menus.count() > 0:
-                for child_menu in child_menus:
-                    # Extract and format permission for child menu
-                    child_group_names, child_state_names = None, None
-                    if child_menu.groups is not None or child_menu.states is not None:
-                        child_group_names = child_menu.groups.split(',')
-                        child_state_names = child_menu.states.split(',')
-
-                    # If child menu has groups AND user does not have permission to access the child menu
-                    if (child_menu.groups and not any(child_group_name in user_groups for child_group_name in child_group_names)):
-                        continue
-                    # If child menu has states AND user does not have permission to access the child menu
-                    elif child_menu.states and not any(user_state == state for state in child_state_names):
-                        continue
-                    else:
-                        return redirect('simplewiki:dynamic_menu', child_menu.path)  
-
-                # Navigate to the next menu parent if no children are accessable
-                continue
-            else:
-                return redirect('simplewiki:dynamic_menu', parent_menu.path)
+    menu_tree = context['menu_tree']
+    accessible_menu_ids = context['principal'].accessible_menu_ids
+
+    # Only iterate parent menus
+    for parent_menu in menu_tree.roots:
+        # If user does not have permission to access the parent menu
+        if parent_menu.id not in accessible_menu_ids:
+            continue
+
+        # Get all child menus associated with parent_menu
+        child_menus = menu_tree.children(parent_menu)
+
+        if len(child_menus) > 0:
+            for child_menu in child_menus:
+                # Redirect to the first child menu the user has permission to access
+                if child_menu.id in accessible_menu_ids:
+                    return redirect('simplewiki:dynamic_menu', child_menu.path)  
+
+            # Navigate to the next menu parent if no children are accessable
+            continue
+        else:
+            return redirect('simplewiki:dynamic_menu', parent_menu.path)
     
     error_message = "So far you didn't create any menus. Please create one under Editor -> Edit Menus"
     context.update({'error_code': "NO_MENU_AVAILABLE"})
@@ -123,72 +109,137 @@ def dynamic_menus(request: WSGIRequest, menu_path: str) -> HttpResponse:
 
     context = gen_context(request)
 
-    menu = Menu.objects.get(path=menu_path)
-    sections = Section.objects.filter(menu=menu).order_by('index')
-    sections_count = sections.count()
-
-    context.update({'available_sections': sections})
-    context.update({'available_sections_count': sections_count})
+    menu_tree = context['menu_tree']
 
-    try: 
-        latest_section = Section.objects.filter(menu=menu).latest('last_edit_date')
-        context.update({'latest': True})
-        context.update({'latest_section': latest_section})
-    except Exception as e: 
-        context.update({'latest': False})
-        print("Unable to find latest section")
-
-    # Split all group names. All group names need to be seperated by a comma
-    try:
-        group_names = menu.groups.split(',')
-    except Exception as e:
-        group_names = ""
+    menu = menu_tree.get(menu_path)
+    if menu is None:
+        context.update({'error_code': 'USER_MENU_NOT_FOUND'})
+        context.update({'error_msg': "This menu doesn't exist."})
 
-    context.update({'group_names': group_names})
+        return render(request, 'simplewiki/error.html', context)
 
-    if any(group_name in request.user.groups.values_list('name', flat=True) for group_name in group_names) or any(element == "none" or not element for element in group_names):
-        
-        if not menu.states or request.user.profile.state.name in menu.states:
+    # Only look up the missing permissions if the user can't access the menu
+    if context['principal'].can_access(menu):
+        missing_access = None
+    else:
+        missing_access = get_missing_access(menu, context['principal']) or ('group', [])
 
-            # If menu is a menu with submenus, then throw an error
-            if menu.children.count() > 0:
-                context.update({'error_code': 'USER_MENU_SUBMENU_ERROR'})
-                error_message = "This menu has at least one submenu, please navigate to that one instead."
-                context.update({'error_msg': error_message})
-        
-                return render(request, 'simplewiki/error.html', context)
-            # If menu is a menu without submenus, render the page
-            else:
-                logger_msg = f'Rendering wiki page "{menu_path}" for user "{request.user}".'
-                logger.info(logger_msg)
-
-                return render(request, 'simplewiki/dynamic_page.html', context)
-        # Missing state permission
-        else:
-            context.update({'error_code': 'USER_PERMISSION_MISSING_STATE'})
-            error_message = "You don\'t have the permissions to access this page. You need to be in the <b>" + menu.states + "</b> state."
+    if missing_access is None:
+        # If menu is a menu with submenus, then throw an error
+        if menu_tree.has_children(menu):
+            context.update({'error_code': 'USER_MENU_SUBMENU_ERROR'})
+            error_message = "This menu has at least one submenu, please navigate to that one instead."
             context.update({'error_msg': error_message})
-        
+    
             return render(request, 'simplewiki/error.html', context)
+        # If menu is a menu without submenus, render the page
+        else:
+            summary = get_menu_summary(menu)
+            etag = get_page_etag(request, context, menu, summary)
+            last_modified = int(summary.changed_at.timestamp())
+
+            # Nothing changed since the user's last visit, skip rendering
+            not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                set_page_validators(not_modified, etag, last_modified)
+                return not_modified
+
+            logger_msg = f'Rendering wiki page "{menu_path}" for user "{request.user}".'
+            logger.info(logger_msg)
+
+            context.update({'page_body': get_page_body(request, context, menu, summary)})
+
+            response = render(request, 'simplewiki/dynamic_page.html', context)
+            set_page_validators(response, etag, last_modified)
+
+            return response
+    # Missing state permission
+    elif missing_access[0] == 'state':
+        context.update({'error_code': 'USER_PERMISSION_MISSING_STATE'})
+        error_message = "You don\'t have the permissions to access this page. You need to be in the <b>" + ", ".join(missing_access[1]) + "</b> state."
+        context.update({'error_msg': error_message})
+    
+        return render(request, 'simplewiki/error.html', context)
     # Missing group permission
     else:
-        requested_groups = menu.groups.replace(',', ', ')
+        requested_groups = ", ".join(missing_access[1])
         logger_msg = f'Rejected rendering request for menu "{menu_path}", user "{request.user}" doesn\'t have neccessary groups "{requested_groups}"'
         logger.info(logger_msg)
 
         # If more then two groups are required
-        if len(menu.groups.split(',')) > 1:
+        if len(missing_access[1]) > 1:
             group_plural = "groups"
         else:
             group_plural = "group"
         context.update({'error_code': 'USER_PERMISSION_MISSING_GROUP'})
-        error_message = "You don\'t have the permissions to access this page. You need to be in the <b>" + menu.groups.replace(',', ', ') + "</b> " + group_plural + " on auth."
+        error_message = "You don\'t have the permissions to access this page. You need to be in the <b>" + requested_groups + "</b> " + group_plural + " on auth."
         context.update({'error_msg': error_message})
         
         return render(request, 'simplewiki/error.html', context)
 
     return render(request, 'simplewiki/dynamic_page.html', context)
 
+@login_required
+@permission_required("simplewiki.basic_access")
+def section_body(request: WSGIRequest, menu_path: str, section_id: int) -> HttpResponse:
+    """
+    Section Body View, returns the content of a single section for pages that 
+    load their sections once they scroll into view. The same permissions as 
+    for the page itself apply. Returns a HTML fragment or, with ?format=json, 
+    a JSON object.
+
+    Args:
+        request (WSGIRequest): The standard django request
+        menu_path (str): The path of the section's menu
+        section_id (int): The id of the requested section
+
+    Returns:
+        HttpResponse: Returns the section content or an error
+    """
+
+    response_format = 'json' if request.GET.get('format') == 'json' else 'html'
+
+    def error_response(status: int, error_code: str, error_message: str) -> HttpResponse:
+        if response_format == 'json':
+            return JsonResponse({'status': 'error', 'error_code': error_code, 'message': error_message}, status=status)
+        return HttpResponse(error_message, status=status)
+
+    principal = get_access_principal(request)
+    menu_tree = get_menu_tree(request)
+    menu = menu_tree.get(menu_path)
+
+    if menu is None or menu_tree.has_children(menu):
+        return error_response(404, 'USER_MENU_NOT_FOUND', "This menu does not exist.")
+
+    if not principal.can_access(menu):
+        logger_msg = f'Rejected section request for menu "{menu_path}", user "{request.user}" has no access.'
+        logger.info(logger_msg)
+
+        return error_response(403, 'USER_PERMISSION_MISSING', "You don\'t have the permissions to access this section.")
+
+    section = Section.objects.filter(id=section_id, menu=menu).first()
+    if section is None:
+        return error_response(404, 'USER_SECTION_NOT_FOUND', "This section does not exist.")
+
+    etag = get_section_etag(section, principal, response_format)
+    last_modified = int(section.updated_at.timestamp())
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is None:
+        if response_format == 'json':
+            response = JsonResponse({'status': 'success', 
+                                     'id': section.id, 
+                                     'title': section.title, 
+                                     'content': section.content})
+        else:
+            response = HttpResponse(section.content)
+    else:
+        response = not_modified
+
+    set_page_validators(response, etag, last_modified)
+
+    return response
+
 @login_required
 @permission_required("simplewiki.basic_access") 
 def search(request: WSGIRequest) -> HttpResponse:
@@ -196,7 +247,11 @@ def search(request: WSGIRequest) -> HttpResponse:
     Search View, renders the search function and handles the search itself. 
     Once the user types anything into the search bar and hits enter, this
     view will search all section's title and context about the search, while 
-    ignoring case-sensitivity 
+    ignoring case-sensitivity. Every result shows a short snippet of the text
+    around the first match instead of the whole section. Results are ranked 
+    by relevance and split into pages, ?cursor= requests the next page and 
+    ?format=json returns the page as JSON. With ?mode=fuzzy, or if nothing 
+    matches exactly, similar words are matched, so misspelled names are found.
 
     Args:
         request (WSGIRequest): The standard django request
@@ -205,38 +260,64 @@ def search(request: WSGIRequest) -> HttpResponse:
         HttpResponse: Returns the template and context to render
     """
 
-    context = gen_context(request)
+    response_format = 'json' if request.GET.get('format') == 'json' else 'html'
 
     try:
         query = request.GET.get('query')
+        cursor = request.GET.get('cursor')
+        fuzzy = request.GET.get('mode') == 'fuzzy'
 
         available_results = []
+        next_cursor = None
+        if query:
+            # Search all sections' contexts and titles the user can access in the full-text index
+            accessible_menu_ids = get_access_principal(request).accessible_menu_ids
+            available_results, next_cursor = search_page(query, accessible_menu_ids, cursor, simplewiki_search_page_size, fuzzy)
+
+            # Nothing matches exactly, look for similar words instead
+            if not available_results and not fuzzy and not cursor:
+                fuzzy = True
+                available_results, next_cursor = search_page(query, accessible_menu_ids, None, simplewiki_search_page_size, fuzzy)
+
+            words = tokenize(query)
+            for result in available_results:
+                result.snippet = make_snippet(result.plain_text, getattr(result, 'terms', words), simplewiki_search_snippet_length)
+
+        if response_format == 'json':
+            results = []
+            for result in available_results:
+                results.append({'id': result.id,
+                                'title': result.title,
+                                'icon': result.icon,
+                                'menu': result.menu.title,
+                                'url': reverse('simplewiki:dynamic_menu', args=[result.menu.path]) + "#" + quote(result.title),
+                                'snippet': result.snippet,
+                                'rank': result.rank})
+
+            return JsonResponse({'status': 'success', 
+                                 'query': query or "", 
+                                 'mode': 'fuzzy' if fuzzy else 'exact', 
+                                 'results': results, 
+                                 'next_cursor': next_cursor})
+
+        context = gen_context(request)
         if query:
-            # Search all sections' contexts and titles
-            search_results = Section.objects.filter(
-                Q(content__icontains=query) | Q(title__icontains=query))
-            
-            # Get the menu for every search results
-            for result in search_results:
-                #result_menu = Menu.objects.get(path=result.menu_path)
-                result_menu = result.menu
-
-                group_names = result_menu.groups.split(',')
-                user_groups = list(request.user.groups.values_list('name', flat=True))
-
-                # TODO: Really bad, sometimes groups is "none" and sometimes "None", fix asap
-                # Check if the user can access the corresponding menu
-                if result_menu.groups == "" or len(result_menu.groups) == 0 or any(group_name in user_groups for group_name in group_names):
-                    if result_menu.states == "" or len(result_menu.states) == 0 or request.user.profile.state.name in result_menu.states.split(','):
-                        available_results.append(result)
-            
             context.update({'available_results': available_results})
             context.update({'oldQuery': query})
+            context.update({'next_cursor': next_cursor})
+            context.update({'is_first_page': not cursor})
+            context.update({'fuzzy': fuzzy})
     except PermissionDenied as e:
+        if response_format == 'json':
+            return JsonResponse({'status': 'error', 'error_code': 'USER_SEARCH_NO_PERMISSIONS', 'message': str(e)}, status=403)
+        context = gen_context(request)
         context.update({'error_code': 'USER_SEARCH_NO_PERMISSIONS'})
         context.update({'error_msg': 'Unable to complete search: Do you have the right permissions to access this search?'})
         return render(request, 'simplewiki/error.html', context)
     except Exception as e:
+        if response_format == 'json':
+            return JsonResponse({'status': 'error', 'error_code': 'USER_SEARCH_UNKNOWN', 'message': str(e)}, status=500)
+        context = gen_context(request)
         frame = inspect.currentframe()
         context.update({'error_code': 'USER_SEARCH_UNKNOWN'})
         context.update({'error_django': str(e)})
@@ -248,6 +329,26 @@ def search(request: WSGIRequest) -> HttpResponse:
 
     return render(request, "simplewiki/search.html", context)
 
+@login_required
+@permission_required("simplewiki.basic_access")
+def search_suggest(request: WSGIRequest) -> JsonResponse:
+    """
+    Search Suggestions View, returns the titles of menus and sections starting 
+    with the typed words as JSON, while the user types into the search bar. 
+    Answered from the in-memory title index without querying the sections.
+
+    Args:
+        request (WSGIRequest): The standard django request
+
+    Returns:
+        JsonResponse: Returns the matching titles the user can access
+    """
+
+    query = request.GET.get('query', '')
+    suggestions = suggest_titles(query, get_access_principal(request), simplewiki_search_suggestions)
+
+    return JsonResponse({'status': 'success', 'query': query, 'suggestions': suggestions})
+
 ### Editor
 
 @login_required
@@ -264,7 +365,7 @@ def editor_menus(request: WSGIRequest) -> HttpResponse:
         HttpResponse: Returns the template and context to render.
     """
 
-    context = gen_context(request)
+    context = gen_editor_context(request)
 
     create = request.GET.get('create')
     edit = request.GET.get('edit')
@@ -309,7 +410,7 @@ def editor_sections(request: WSGIRequest) -> HttpResponse:
         HttpResponse: Returns the template and context to render.
     """
 
-    context = gen_context(request)
+    context = gen_editor_context(request)
 
     create = request.GET.get('create')
     edit = request.GET.get('edit')
@@ -340,6 +441,87 @@ def editor_sections(request: WSGIRequest) -> HttpResponse:
 
     return render(request, "simplewiki/editor/editor_sections.html", context)
 
+@login_required
+@permission_required("simplewiki.editor_access")
+def editor_section_revisions(request: WSGIRequest, section_id: int) -> HttpResponse:
+    """
+    Lists the revisions of a section, newest first. Only the revision metadata 
+    is read, not the stored contents.
+
+    Args:
+        request (WSGIRequest): The standard Django request object.
+        section_id (int): The id of the section.
+
+    Returns:
+        HttpResponse: Returns the template and context to render.
+    """
+
+    context = gen_editor_context(request)
+
+    section = Section.objects.filter(id=section_id).select_related('menu').first()
+    if section is None:
+        context.update({'error_code': 'EDITOR_SECTION_REVISIONS_GET'})
+        context.update({'error_msg': "This section does not exist."})
+        return render(request, 'simplewiki/error.html', context)
+
+    revisions = (SectionRevision.objects.filter(section=section)
+                                        .order_by('-number')
+                                        .only('number', 'is_snapshot', 'size', 'title', 'last_edit', 'created_at'))
+
+    context.update({'selectedSection': section,
+                    'revisions': revisions})
+
+    return render(request, "simplewiki/editor/section_revisions.html", context)
+
+@login_required
+@permission_required("simplewiki.editor_access")
+def editor_section_revision(request: WSGIRequest, section_id: int, number: int) -> HttpResponse:
+    """
+    Shows the changes of a revision compared to the revision before it or, 
+    with ?against=<number>, to any other revision of the section. Only the 
+    two revisions and the differences since their snapshots are read.
+    POST restores the revision.
+
+    Args:
+        request (WSGIRequest): The standard Django request object.
+        section_id (int): The id of the section.
+        number (int): The revision number.
+
+    Returns:
+        HttpResponse: Returns the template and context to render.
+    """
+
+    context = gen_editor_context(request)
+
+    section = Section.objects.filter(id=section_id).first()
+    revision = (SectionRevision.objects.filter(section_id=section_id, number=number)
+                                       .only(*REVISION_METADATA)
+                                       .first())
+    if section is None or revision is None:
+        context.update({'error_code': 'EDITOR_SECTION_REVISION_GET'})
+        context.update({'error_msg': "This revision does not exist."})
+        return render(request, 'simplewiki/error.html', context)
+
+    if request.method == 'POST':
+        return restore_section_revision(request, context, section, number)
+
+    against = request.GET.get('against', str(number - 1))
+    against = int(against) if against.isdigit() else number - 1
+    other = (SectionRevision.objects.filter(section_id=section_id, number=against)
+                                    .only(*REVISION_METADATA)
+                                    .first())
+
+    content = get_revision_content(section_id, number)
+    other_content = get_revision_content(section_id, against) if other else ""
+    older, newer = (other_content, content) if against < number else (content, other_content)
+
+    context.update({'selectedSection': section,
+                    'revision': revision,
+                    'other': other,
+                    'diff': diff_lines(older, newer)})
+
+    return render(request, "simplewiki/editor/section_revision.html", context)
+
 @login_required
 @permission_required("simplewiki.editor_access")
 def editor_sort(request: WSGIRequest) -> HttpResponse:
@@ -353,7 +535,7 @@ def editor_sort(request: WSGIRequest) -> HttpResponse:
         HttpResponse: The HTTP response object.
     """
 
-    context = gen_context(request)
+    context = gen_editor_context(request)
 
     return render(request, "simplewiki/editor/editor_sort.html", context)
 
@@ -364,43 +546,136 @@ def editor_sort(request: WSGIRequest) -> HttpResponse:
 def editor_sort_post(request: WSGIRequest):
     """
     This function handles the sorting of menus in the editor view.
-    It receives a POST request with a JSON object containing the new order of the menus.
-    The function then updates the index and parent fields of each menu object in the database
-    based on the information provided in the JSON object.
+    It receives a POST request with a JSON object containing the new order of the menus, 
+    every menu is identified by its id. All posted menus are loaded with one query, their 
+    new index and parent are computed in memory and only the changed menus are written 
+    with a single bulk update. Loading and writing happen in one transaction, so a failure 
+    never leaves the tree half-sorted.
     If any error occurs during the process, the function returns a JSON response with an error message.
     """
 
     try:
         data = json.loads(request.POST.get('data'))
 
-        number = 0
-
-        # Trying to store data and sort menus based on data (json)
-        for item in data:
-            try:
-                parent_title = item["id"]
-                parent = Menu.objects.get(title=parent_title)
-                parent.index = number
-                parent.parent = None
-                parent.save()
-                
-                number = number + 1
-            except Exception as e:
-                return JsonResponse({"status": "error", "message": "Unable to save parent '" + parent_title + "':" + str(e)})
-            children = item.get("children", [])
-            for child in children:
-                try:
-                    child_title = child["id"]
-                    child = Menu.objects.get(title=child_title)
-                    child.index = number
-                    child.parent = Menu.objects.get(title=parent_title)
-                    child.save()
-                    number = number + 1
-                except Exception as e:
-                    return JsonResponse({"status": "error", "message": "Unable to save child '" + child_title + "':" + str(e)})
-
-        return JsonResponse({"status": "success"})
+        # Compute the new index and parent of every menu from the posted tree, siblings are ORDER_GAP apart
+        positions = {}
+        for number, item in enumerate(data):
+            parent_id = int(item["id"])
+            positions[parent_id] = (number * ORDER_GAP, None)
+
+            for child_number, child in enumerate(item.get("children", [])):
+                positions[int(child["id"])] = (child_number * ORDER_GAP, parent_id)
+    except (TypeError, ValueError, KeyError, AttributeError) as e:
+        return JsonResponse({"status": "error", "message": "Invalid menu order: " + str(e)})
+
+    try:
+        with transaction.atomic():
+            menus = Menu.objects.select_for_update().in_bulk(list(positions))
+
+            missing = sorted(set(positions) - set(menus))
+            if missing:
+                return JsonResponse({"status": "error", "message": "Unable to find the menus with the ids " + ", ".join(str(menu_id) for menu_id in missing)})
+
+            changed = []
+            for menu_id, (index, parent_id) in positions.items():
+                menu = menus[menu_id]
+                if menu.index != index or menu.parent_id != parent_id:
+                    menu.index = index
+                    menu.parent_id = parent_id
+                    changed.append(menu)
+
+            Menu.objects.bulk_update(changed, ['index', 'parent'])
+
+        # bulk_update doesn't send signals
+        if changed:
+            invalidate_menu_caches()
+
+        return JsonResponse({"status": "success", "updated": len(changed)})
     except Exception as e:
         return JsonResponse({"status": "error", "message": str(e)})
 
+@login_required
+@permission_required("simplewiki.editor_access")
+@require_POST
+def editor_sort_move(request: WSGIRequest):
+    """
+    Moves a single menu in the sort editor. The POST data contains the menu_id, 
+    the new parent_id (empty for a parent menu) and the ids of its new neighbours, 
+    after_id (the menu above, empty for the first position) and before_id (the 
+    menu below, empty for the last position). The menu gets a key between the 
+    keys of its neighbours, so only the moved menu is written. The siblings are 
+    only renumbered if there is no room between the two keys.
+    The neighbours are locked together with the menu. They have to be siblings 
+    below the new parent, in this order and without another menu between them, 
+    otherwise the request is stale or invalid and rejected with status 400.
+    If any error occurs during the process, the function returns a JSON response with an error message.
+    """
+
+    def optional_id(name):
+        value = request.POST.get(name)
+        return int(value) if value else None
+
+    try:
+        menu_id = int(request.POST.get('menu_id'))
+        parent_id = optional_id('parent_id')
+        after_id = optional_id('after_id')
+        before_id = optional_id('before_id')
+    except (TypeError, ValueError) as e:
+        return JsonResponse({"status": "error", "message": "Invalid move: " + str(e)}, status=400)
+
+    stale_layout = {"status": "error", "message": "The menu layout changed in the meantime, please reload the page."}
+
+    try:
+        with transaction.atomic():
+            menus = Menu.objects.select_for_update().in_bulk([menu_id] + [other_id for other_id in (parent_id, after_id, before_id) if other_id is not None])
+
+            menu = menus.get(menu_id)
+            if menu is None:
+                return JsonResponse({"status": "error", "message": "Unable to find the menu with the id " + str(menu_id)}, status=404)
+
+            if parent_id is not None:
+                parent = menus.get(parent_id)
+                if parent is None or parent.id == menu.id or parent.parent_id is not None:
+                    return JsonResponse({"status": "error", "message": "Menus can only be moved below a parent menu."}, status=400)
+                if Menu.objects.filter(parent=menu).exists():
+                    return JsonResponse({"status": "error", "message": "Menus with submenus can't be moved below another menu."}, status=400)
+
+            # Both neighbours have to be siblings below the new parent
+            neighbours = [menus.get(other_id) if other_id is not None else None for other_id in (after_id, before_id)]
+            for other_id, neighbour in zip((after_id, before_id), neighbours):
+                if other_id is not None and (neighbour is None or neighbour.parent_id != parent_id or neighbour.id == menu.id):
+                    return JsonResponse(stale_layout, status=400)
+
+            # The upper neighbour has to sort before the lower one, with no other sibling between them or beyond an empty neighbour
+            after, before = neighbours
+            if after is not None and before is not None and (after.index, after.id) >= (before.index, before.id):
+                return JsonResponse(stale_layout, status=400)
+
+            siblings = Menu.objects.filter(parent_id=parent_id).exclude(id__in=[menu_id for menu_id in (menu.id, after_id, before_id) if menu_id is not None])
+            if after is not None:
+                siblings = siblings.filter(Q(index__gt=after.index) | Q(index=after.index, id__gt=after.id))
+            if before is not None:
+                siblings = siblings.filter(Q(index__lt=before.index) | Q(index=before.index, id__lt=before.id))
+            if siblings.exists():
+                return JsonResponse(stale_layout, status=400)
+
+            index = key_between(after.index if after else None, before.index if before else None)
+
+            if index is None:
+                # No room between the neighbours, spread all siblings out again
+                siblings = list(Menu.objects.select_for_update()
+                                            .filter(parent_id=parent_id)
+                                            .exclude(id=menu.id)
+                                            .order_by('index', 'id'))
+                Menu.objects.bulk_update(rebalance(siblings), ['index'])
+                keys = {sibling.id: sibling.index for sibling in siblings}
+                index = key_between(keys.get(after_id), keys.get(before_id))
+
+            menu.index = index
+            menu.parent_id = parent_id
+            menu.save(update_fields=['index', 'parent'])
+
+        return JsonResponse({"status": "success", "index": index})
+    except Exception as e:
+        return JsonResponse({"status": "error", "message": str(e)})
 
@@ -1,6 +1,8 @@
 # Python imports
+import hashlib
 import inspect
 import json 
+import uuid
 
 # Django imports
 from django.contrib.auth.decorators import login_required, permission_required
@@ -12,6 +14,11 @@ from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect
 from django.db.models import Q
 from django.core.exceptions import PermissionDenied
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+from django.utils.cache import patch_cache_control, quote_etag
+from django.utils.http import http_date
+from django.template.loader import render_to_string
 
 from allianceauth.services.hooks import get_extension_logger
 from allianceauth.authentication.models import State
@@ -20,22 +27,27 @@ from allianceauth.authentication.models import State
 from .models import *
 from .admin_helper_menus import *
 from .admin_helper_sections import *
-from .app_settings import simplewiki_display_page_contents
+from .app_settings import simplewiki_display_page_contents, simplewiki_navbar_cache_timeout, simplewiki_page_cache_timeout, simplewiki_lazy_sections
 from .views_helper import *
+from .menu_tree import get_menu_tree
+from .access import AccessPrincipal, get_access_principal
 
 from app_utils.logging import LoggerAddTag
 from . import __title__
 
 logger = LoggerAddTag(get_extension_logger(__name__), __title__)
 
+NAVBAR_CACHE_VERSION_KEY = "simplewiki:navbar:version"
+
 ### Helper Functions ###
 
 # Standard context for a normal view, required by base.html
 def gen_context(request: WSGIRequest):
     """
     Generates the standard context for the django render function, 
-    context includes all menu and section items, if the user is 
-    an editor and all user groups (managed by aa)
+    context includes the navbar, the menu tree, if the user is an 
+    editor and the user's groups and state (managed by aa). Everything 
+    else is only loaded once a template accesses it.
 
     Args:
         request (WSGIRequest): The standard django request
@@ -44,9 +56,6 @@ def gen_context(request: WSGIRequest):
         dict: Returns the standard context used for all views 
     """
 
-    menu_items = Menu.objects.all().order_by('index')
-    section_items = Section.objects.all().order_by('index')
-
     if request.user.has_perm('simplewiki.editor_access'):
         is_editor = True
     else:
@@ -54,87 +63,303 @@ def gen_context(request: WSGIRequest):
 
     current_path = request.path
 
-    all_groups = Group.objects.all()
-    all_states = State.objects.all()
-    user_groups = list(request.user.groups.values_list('name', flat=True))
-    user_state = request.user.profile.state.name
+    principal = get_access_principal(request)
+    user_groups = sorted(principal.group_names)
+    user_state = principal.state_name
 
-    context = {'menu_items': menu_items, 
+    # Loaded on first access only and shared with the templates
+    menu_tree = SimpleLazyObject(lambda: get_menu_tree(request))
+
+    context = {'menu_tree': menu_tree, 
                'is_editor': is_editor, 
-               'section_items': section_items,
+               'principal': principal,
                'user_groups': user_groups,
                'user_state': user_state,
                'current_path': current_path,
-               'all_groups': all_groups,
-               'all_states': all_states,
                'request': request,
                # OPTIONS
                'display_page_contents': simplewiki_display_page_contents}
 
-    generate_menu(context, user_groups, user_state)
+    generate_menu(context, principal, menu_tree)
 
     return context
 
-def children_accessable(request, children):
-    user_groups = list(request.user.groups.values_list('name', flat=True))
+# Context for the editor views, required by the editor templates
+def gen_editor_context(request: WSGIRequest):
+    """
+    Generates the context for the editor views, the standard context plus all 
+    menu and section items and all groups and states (managed by aa). The 
+    querysets are lazy, they only hit the database once a template uses them.
+
+    Args:
+        request (WSGIRequest): The standard django request
 
-    for child in children:
-        if not child.groups or child.groups in user_groups:
-            if not child.states or child.states == request.user.profile.state.name:
-                return True
+    Returns:
+        dict: Returns the context used for all editor views 
+    """
 
-    return False
+    context = gen_context(request)
 
-def generate_menu(context, user_groups, user_state):
-    navbar = []
+    context.update({'menu_items': Menu.objects.all().order_by('index').prefetch_related('groups', 'states'),
+                    'section_items': Section.objects.all().order_by('index').select_related('menu'),
+                    'all_groups': Group.objects.all().order_by('name'),
+                    'all_states': State.objects.all().order_by('name')})
 
-    parent_menus = Menu.objects.filter(parent=None).order_by('index')
+    return context
 
-    for parent_menu in parent_menus:
+def get_missing_access(menu, principal: AccessPrincipal):
+    """
+    Checks why a user can't access a menu. A submenu also requires access to 
+    its parent menu.
 
-        # Extract and format permissions for parent menu
-        group_names, state_names = "", ""
-        if parent_menu.groups or parent_menu.states:
-            group_names = parent_menu.groups.split(',')
-            state_names = parent_menu.states.split(',')
+    Args:
+        menu (Menu): The requested menu
+        principal (AccessPrincipal): The groups and state of the user
 
-        # If parent menu has groups AND user does not have permission to access the parent menu
-        if parent_menu.groups and not any(group_name in user_groups for group_name in group_names):
-            continue
+    Returns:
+        tuple: Returns ('group', group_names) or ('state', state_names) for 
+        the first missing permission, None if the user can access the menu
+    """
+
+    while menu is not None:
+        group_names = [group.name for group in menu.groups.all()]
+        if group_names and not any(group_name in principal.group_names for group_name in group_names):
+            return ('group', group_names)
+
+        state_names = [state.name for state in menu.states.all()]
+        if state_names and principal.state_name not in state_names:
+            return ('state', state_names)
+
+        menu = menu.parent
+
+    return None
+
+def get_navbar_cache_version() -> str:
+    """
+    Returns the current navbar cache version. The version is changed whenever 
+    a menu is saved or deleted, which invalidates all cached navbars at once.
+
+    Returns:
+        str: Returns the current cache version
+    """
+
+    version = cache.get(NAVBAR_CACHE_VERSION_KEY)
+    if version is None:
+        cache.add(NAVBAR_CACHE_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(NAVBAR_CACHE_VERSION_KEY)
+
+    return version
 
-        # If parent menu has states AND user does not have permission to access the parent menu
-        if parent_menu.states and not any(user_state == state for state in state_names):
+def invalidate_navbar_cache():
+    """
+    Invalidates the navbar cache of all access profiles
+    """
+
+    cache.set(NAVBAR_CACHE_VERSION_KEY, uuid.uuid4().hex, None)
+
+def generate_menu(context, principal: AccessPrincipal, menu_tree=None):
+    """
+    Adds the navbar for the given principal to the context. The navbar is 
+    cached per access fingerprint, since most users share a handful of 
+    group and state combinations.
+
+    Args:
+        context (dict): The context so far, will be updated with the navbar
+        principal (AccessPrincipal): The groups and state of the user
+        menu_tree (MenuTree): The menu tree of the current request, optional
+    """
+
+    if simplewiki_navbar_cache_timeout:
+        cache_key = "simplewiki:navbar:" + get_navbar_cache_version() + ":" + principal.fingerprint
+
+        navbar = cache.get(cache_key)
+        if navbar is None:
+            navbar = build_navbar(principal, menu_tree)
+            cache.set(cache_key, navbar, simplewiki_navbar_cache_timeout)
+    else:
+        navbar = build_navbar(principal, menu_tree)
+
+    context.update({'navbar': navbar})
+
+def build_navbar(principal: AccessPrincipal, menu_tree=None) -> list:
+    """
+    Builds the navbar, all parent menus and their submenus the user can access.
+
+    Args:
+        principal (AccessPrincipal): The groups and state of the user
+        menu_tree (MenuTree): The menu tree of the current request, optional
+
+    Returns:
+        list: Returns a list of parent menu dicts, each with a list of submenus
+    """
+
+    if menu_tree is None:
+        menu_tree = get_menu_tree()
+
+    accessible_menu_ids = principal.accessible_menu_ids
+
+    navbar = []
+
+    for parent_menu in menu_tree.roots:
+        # If user does not have permission to access the parent menu
+        if parent_menu.id not in accessible_menu_ids:
             continue
 
         parent_item = {'title': parent_menu.title, 'path': parent_menu.path, 'icon': parent_menu.icon}
 
-        child_menus = parent_menu.children.all().order_by('index')
+        child_menus = menu_tree.children(parent_menu)
 
         parent_item['submenus'] = []
 
-        if child_menus.count() > 0:
-
-            for child_menu in child_menus:
-                # Extract and format permission for child menu
-                child_group_names, child_state_names = None, None
-                if child_menu.groups is not None or child_menu.states is not None:
-                    child_group_names = child_menu.groups.split(',')
-                    child_state_names = child_menu.groups.split(',')
-
-                # If child menu has groups AND user does not have permission to access the child menu
-                if (child_menu.groups and not any(child_group_name in user_groups for child_group_name in child_group_names)):
-                    continue
-                
-                # If child menu has states AND user does not have permission to access the child menu
-                if child_menu.states and not user_state in child_menu.states.split(','):
-                    continue
+        for child_menu in child_menus:
+            # If user does not have permission to access the child menu
+            if child_menu.id not in accessible_menu_ids:
+                continue
 
-                sub_item = {'title': child_menu.title, 'path': child_menu.path, 'icon': child_menu.icon}
-                parent_item['submenus'].append(sub_item)
+            sub_item = {'title': child_menu.title, 'path': child_menu.path, 'icon': child_menu.icon}
+            parent_item['submenus'].append(sub_item)
 
-        if len(parent_item['submenus']) == 0 and child_menus.count() > 0:
+        if len(parent_item['submenus']) == 0 and len(child_menus) > 0:
             continue
+
+        # Used by the navbar to highlight the active dropdown
+        parent_item['submenu_paths'] = ["/wiki/" + child_menu.path + "/" for child_menu in child_menus]
         
         navbar.append(parent_item)
 
-    context.update({'navbar': navbar})
+    return navbar
+
+def get_menu_summary(menu) -> MenuSummary:
+    """
+    Returns the section summary of a menu. Menus without a summary yet get 
+    one calculated from their sections.
+
+    Args:
+        menu (Menu): The menu to get the summary of
+
+    Returns:
+        MenuSummary: Returns the summary of the menu
+    """
+
+    try:
+        return menu.summary
+    except MenuSummary.DoesNotExist:
+        MenuSummary.refresh(menu.id)
+        return MenuSummary.objects.get(menu_id=menu.id)
+
+def get_page_etag(request: WSGIRequest, context: dict, menu, summary: MenuSummary) -> str:
+    """
+    Generates the ETag of a wiki page. The page changes if its content, the 
+    navbar or the user changes, so all of them are part of the ETag.
+
+    Args:
+        request (WSGIRequest): The standard django request
+        context (dict): The context so far
+        menu (Menu): The requested menu
+        summary (MenuSummary): The section summary of the menu
+
+    Returns:
+        str: Returns the quoted ETag
+    """
+
+    raw = ":".join([str(menu.id),
+                    str(summary.content_version),
+                    get_navbar_cache_version(),
+                    context['principal'].fingerprint,
+                    str(context['is_editor']),
+                    str(request.user.pk)])
+
+    return quote_etag(hashlib.sha1(raw.encode("utf-8")).hexdigest())
+
+def get_section_etag(section, principal: AccessPrincipal, response_format: str) -> str:
+    """
+    Generates the ETag of a lazy loaded section body.
+
+    Args:
+        section (Section): The requested section
+        principal (AccessPrincipal): The user's groups and state
+        response_format (str): Either "html" or "json"
+
+    Returns:
+        str: Returns the quoted ETag
+    """
+
+    # The content hash also covers bulk updates, which don't change updated_at
+    raw = ":".join([str(section.id),
+                    section.updated_at.isoformat(),
+                    hashlib.sha1(section.content.encode("utf-8")).hexdigest(),
+                    principal.fingerprint,
+                    response_format])
+
+    return quote_etag(hashlib.sha1(raw.encode("utf-8")).hexdigest())
+
+def set_page_validators(response: HttpResponse, etag: str, last_modified: int):
+    """
+    Adds the ETag and Last-Modified headers to a page response and makes 
+    browsers revalidate the page on every visit.
+
+    Args:
+        response (HttpResponse): The page response or the 304 response
+        etag (str): The quoted ETag of the page
+        last_modified (int): The timestamp of the last content change
+    """
+
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+
+def uses_lazy_sections(menu) -> bool:
+    """
+    Returns True if the section bodies of the menu's page are loaded once 
+    they scroll into view, either for all pages (SIMPLEWIKI_LAZY_SECTIONS) 
+    or only for this menu.
+    """
+
+    return bool(simplewiki_lazy_sections or menu.lazy_sections)
+
+def get_page_body(request: WSGIRequest, context: dict, menu, summary: MenuSummary) -> str:
+    """
+    Returns the rendered sections and page contents of a wiki page. The body 
+    is cached per menu, access fingerprint and the menu's content version. 
+    Lazy pages only contain the section titles, their bodies are loaded from 
+    the section body endpoint.
+
+    Args:
+        request (WSGIRequest): The standard django request
+        context (dict): The context so far
+        menu (Menu): The requested menu
+        summary (MenuSummary): The section summary of the menu
+
+    Returns:
+        str: Returns the rendered HTML of the page body
+    """
+
+    cache_key = "simplewiki:page:" + str(menu.id) + ":" + str(summary.content_version) + ":" + context['principal'].fingerprint + ":" + str(int(context['is_editor']))
+    lazy_sections = uses_lazy_sections(menu)
+    cache_key += ":" + str(int(lazy_sections))
+
+    if simplewiki_page_cache_timeout:
+        page_body = cache.get(cache_key)
+        if page_body is not None:
+            return page_body
+
+    sections = Section.objects.filter(menu=menu).order_by('index')
+    # The content is not needed if the bodies are loaded later
+    if lazy_sections:
+        sections = sections.defer('content')
+    sections = list(sections)
+
+    body_context = {'available_sections': sections,
+                    'available_sections_count': len(sections),
+                    'is_editor': context['is_editor'],
+                    'display_page_contents': context['display_page_contents'],
+                    'summary': summary,
+                    'menu': menu,
+                    'lazy_sections': lazy_sections}
+
+    page_body = render_to_string('simplewiki/partials/_dynamic_page_body.html', body_context, request)
+
+    if simplewiki_page_cache_timeout:
+        cache.set(cache_key, page_body, simplewiki_page_cache_timeout)
+
+    return page_body